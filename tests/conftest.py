@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+测试共用的 fixture：在线程中启动模拟站点 / 转发代理，在子进程中运行爬虫
+（Twisted reactor 每个进程只能启动一次，所以每次爬取用一个子进程）
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from yuemiao_scraper.benchmarks.standin_site import SiteConfig, StandinProxy, serve, serve_proxy  # noqa: E402
+
+RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crawl_runner.py')
+
+
+def _start(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def start_site():
+    """start_site(**SiteConfig 参数) 或 start_site(SiteConfig(...)) → 站点地址；传入的 config 可在运行中修改"""
+    servers = []
+
+    def start(config=None, **kwargs):
+        server = _start(serve(config or SiteConfig(**kwargs)))
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_port}'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def start_proxy():
+    """start_proxy(ban_requests, ban_status) → (代理地址, StandinProxy)"""
+    servers = []
+
+    def start(ban_requests=0, ban_status=403):
+        proxy = StandinProxy(ban_requests, ban_status)
+        server = _start(serve_proxy(proxy))
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_port}', proxy
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def run_crawl(tmp_path):
+    """run_crawl(爬虫名, settings, 爬虫参数) → {'stats': ..., 'items': [...], 'log': ...}"""
+
+    def run(spider, settings=None, arguments=None, timeout=120):
+        spec = {'spider': spider, 'settings': settings or {}, 'arguments': arguments or {},
+                'workdir': str(tmp_path)}
+        proc = subprocess.run([sys.executable, RUNNER, json.dumps(spec)], cwd=str(tmp_path),
+                              capture_output=True, text=True, encoding='utf-8', timeout=timeout)
+        assert proc.returncode == 0, proc.stderr[-3000:]
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result['log'] = proc.stderr
+        return result
+
+    return run
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""子进程入口：按 JSON 参数运行一个爬虫，最后一行输出统计和 item（JSON）"""
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['SCRAPY_SETTINGS_MODULE'] = 'yuemiao_scraper.settings'
+
+
+def main(spec):
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    os.chdir(spec['workdir'])
+    settings = get_project_settings()
+    settings.setdict({
+        'DOWNLOAD_DELAY': 0,
+        'AUTOTHROTTLE_ENABLED': False,
+        'TELNETCONSOLE_ENABLED': False,
+        'LOG_LEVEL': 'INFO',
+        'CLOSESPIDER_TIMEOUT': 60,
+    }, priority='cmdline')
+    settings.setdict(spec['settings'], priority='cmdline')
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(spec['spider'])
+    items = []
+
+    def scraped(item, response, spider):
+        items.append({k: v for k, v in dict(item).items() if k != 'body'})
+
+    crawler.signals.connect(scraped, signal=signals.item_scraped)
+    process.crawl(crawler, **spec['arguments'])
+    process.start()
+    print(json.dumps({'stats': crawler.stats.get_stats(), 'items': items}, ensure_ascii=False, default=str))
+
+
+if __name__ == '__main__':
+    main(json.loads(sys.argv[1]))
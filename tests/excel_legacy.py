@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Excel 工具改造前的实现，作为等价性测试的参照（与 git 历史中最初的版本相同，去掉了打印）：
+
+- legacy_generate：普通模式 openpyxl 读取、逐行组装 dict、逐个单元格写出
+- legacy_merge：每次运行合并一个源文件，全部读入内存，普通模式逐个单元格写出文本格式
+- legacy_read_word_table：excel_to_word 用 pandas 读取 xlsx
+"""
+import os
+import sys
+from datetime import datetime
+
+import openpyxl
+from openpyxl.utils import get_column_letter
+
+# Excel 工具是按脚本方式互相导入的（如 import instrumentation），需要把所在目录加入 sys.path
+EXCEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'yuemiao_scraper', 'utils', 'excel')
+for path in (EXCEL_DIR, os.path.join(EXCEL_DIR, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from excel_generate import CONFIG, parse_employee_id, parse_salary_info  # noqa: E402
+from excel_merge import CONDITION_COLUMNS, DATE_COLUMNS, TIME_COLUMN, format_date_value, parse_date_safe  # noqa: E402
+
+
+class LegacyReader:
+    """改造前的 ExcelReader（只保留 xlsx）：普通模式一次读入整个工作簿"""
+
+    def __init__(self, filepath):
+        self.wb = openpyxl.load_workbook(filepath, data_only=True)
+
+    @property
+    def sheetnames(self):
+        return self.wb.sheetnames
+
+    def get_sheet(self, sheet_name):
+        return self.wb[sheet_name]
+
+    def get_cell_value(self, sheet, cell_ref):
+        value = sheet[cell_ref].value
+        if isinstance(value, datetime):
+            return value.strftime('%Y-%m-%d')
+        return value
+
+    def get_row_values(self, sheet, row_num, col_letters):
+        return {field: self.get_cell_value(sheet, f'{col}{row_num}') for field, col in col_letters.items()}
+
+    def check_end_marker(self, sheet, row_num, end_marker):
+        value = sheet.cell(row=row_num, column=1).value
+        return not value or str(value).strip() == end_marker
+
+
+def legacy_process_sheet(reader, sheet_name, employee_id):
+    sheet = reader.get_sheet(sheet_name)
+    fixed_data = {'员工编号': employee_id}
+    for field, cell_ref in CONFIG['fixed_fields'].items():
+        fixed_data[field] = reader.get_cell_value(sheet, cell_ref)
+
+    all_data = []
+    row_num = CONFIG['data_start_row']
+    while not reader.check_end_marker(sheet, row_num, CONFIG['end_marker']):
+        row_data = fixed_data.copy()
+        row_data.update(reader.get_row_values(sheet, row_num, CONFIG['dynamic_columns']))
+        row_data['调整前执行工资级别'], row_data['调整前执行工资档位'] = parse_salary_info(row_data['调整前工资级别'])
+        row_data['调整后执行工资级别'], row_data['调整后执行工资档位'] = parse_salary_info(row_data['调整后工资级别'])
+        del row_data['调整前工资级别']
+        del row_data['调整后工资级别']
+        all_data.append(row_data)
+        row_num += 1
+    return all_data
+
+
+def legacy_generate(input_directory, output_filename):
+    all_data = []
+    for root, dirs, files in os.walk(input_directory):
+        for file in files:
+            if file.endswith(('.xlsx', '.xls')):
+                reader = LegacyReader(os.path.join(root, file))
+                for sheet_name in reader.sheetnames:
+                    all_data.extend(legacy_process_sheet(reader, sheet_name, parse_employee_id(file)))
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = CONFIG['sheet_name']
+    for col_num, column_title in enumerate(CONFIG['output_columns'], 1):
+        ws[f'{get_column_letter(col_num)}1'] = column_title
+    for row_num, row_data in enumerate(all_data, 2):
+        for col_num, column_key in enumerate(CONFIG['output_columns'], 1):
+            cell_value = row_data.get(column_key, '')
+            if isinstance(cell_value, datetime):
+                cell_value = cell_value.strftime('%Y-%m-%d')
+            ws[f'{get_column_letter(col_num)}{row_num}'] = cell_value
+    for col in ws.columns:
+        max_length = max(len(str(cell.value)) for cell in col)
+        ws.column_dimensions[col[0].column_letter].width = (max_length + 2) * 1.2
+    wb.save(output_filename)
+
+
+def legacy_read_workbook(path):
+    sheet = openpyxl.load_workbook(path, data_only=True).worksheets[0]
+    data = []
+    for row in sheet.iter_rows(values_only=True):
+        if not any(row):
+            continue
+        data.append([format_date_value(cell) if col_idx in DATE_COLUMNS else (str(cell) if cell is not None else '')
+                     for col_idx, cell in enumerate(row, 1)])
+    return data
+
+
+def legacy_write_workbook(data, output_file):
+    wb = openpyxl.Workbook()
+    sheet = wb.active
+    for row_idx, row in enumerate(data, 1):
+        for col_idx, value in enumerate(row, 1):
+            cell = sheet.cell(row=row_idx, column=col_idx, value=value)
+            cell.number_format = '@'
+    wb.save(output_file)
+
+
+def legacy_merge_by_insertion(source_data, target_data):
+    if not target_data:
+        return source_data
+
+    result = target_data[:]
+    existing_keys = {tuple(row[:5]) for row in result[1:]}
+    for src_row in source_data[1:]:
+        key_4 = tuple(src_row[:CONDITION_COLUMNS])
+        key_5 = tuple(src_row[:5])
+        src_date = parse_date_safe(src_row[TIME_COLUMN - 1])
+        if key_5 in existing_keys:
+            continue
+
+        inserted = False
+        for i in range(1, len(result)):
+            tgt_row = result[i]
+            if tuple(tgt_row[:CONDITION_COLUMNS]) == key_4:
+                tgt_date = parse_date_safe(tgt_row[TIME_COLUMN - 1])
+                if src_date and tgt_date and src_date < tgt_date:
+                    result.insert(i, src_row)
+                    existing_keys.add(key_5)
+                    inserted = True
+                    break
+
+        if not inserted:
+            last_group_index = -1
+            for i in range(1, len(result)):
+                if tuple(result[i][:CONDITION_COLUMNS]) == key_4:
+                    last_group_index = i
+            if last_group_index != -1:
+                result.insert(last_group_index + 1, src_row)
+            else:
+                result.append(src_row)
+            existing_keys.add(key_5)
+    return result
+
+
+def legacy_merge(target_file, source_files, output_file):
+    """改造前一次只能合并一个源文件：依次运行，上一次的输出作为下一次的目标"""
+    for source_file in source_files:
+        merged = legacy_merge_by_insertion(legacy_read_workbook(source_file), legacy_read_workbook(target_file))
+        legacy_write_workbook(merged, output_file)
+        target_file = output_file
+
+
+def legacy_read_word_table(path):
+    """改造前 excel_to_word.read_excel：pandas 读取，所有列为字符串"""
+    import pandas as pd
+
+    df = pd.read_excel(path, sheet_name=0, dtype=str, na_values=['', 'NA', 'N/A'],
+                       keep_default_na=False).fillna('')
+    return [str(c) for c in df.columns], [list(row) for row in df.itertuples(index=False)]
+
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""BatchExportPipeline：默认导出路径的扩展名跟随 BATCH_EXPORT_FORMAT，写入失败计入统计"""
+import sqlite3
+
+import pytest
+from scrapy import Spider
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer
+
+from yuemiao_scraper import pipelines
+from yuemiao_scraper import settings as project_settings
+from yuemiao_scraper.items import ChapterItem
+from yuemiao_scraper.pipelines import BatchExportPipeline
+
+
+def project_dict(**overrides):
+    values = {k: getattr(project_settings, k) for k in dir(project_settings) if k.isupper()}
+    values.update(overrides)
+    return values
+
+
+@pytest.mark.parametrize('fmt', ['jsonl', 'sqlite'])
+def test_default_path_extension_follows_format(tmp_path, monkeypatch, fmt):
+    monkeypatch.chdir(tmp_path)
+    crawler = get_crawler(settings_dict=project_dict(
+        BATCH_EXPORT_ENABLED=True, BATCH_EXPORT_FORMAT=fmt, BATCH_EXPORT_INTERVAL=0))
+    pipeline = BatchExportPipeline.from_crawler(crawler)
+    pipeline.open_spider(Spider('demo'))
+    pipeline.exporter.close()
+
+    assert pipeline.exporter.path == f'exports/demo.{fmt}'
+    if fmt == 'sqlite':
+        sqlite3.connect(tmp_path / 'exports' / 'demo.sqlite').execute('SELECT COUNT(*) FROM items').fetchone()
+
+
+def test_write_errors_are_counted(tmp_path, monkeypatch, caplog):
+    # 在当前线程中同步执行写入，不需要运行 reactor
+    monkeypatch.setattr(pipelines.threads, 'deferToThread', defer.maybeDeferred)
+    crawler = get_crawler(settings_dict=project_dict(
+        BATCH_EXPORT_ENABLED=True, BATCH_EXPORT_PATH=str(tmp_path / 'demo.jsonl'),
+        BATCH_EXPORT_SIZE=2, BATCH_EXPORT_INTERVAL=0))
+    pipeline = BatchExportPipeline.from_crawler(crawler)
+    spider = Spider('demo')
+    pipeline.open_spider(spider)
+
+    def fail(records):
+        raise OSError('磁盘已满')
+
+    monkeypatch.setattr(pipeline.exporter, 'write_batch', fail)
+    for index in range(3):
+        pipeline.process_item(ChapterItem(index=index, title='t', content='c'), spider)
+    closed = []
+    pipeline.close_spider(spider).addCallback(closed.append)
+
+    assert closed
+    assert crawler.stats.get_value('batch_export/errors') == 2
+    assert crawler.stats.get_value('batch_export/lost') == 3
+    assert '2 次批量写入失败，3 条 item 未导出' in caplog.text
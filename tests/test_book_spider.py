@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""BookSpider：去重过滤器中已有章节指纹时（续爬 / 重新抓取），被丢弃的章节不占名额，爬取正常结束"""
+from yuemiao_scraper.benchmarks.standin_site import SiteConfig
+
+
+def test_resumed_crawl_skips_seen_chapters(start_site, run_crawl, tmp_path):
+    config = SiteConfig(chapters=60)
+    base = start_site(config)
+    settings = {
+        # 与 CRAWL_MODE=large 相同的持久化去重：第一次运行写入指纹，第二次运行时已全部“见过”
+        'DUPEFILTER_CLASS': 'yuemiao_scraper.frontier.BloomDupeFilter',
+        'DUPEFILTER_BLOOM_DIR': str(tmp_path / 'bloom'),
+        'BOOK_MAX_PENDING_CHAPTERS': 8,
+    }
+    arguments = {'start_url': f'{base}/book/1/'}
+
+    first = run_crawl('book_spider', settings, arguments)
+    assert len(first['items']) == 60
+    assert (tmp_path / 'bloom' / 'book_spider.bloom').exists()
+
+    # 加一章后重新抓取：已抓取的 60 章全部被过滤，只下载目录页和新章节
+    config.chapters = 61
+    second = run_crawl('book_spider', settings, arguments)
+    stats = second['stats']
+    assert stats['finish_reason'] == 'finished'
+    assert [item['index'] for item in second['items']] == [60]
+    assert stats['dupefilter/filtered'] == 60
+    assert stats['response_received_count'] == 2
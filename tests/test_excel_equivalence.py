@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Excel 工具各项改造与改造前实现（tests/excel_legacy.py）的输出逐个单元格比较：
+用 benchmarks/datagen.py 生成审批表和合并源文件，覆盖
+
+- excel_generate：按需读取的 ExcelReader（openpyxl 只读 / calamine）、按列顺序的 tuple 行
+- excel_merge：内存合并、多源文件一次合并、流式合并、持久化索引、只写模式写出、SQLite 中间文件
+- excel_to_word：不用 pandas 的 read_excel、中间文件、增量生成（清单）与全部重新生成
+"""
+import os
+import shutil
+
+import pytest
+
+openpyxl = pytest.importorskip('openpyxl')
+pytest.importorskip('dateutil')
+pytest.importorskip('xlrd')
+
+import excel_legacy  # noqa: E402  先导入，把 Excel 工具所在目录加入 sys.path
+import datagen  # noqa: E402
+import excel_generate  # noqa: E402
+import excel_merge  # noqa: E402
+import excel_reader  # noqa: E402
+import excel_to_word  # noqa: E402
+import merge_stream  # noqa: E402
+import table_store  # noqa: E402
+
+BACKENDS = ['openpyxl', pytest.param('calamine', marks=pytest.mark.skipif(
+    'calamine' not in excel_reader.available_backends(), reason='未安装 python-calamine'))]
+SIZE = 8  # 员工文件数，每个文件 2 个 sheet、每个 sheet 5 行
+# 多个源文件；source1 第二次出现时所有行前五列重复，全部跳过
+MANY_SOURCES = ['source1.xlsx', 'source2.xlsx', 'source1.xlsx']
+
+
+def cells(path, formats=False):
+    """第一个 sheet 的所有单元格：值，formats 时为 (值, 数字格式)"""
+    sheet = openpyxl.load_workbook(path).worksheets[0]
+    return [[(c.value, c.number_format) if formats else c.value for c in row] for row in sheet.iter_rows()]
+
+
+def column_widths(path):
+    sheet = openpyxl.load_workbook(path).worksheets[0]
+    return {letter: dim.width for letter, dim in sheet.column_dimensions.items()}
+
+
+def generate(monkeypatch, workdir, name, backend='openpyxl', store=None):
+    monkeypatch.setitem(excel_generate.CONFIG, 'input_directory', str(workdir / 'input_files'))
+    monkeypatch.setitem(excel_generate.CONFIG, 'output_filename', str(workdir / name))
+    monkeypatch.setitem(excel_generate.CONFIG, 'intermediate_store', store and str(workdir / store))
+    monkeypatch.setattr(excel_reader, 'READER_BACKEND', backend)
+    excel_generate.run_generate()
+    return workdir / name
+
+
+@pytest.fixture(scope='module')
+def workdir(tmp_path_factory):
+    """审批表、两个合并源文件，以及改造前实现生成的汇总表 legacy_summary.xlsx"""
+    path = tmp_path_factory.mktemp('excel')
+    datagen.generate_employee_workbooks(str(path / 'input_files'), SIZE, rows_per_sheet=5, sheets_per_file=2)
+    datagen.generate_source_workbook(str(path / 'source1.xlsx'), SIZE, 40, seed=1)
+    datagen.generate_source_workbook(str(path / 'source2.xlsx'), SIZE, 40, seed=2)
+    excel_legacy.legacy_generate(str(path / 'input_files'), str(path / 'legacy_summary.xlsx'))
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        generate(monkeypatch, path, 'output_summary.xlsx', store='output_summary.sqlite')
+    return path
+
+
+@pytest.fixture
+def merge_config(monkeypatch, workdir, tmp_path):
+    """excel_merge 的目标为 output_summary.xlsx，输出和索引写到各测试自己的目录"""
+    monkeypatch.setattr(excel_merge, 'TARGET_FILE', str(workdir / 'output_summary.xlsx'))
+    monkeypatch.setattr(excel_merge, 'TARGET_STORE', None)
+    monkeypatch.setattr(excel_merge, 'OUTPUT_FILE', str(tmp_path / 'merged.xlsx'))
+    monkeypatch.setattr(excel_merge, 'INDEX_FILE', None)
+    return tmp_path / 'merged.xlsx'
+
+
+def legacy_merged(workdir, tmp_path, sources):
+    output = tmp_path / 'legacy_merged.xlsx'
+    excel_legacy.legacy_merge(str(workdir / 'output_summary.xlsx'),
+                              [str(workdir / s) for s in sources], str(output))
+    return output
+
+
+# ---- excel_generate ----
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_reader_cells_match_legacy(workdir, backend):
+    for filename in sorted(os.listdir(workdir / 'input_files')):
+        path = str(workdir / 'input_files' / filename)
+        legacy = excel_legacy.LegacyReader(path)
+        with excel_reader.ExcelReader(path, backend=backend) as reader:
+            assert reader.sheetnames == legacy.sheetnames
+            for name in reader.sheetnames:
+                sheet, legacy_sheet = reader.get_sheet(name), legacy.get_sheet(name)
+                for row in range(1, legacy_sheet.max_row + 3):
+                    for col in 'ABCDEFGHI':
+                        ref = f'{col}{row}'
+                        assert reader.get_cell_value(sheet, ref) == legacy.get_cell_value(legacy_sheet, ref), ref
+                reader.unload_sheet(name)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_generate_matches_legacy(monkeypatch, workdir, backend):
+    output = generate(monkeypatch, workdir, f'summary_{backend}.xlsx', backend=backend)
+    legacy = workdir / 'legacy_summary.xlsx'
+
+    assert len(cells(output)) == 1 + SIZE * 2 * 5
+    assert cells(output) == cells(legacy)
+    assert column_widths(output) == column_widths(legacy)
+
+
+def test_store_matches_summary_workbook(workdir):
+    columns, rows = table_store.read_table(str(workdir / 'output_summary.sqlite'))
+    assert [tuple(columns)] + rows == [tuple(r) for r in cells(workdir / 'output_summary.xlsx')]
+
+
+# ---- excel_merge ----
+
+@pytest.mark.parametrize('sources', [['source1.xlsx'], MANY_SOURCES])
+def test_memory_merge_matches_legacy(workdir, tmp_path, merge_config, sources):
+    excel_merge.run_merge([str(workdir / s) for s in sources], stream=False, index=False,
+                          export=False, rebuild_index=False)
+    # 只写模式写出的单元格与逐个设置文本格式的结果相同
+    assert cells(merge_config, formats=True) == cells(legacy_merged(workdir, tmp_path, sources), formats=True)
+
+
+@pytest.mark.parametrize('chunk_rows', [7, merge_stream.SPILL_CHUNK_ROWS])
+@pytest.mark.parametrize('sources', [['source1.xlsx'], MANY_SOURCES])
+def test_stream_merge_matches_legacy(workdir, tmp_path, merge_config, sources, chunk_rows):
+    # chunk_rows 很小时排序数据写入临时文件再归并
+    merge_stream.merge_streaming([str(workdir / s) for s in sources], str(workdir / 'output_summary.xlsx'),
+                                 str(merge_config), chunk_rows=chunk_rows)
+    assert cells(merge_config, formats=True) == cells(legacy_merged(workdir, tmp_path, sources), formats=True)
+
+
+def test_source_directory_merges_in_name_order(workdir, tmp_path, merge_config):
+    source_dir = tmp_path / 'sources'
+    source_dir.mkdir()
+    shutil.copy(workdir / 'source2.xlsx', source_dir / 'b.xlsx')
+    shutil.copy(workdir / 'source1.xlsx', source_dir / 'a.xlsx')
+    excel_merge.run_merge([str(source_dir)], stream=False, index=False, export=False, rebuild_index=False)
+    assert cells(merge_config) == cells(legacy_merged(workdir, tmp_path, ['source1.xlsx', 'source2.xlsx']))
+
+
+def test_index_merge_across_runs_matches_legacy(workdir, tmp_path, merge_config):
+    # 每次运行只合并一个源文件，第二次运行使用第一次留下的索引
+    for source in MANY_SOURCES:
+        excel_merge.run_merge([str(workdir / source)], stream=False, index=True, export=True, rebuild_index=False)
+    assert os.path.exists(str(merge_config) + '.index.sqlite')
+    assert cells(merge_config, formats=True) == cells(legacy_merged(workdir, tmp_path, MANY_SOURCES), formats=True)
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_merge_from_store_matches_legacy(monkeypatch, workdir, tmp_path, merge_config, stream):
+    monkeypatch.setattr(excel_merge, 'TARGET_STORE', str(workdir / 'output_summary.sqlite'))
+    assert excel_merge.target_input() == excel_merge.TARGET_STORE
+    excel_merge.run_merge([str(workdir / 'source1.xlsx')], stream=stream, index=False,
+                          export=False, rebuild_index=False)
+    assert cells(merge_config) == cells(legacy_merged(workdir, tmp_path, ['source1.xlsx']))
+
+
+# ---- excel_to_word ----
+
+def test_word_table_matches_pandas(workdir, tmp_path):
+    pytest.importorskip('pandas')
+    merged = legacy_merged(workdir, tmp_path, ['source1.xlsx'])
+    for path in (workdir / 'output_summary.xlsx', merged):
+        assert excel_to_word.read_excel(str(path)) == excel_legacy.legacy_read_word_table(str(path))
+    assert excel_to_word.read_store(str(workdir / 'output_summary.sqlite')) == \
+        excel_to_word.read_excel(str(workdir / 'output_summary.xlsx'))
+
+
+def docx_text(path):
+    from docx import Document
+
+    doc = Document(str(path))
+    return ([p.text for p in doc.paragraphs],
+            [[[c.text for c in row.cells] for row in table.rows] for table in doc.tables])
+
+
+def render(monkeypatch, data, output_dir, incremental):
+    monkeypatch.setattr(excel_to_word, 'INCREMENTAL', incremental)
+    return excel_to_word.generate_word_files(data, os.path.join(excel_legacy.EXCEL_DIR, 'template.docx'),
+                                             str(output_dir))
+
+
+def test_incremental_word_files_match_full_generation(monkeypatch, workdir, tmp_path):
+    pytest.importorskip('docx')
+    pytest.importorskip('docxcompose')
+    monkeypatch.chdir(tmp_path)  # 汇总文档写在当前目录
+    data = excel_to_word.aggregate_data(excel_to_word.read_excel(str(workdir / 'output_summary.xlsx')))
+    # 同名分组（姓名、员工编号相同，部门不同）的文件名带“(重复n)”，顺序变化时需要改名
+    duplicate = dict(data[0], c='新部门', rows=data[0]['rows'][:2])
+    changed = dict(data[1], rows=data[1]['rows'][:-1])
+
+    # 上一次运行：分组 1 内容不同、没有 duplicate，多一个之后被删除的分组
+    previous = [data[0], changed] + data[2:] + [dict(data[2], d='已删除的岗位')]
+    render(monkeypatch, previous, tmp_path / 'incremental', incremental=True)
+    current = [duplicate] + data
+    generated, skipped, removed = render(monkeypatch, current, tmp_path / 'incremental', incremental=True)
+    render(monkeypatch, current, tmp_path / 'full', incremental=False)
+
+    assert (generated, removed) == (2, 1)
+    assert skipped == len(current) - 2
+    names = sorted(n for n in os.listdir(tmp_path / 'full') if n.endswith('.docx'))
+    assert sorted(n for n in os.listdir(tmp_path / 'incremental') if n.endswith('.docx')) == names
+    for name in names:
+        assert docx_text(tmp_path / 'incremental' / name) == docx_text(tmp_path / 'full' / name), name
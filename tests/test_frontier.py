@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""共享队列：SQLite 存储的出队顺序、跨实例去重、进程计数，以及调度器的空闲等待"""
+import pytest
+from scrapy import Request, Spider
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.request import RequestFingerprinter
+from scrapy.utils.test import get_crawler
+
+from yuemiao_scraper.frontier import scheduler as scheduler_module
+from yuemiao_scraper.frontier import BloomDupeFilter, FrontierDupeFilter, FrontierScheduler, open_store
+from yuemiao_scraper.frontier.scheduler import build_dupefilter
+
+
+@pytest.fixture
+def store_url(tmp_path):
+    return f'sqlite:///{tmp_path}/frontier.db'
+
+
+def test_sqlite_pop_order_priority_then_fifo(store_url):
+    store = open_store(store_url)
+    for priority, data in [(0, b'a'), (5, b'b'), (0, b'c'), (5, b'd'), (-1, b'e')]:
+        store.push('k', priority, data)
+    assert store.size('k') == 5
+    assert [store.pop('k') for _ in range(6)] == [b'b', b'd', b'a', b'c', b'e', None]
+    assert not store.has_pending('k')
+    store.close()
+
+
+def test_sqlite_keys_are_separate(store_url):
+    store = open_store(store_url)
+    store.push('a', 0, b'1')
+    assert store.pop('b') is None
+    assert store.pop('a') == b'1'
+    store.close()
+
+
+def fingerprinter():
+    return RequestFingerprinter(get_crawler(Spider))
+
+
+def test_request_seen_shared_between_instances(store_url):
+    first = FrontierDupeFilter(store_url, 'k', fingerprinter=fingerprinter())
+    second = FrontierDupeFilter(store_url, 'k', fingerprinter=fingerprinter())
+    other_key = FrontierDupeFilter(store_url, 'other', fingerprinter=fingerprinter())
+    for df in (first, second, other_key):
+        df.open()
+    assert not first.request_seen(Request('http://example.com/1'))
+    assert second.request_seen(Request('http://example.com/1'))
+    assert not second.request_seen(Request('http://example.com/2'))
+    assert first.request_seen(Request('http://example.com/2'))
+    assert not other_key.request_seen(Request('http://example.com/1'))
+    for df in (first, second, other_key):
+        df.close('finished')
+
+
+def make_scheduler(store_url, persist=True, idle_timeout=0.0):
+    crawler = get_crawler(Spider)
+    dupefilter = FrontierDupeFilter(store_url, 'k', fingerprinter=crawler.request_fingerprinter)
+    scheduler = FrontierScheduler(crawler, store_url, 'k', dupefilter, persist=persist,
+                                  idle_timeout=idle_timeout)
+    scheduler.open(Spider.from_crawler(crawler, name='k'))
+    return scheduler
+
+
+def test_only_last_worker_clears_when_not_persistent(store_url):
+    first = make_scheduler(store_url, persist=False)
+    second = make_scheduler(store_url, persist=False)
+    assert first.enqueue_request(Request('http://example.com/1'))
+    assert first.enqueue_request(Request('http://example.com/2'))
+
+    first.close('finished')
+    # 第二个进程仍在运行：队列和指纹都还在
+    assert second.has_pending_requests()
+    assert not second.enqueue_request(Request('http://example.com/1'))
+    assert second.next_request().url == 'http://example.com/1'
+
+    second.close('finished')
+    store = open_store(store_url)
+    assert store.size('k') == 0
+    assert store.workers('k') == 0
+    assert store.add_seen('k', b'any')
+    store.close()
+
+
+def test_persistent_queue_survives_close(store_url):
+    scheduler = make_scheduler(store_url, persist=True)
+    scheduler.enqueue_request(Request('http://example.com/1'))
+    scheduler.close('finished')
+    resumed = make_scheduler(store_url, persist=True)
+    assert resumed.next_request().url == 'http://example.com/1'
+    assert not resumed.enqueue_request(Request('http://example.com/1'))
+    resumed.close('finished')
+
+
+def test_idle_timeout_keeps_spider_open(store_url, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(scheduler_module.time, 'time', lambda: now[0])
+    scheduler = make_scheduler(store_url, idle_timeout=30)
+    scheduler.enqueue_request(Request('http://example.com/1'))
+    scheduler.next_request()  # 最后一次出队时间 1000
+
+    now[0] = 1020
+    with pytest.raises(DontCloseSpider):
+        scheduler.spider_idle(scheduler.spider)
+    now[0] = 1031
+    scheduler.spider_idle(scheduler.spider)  # 超过等待时间，允许关闭
+    scheduler.close('finished')
+
+
+def test_no_idle_timeout_closes_immediately(store_url):
+    scheduler = make_scheduler(store_url, idle_timeout=0)
+    scheduler.spider_idle(scheduler.spider)
+    scheduler.close('finished')
+
+
+def test_build_dupefilter_from_crawler(tmp_path):
+    crawler = get_crawler(Spider, {'DUPEFILTER_BLOOM_DIR': str(tmp_path)})
+    crawler.spider = Spider('demo')
+    df = build_dupefilter(BloomDupeFilter, crawler)
+    assert isinstance(df, BloomDupeFilter)
+    assert df.path.endswith('demo.bloom')
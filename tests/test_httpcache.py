@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""RecrawlCachePolicy：对模拟站点抓取两次，第二次只下载目录页，章节页直接用缓存，图片用 ETag 重新验证（304）"""
+from yuemiao_scraper.benchmarks.standin_site import SiteConfig
+
+CACHE_SETTINGS = {
+    'HTTPCACHE_ENABLED': True,
+    'HTTPCACHE_POLICY': 'yuemiao_scraper.httpcache.RecrawlCachePolicy',
+    # 章节页缓存后立即视为不变
+    'HTTPCACHE_CHAPTER_IMMUTABLE_AGE': 0,
+}
+
+
+def test_recrawl_book_downloads_only_index(start_site, run_crawl, tmp_path):
+    base = start_site(SiteConfig(chapters=20))
+    settings = dict(CACHE_SETTINGS, HTTPCACHE_DIR=str(tmp_path / 'httpcache'))
+    arguments = {'start_url': f'{base}/book/1/'}
+
+    first = run_crawl('book_spider', settings, arguments)
+    assert len(first['items']) == 20
+    assert first['stats']['httpcache/miss'] == 20
+    assert first['stats']['httpcache/store'] == 20
+
+    second = run_crawl('book_spider', settings, arguments)
+    stats = second['stats']
+    assert sorted(item['index'] for item in second['items']) == list(range(20))
+    # 目录页不经过缓存（没有 miss），20 章全部命中；DownloaderStats 在缓存中间件外层，命中也计入请求数
+    assert stats['httpcache/hit'] == 20
+    assert 'httpcache/miss' not in stats
+    assert 'httpcache/store' not in stats
+    assert stats['downloader/request_count'] == 21
+
+
+def test_recrawl_gallery_revalidates_images(start_site, run_crawl, tmp_path):
+    base = start_site(SiteConfig(images=6, image_size=4096))
+    settings = dict(CACHE_SETTINGS, HTTPCACHE_DIR=str(tmp_path / 'httpcache'))
+    arguments = {'start_url': f'{base}/gallery/1'}
+
+    first = run_crawl('image_spider', settings, arguments)
+    assert len(first['items']) == 6
+    assert first['stats']['httpcache/store'] == 6  # 图集页没有验证字段，不缓存
+
+    second = run_crawl('image_spider', settings, arguments)
+    stats = second['stats']
+    # 缓存的图片没有过期时间，带 If-None-Match 重新验证；revalidate 只在服务器返回 304 时计数，
+    # 缓存中间件随后换成缓存的 200 响应（所以 downloader/response_status_count 里看不到 304）
+    assert len(second['items']) == 6
+    assert stats['httpcache/revalidate'] == 6
+    assert 'httpcache/invalidate' not in stats
+    assert 'httpcache/hit' not in stats
+    # 完整下载的只有图集页（新版本 Scrapy 在 304 之后会重新保存刷新过首部的缓存，不看 store）
+    assert stats['httpcache/firsthand'] == 1
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""ImageTranscodePipeline：内存中的 JPEG 按 IMAGE_PROFILES 转码/缩放，目标文件已存在时跳过"""
+import io
+
+import pytest
+from scrapy import Spider
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer
+
+from yuemiao_scraper import pipelines
+from yuemiao_scraper.items import ImageItem
+
+Image = pytest.importorskip('PIL.Image')
+
+PROFILES = {
+    'webp': {'format': 'WEBP', 'quality': 85, 'method': 4},
+    'thumb': {'format': 'WEBP', 'quality': 75, 'max_size': [320, 320]},
+}
+
+
+def jpeg_bytes(size=(640, 480)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    # 不运行 reactor：进程池的结果直接同步取出
+    monkeypatch.setattr(pipelines, '_deferred_from_future', lambda future: defer.maybeDeferred(future.result))
+    crawler = get_crawler(settings_dict={
+        'IMAGE_TRANSCODE_ENABLED': True, 'IMAGE_PROFILES': PROFILES, 'IMAGE_TRANSCODE_WORKERS': 1})
+    pipeline = pipelines.ImageTranscodePipeline.from_crawler(crawler)
+    pipeline.open_spider(Spider('images'))
+    yield pipeline
+    pipeline.executor.shutdown()
+
+
+def process(pipeline, item):
+    results = []
+    defer.maybeDeferred(pipeline.process_item, item, Spider('images')).addBoth(results.append)
+    return results[0]
+
+
+def test_transcodes_in_memory_jpeg(pipeline, tmp_path):
+    item = ImageItem(url='http://example.com/1.jpg', path=str(tmp_path / 'gallery' / '1.jpg'),
+                     body=jpeg_bytes())
+    result = process(pipeline, item)
+
+    assert result is item
+    assert item['transcoded'] == {
+        'webp': str(tmp_path / 'gallery' / 'webp' / '1.webp'),
+        'thumb': str(tmp_path / 'gallery' / 'thumb' / '1.webp'),
+    }
+    with Image.open(item['transcoded']['webp']) as image:
+        assert (image.format, image.size) == ('WEBP', (640, 480))
+    with Image.open(item['transcoded']['thumb']) as image:
+        assert (image.format, image.size) == ('WEBP', (320, 240))
+    assert item['body'] is not None  # 默认保留原图，交给 ImageStorePipeline
+    assert pipeline.stats.get_value('image_transcode/files') == 2
+
+
+def test_existing_targets_are_skipped(pipeline, tmp_path):
+    targets = [tmp_path / 'gallery' / name / '1.webp' for name in PROFILES]
+    for target in targets:
+        target.parent.mkdir(parents=True)
+        target.write_bytes(b'old')
+    item = ImageItem(url='http://example.com/1.jpg', path=str(tmp_path / 'gallery' / '1.jpg'),
+                     body=jpeg_bytes())
+    result = process(pipeline, item)
+
+    assert result is item
+    assert [target.read_bytes() for target in targets] == [b'old', b'old']
+    assert pipeline.stats.get_value('image_transcode/skipped') == 1
+    assert pipeline.stats.get_value('image_transcode/files') is None
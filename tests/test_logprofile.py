@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""LogProfile：抽样比例、-s LOG_PROFILE 时的设置覆盖、爬虫日志级别的还原"""
+import logging
+
+import pytest
+from scrapy import Spider
+from scrapy.utils.test import get_crawler
+
+from yuemiao_scraper.logprofile import LogProfile, SamplingFilter
+
+
+def record(name='scrapy.core.scraper', level=logging.DEBUG):
+    return logging.LogRecord(name, level, __file__, 0, 'msg', None, None)
+
+
+@pytest.mark.parametrize('rate, kept', [(0.1, 10), (0.3, 30), (0.5, 50), (0, 0), (1, 100)])
+def test_sampling_keeps_rate(rate, kept):
+    sampler = SamplingFilter({'scrapy.core': rate})
+    assert sum(sampler.filter(record()) for _ in range(100)) == kept
+
+
+def test_sampling_skips_warnings_and_other_loggers():
+    sampler = SamplingFilter({'scrapy.core': 0})
+    assert sampler.filter(record(level=logging.WARNING))
+    assert sampler.filter(record(name='scrapy.corex'))
+
+
+def test_profile_from_settings_overrides_log_level():
+    crawler = get_crawler(settings_dict={
+        'LOG_PROFILE': 'production', 'LOG_LEVEL': 'DEBUG', 'COOKIES_DEBUG': True})
+    # 运行时扩展在设置冻结前创建，get_crawler 已冻结，解除冻结模拟这一时刻
+    crawler.settings.frozen = False
+    LogProfile.from_crawler(crawler)
+    assert crawler.settings.get('LOG_LEVEL') == 'INFO'
+    assert crawler.settings.getbool('COOKIES_DEBUG') is False
+
+
+def test_spider_level_restored_on_stop():
+    spider_logger = logging.getLogger('levels')
+    spider_logger.setLevel(logging.WARNING)
+    crawler = get_crawler(settings_dict={
+        'LOG_PROFILE': 'production', 'LOG_PROFILE_SPIDER_LEVELS': {'levels': 'DEBUG'}})
+    crawler.settings.frozen = False
+    profile = LogProfile.from_crawler(crawler)
+    profile.spider_opened(Spider('levels'))
+    try:
+        assert spider_logger.level == logging.DEBUG
+    finally:
+        profile.engine_stopped()
+    assert spider_logger.level == logging.WARNING
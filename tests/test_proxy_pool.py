@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""ProxyPoolMiddleware：封禁 → 隔离 → 恢复，按代理分下载槽位，全部隔离时选最早恢复的"""
+import pytest
+from scrapy import Request, Spider
+from scrapy.http import Response
+
+from yuemiao_scraper import middlewares
+from yuemiao_scraper.middlewares import ProxyPoolMiddleware
+
+A = 'http://127.0.0.1:9001'
+B = 'http://127.0.0.1:9002'
+
+
+class Clock(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(middlewares.time, 'time', clock)
+    return clock
+
+
+def make_pool(**kwargs):
+    kwargs.setdefault('backoff_base', 30.0)
+    kwargs.setdefault('backoff_max', 600.0)
+    return ProxyPoolMiddleware([A, B], **kwargs)
+
+
+def send(pool, spider, status=200):
+    request = Request('http://example.com/')
+    pool.process_request(request, spider)
+    proxy = request.meta['proxy']
+    pool.process_response(request, Response(request.url, status=status, request=request), spider)
+    return request, proxy
+
+
+def test_request_uses_proxy_as_download_slot(clock):
+    pool = make_pool()
+    request = Request('http://example.com/')
+    pool.process_request(request, Spider('t'))
+    assert request.meta['proxy'] in (A, B)
+    assert request.meta['download_slot'] == request.meta['proxy']
+
+
+def test_manual_proxy_is_left_alone(clock):
+    pool = make_pool()
+    request = Request('http://example.com/', meta={'proxy': 'http://10.0.0.1:8080'})
+    pool.process_request(request, Spider('t'))
+    assert request.meta['proxy'] == 'http://10.0.0.1:8080'
+    assert 'download_slot' not in request.meta
+
+
+def test_ban_quarantines_then_recovers(clock):
+    pool = make_pool(max_in_flight=1)
+    spider = Spider('t')
+    _, banned = send(pool, spider, status=403)
+    other = B if banned == A else A
+    state = pool.by_url[banned]
+    assert state.bans == 1
+    assert state.quarantined_until == clock.now + 30
+
+    # 隔离期间即使另一个代理已达到在途上限，也不使用被隔离的代理
+    pending = Request('http://example.com/pending')
+    pool.process_request(pending, spider)
+    assert pending.meta['proxy'] == other
+    for _ in range(5):
+        assert send(pool, spider)[1] == other
+
+    # 隔离结束后恢复使用（另一个代理在途已满时选它）
+    clock.now += 31
+    assert state.is_available(clock.now)
+    assert send(pool, spider)[1] == banned
+
+
+def test_backoff_grows_exponentially_up_to_max(clock):
+    pool = make_pool(backoff_base=10, backoff_max=25)
+    spider = Spider('t')
+    state = pool.by_url[A]
+    for expected in (10, 20, 25):
+        pool._quarantine(state, spider, 'test')
+        assert state.quarantined_until == clock.now + expected
+
+
+def test_consecutive_failures_quarantine(clock):
+    pool = make_pool(max_failures=2)
+    spider = Spider('t')
+    for _ in range(2):
+        request = Request('http://example.com/')
+        pool.process_request(request, spider)
+        pool.by_url[B].quarantined_until = clock.now + 100  # 固定使用 A
+        request.meta['proxy'] = A
+        request.meta[ProxyPoolMiddleware.META_KEY] = A
+        pool.process_exception(request, ConnectionRefusedError(), spider)
+    assert not pool.by_url[A].is_available(clock.now)
+
+
+def test_all_quarantined_uses_earliest_recovery(clock):
+    pool = make_pool()
+    pool.by_url[A].quarantined_until = clock.now + 50
+    pool.by_url[B].quarantined_until = clock.now + 20
+    assert pool.choose_proxy().url == B
+
+
+def test_crawl_through_standin_proxies(start_site, start_proxy, run_crawl):
+    base = start_site(chapters=40, latency=0.05)
+    bad_url, bad = start_proxy(ban_requests=1, ban_status=403)
+    good_url, good = start_proxy()
+    result = run_crawl('book_spider', settings={
+        'PROXY_POOL_ENABLED': True,
+        'PROXY_POOL_LIST': [bad_url, good_url],
+        'PROXY_POOL_BACKOFF_BASE': 0.3,
+        'PROXY_POOL_BACKOFF_MAX': 0.3,
+        'PROXY_POOL_MAX_IN_FLIGHT': 1,
+        'CONCURRENT_REQUESTS': 2,
+    }, arguments={'start_url': f'{base}/book/1/'})
+
+    stats = result['stats']
+    assert len(result['items']) == 40
+    assert bad.banned == 1
+    assert stats['proxy_pool/banned'] == 1
+    assert stats['proxy_pool/quarantined'] == 1
+    # 被封禁的代理隔离结束后重新被使用
+    assert bad.forwarded > 0
+    assert good.forwarded > 0
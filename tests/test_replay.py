@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""ReplayArchive：重试产生的错误响应不覆盖已录制的 2xx 响应"""
+import pytest
+from scrapy import Request
+from scrapy.http import Response
+
+from yuemiao_scraper.replay import ReplayArchive
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ReplayArchive(str(tmp_path / 'replay.sqlite'))
+    yield archive
+    archive.close()
+
+
+def record(archive, status, body):
+    request = Request('http://example.com/page')
+    archive.put('fp', request, Response(request.url, status=status, body=body, request=request))
+
+
+@pytest.mark.parametrize('error', [429, 500, 503])
+def test_error_after_success_keeps_success(archive, error):
+    record(archive, 200, b'good')
+    record(archive, error, b'error')
+    assert archive.get('fp')[1] == 200
+    assert archive.get('fp')[3] == b'good'
+
+
+def test_success_replaces_error(archive):
+    record(archive, 503, b'error')
+    record(archive, 200, b'good')
+    assert archive.get('fp')[1:4:2] == (200, b'good')
+
+
+def test_later_responses_replace_same_class(archive):
+    record(archive, 200, b'old')
+    record(archive, 200, b'new')
+    assert archive.get('fp')[3] == b'new'
+
+
+def test_error_replaces_error(archive):
+    record(archive, 500, b'a')
+    record(archive, 404, b'b')
+    assert archive.get('fp')[1:4:2] == (404, b'b')
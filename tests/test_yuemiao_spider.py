@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+yuemiaoSpider 多账号模式：预约接口返回非 JSON 的 200 页面时归还 token，爬虫正常结束；
+已预约成功的就诊人不再发出排队中的请求；分发出错时关闭爬虫
+"""
+import json
+
+
+def write_config(path, base, accounts=2, linkmen=2, max_attempts=0, tokens=1, targets=None):
+    config = {
+        'url': f'{base}/order/subscribe/add.do',
+        'token_interval': 0,
+        'token_max_in_flight': 1,
+        'max_attempts': max_attempts,
+        'accounts': [{'name': f'a{i}', 'tokens': [{'st': f's{i}', 'tk': f't{i}-{k}'} for k in range(tokens)],
+                      'linkmen': [i * 10 + k for k in range(linkmen)]} for i in range(accounts)],
+        'targets': targets or [{'vaccineCode': '8803', 'vaccineIndex': 1, 'subscribeDate': '2019-05-23'}],
+    }
+    path.write_text(json.dumps(config), encoding='utf-8')
+    return str(path)
+
+
+def test_non_json_responses_release_tokens(start_site, run_crawl, tmp_path):
+    base = start_site(success_rate=0.3, invalid_rate=0.5, seed=1)
+    config = write_config(tmp_path / 'accounts.json', base)
+    result = run_crawl('yuemiao', {'CLOSESPIDER_TIMEOUT': 20}, {'config': config})
+
+    stats = result['stats']
+    assert stats['finish_reason'] == 'finished'
+    assert stats['yuemiao/a0/errors'] + stats['yuemiao/a1/errors'] > 0
+    succeeded = {item['linkman'] for item in result['items'] if item['ok']}
+    assert succeeded == {'0', '1', '10', '11'}
+
+
+def test_only_non_json_responses_end_after_max_attempts(start_site, run_crawl, tmp_path):
+    base = start_site(invalid_rate=1.0)
+    config = write_config(tmp_path / 'accounts.json', base, max_attempts=3)
+    result = run_crawl('yuemiao', {'CLOSESPIDER_TIMEOUT': 20}, {'config': config})
+
+    stats = result['stats']
+    assert stats['finish_reason'] == 'finished'
+    assert result['items'] == []
+    for account in ('a0', 'a1'):
+        assert stats[f'yuemiao/{account}/attempts'] == 6
+        assert stats[f'yuemiao/{account}/errors'] == 6
+
+
+def test_queued_requests_dropped_after_success(start_site, run_crawl, tmp_path):
+    # 4 个 token 同时为一个就诊人发出请求，一次只下载一个，其余在调度队列中等待。
+    # 第一个响应解析前引擎可能已取出下一个请求，所以最多发出 2 个
+    base = start_site(success_rate=1.0, latency=0.2)
+    config = write_config(tmp_path / 'accounts.json', base, accounts=1, linkmen=1, tokens=4)
+    result = run_crawl('yuemiao', {'CLOSESPIDER_TIMEOUT': 20, 'CONCURRENT_REQUESTS': 1}, {'config': config})
+
+    stats = result['stats']
+    sent = stats['downloader/request_count']
+    assert stats['finish_reason'] == 'finished'
+    assert stats['yuemiao/a0/attempts'] == 4
+    assert sent <= 2
+    assert stats['yuemiao/a0/skipped'] == 4 - sent
+    assert len(result['items']) == sent
+
+
+def test_dispatch_error_closes_spider(start_site, run_crawl, tmp_path):
+    base = start_site()
+    config = write_config(tmp_path / 'accounts.json', base, targets=[['不是对象']])
+    result = run_crawl('yuemiao', {'CLOSESPIDER_TIMEOUT': 20}, {'config': config})
+
+    assert result['stats']['finish_reason'] == 'dispatch_error'
+    assert 'yuemiao/a0/attempts' not in result['stats']
+    assert '分发预约请求出错' in result['log']
@@ -0,0 +1,4 @@
+# 爬虫性能基准测试
+#
+#   standin_site  本地模拟站点（书籍目录/章节、图集/图片、预约接口）
+#   crawl_bench   驱动各个爬虫抓取本地站点并统计吞吐
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+# 爬虫吞吐基准测试：启动本地模拟站点，依次运行 book_spider / image_spider / yuemiao，
+# 统计页面/秒、字节/秒和每页 CPU 时间。每个爬虫在独立子进程中运行。
+#
+#   python -m yuemiao_scraper.benchmarks.crawl_bench
+#   python -m yuemiao_scraper.benchmarks.crawl_bench --spiders book_spider --chapters 2000 --latency 0.02
+#   python -m yuemiao_scraper.benchmarks.crawl_bench --error-rate 0.02 --burst-every 200 --burst-length 10
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from yuemiao_scraper.benchmarks.standin_site import SiteConfig, serve
+
+SPIDERS = ('book_spider', 'image_spider', 'yuemiao')
+RESULT_MARK = '@@BENCH@@'
+
+
+def spider_arguments(spider, base_url):
+    """把爬虫的入口地址指向模拟站点"""
+    if spider == 'book_spider':
+        return {'start_url': f'{base_url}/book/1/'}
+    if spider == 'image_spider':
+        return {'start_url': f'{base_url}/gallery/1'}
+    return {'url': f'{base_url}/order/subscribe/add.do?vaccineCode=8803&linkmanId=1'}
+
+
+def run_spider(spider, base_url, workdir, concurrency, max_pages):
+    """子进程入口：运行一个爬虫并输出统计结果"""
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'yuemiao_scraper.settings')
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    os.chdir(workdir)
+    settings = get_project_settings()
+    settings.setdict({
+        'DOWNLOAD_DELAY': 0,
+        'AUTOTHROTTLE_ENABLED': False,
+        'CONCURRENT_REQUESTS': concurrency,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': concurrency,
+        'COOKIES_DEBUG': False,
+        'LOG_LEVEL': 'INFO',
+        'LOG_FILE': os.path.join(workdir, f'{spider}.log'),
+        'TELNETCONSOLE_ENABLED': False,
+        # 预约接口在失败时会一直重试，按页数结束
+        'CLOSESPIDER_PAGECOUNT': max_pages,
+    }, priority='cmdline')
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(spider)
+    cpu = {}
+
+    def opened(spider):
+        cpu['start'] = time.process_time()
+        cpu['wall'] = time.perf_counter()
+
+    def closed(spider):
+        cpu['seconds'] = time.process_time() - cpu['start']
+        cpu['elapsed'] = time.perf_counter() - cpu['wall']
+
+    crawler.signals.connect(opened, signal=signals.spider_opened)
+    crawler.signals.connect(closed, signal=signals.spider_closed)
+    process.crawl(crawler, **spider_arguments(spider, base_url))
+    process.start()
+
+    stats = crawler.stats.get_stats()
+    pages = stats.get('response_received_count', 0)
+    nbytes = stats.get('downloader/response_bytes', 0)
+    elapsed = cpu.get('elapsed') or 1e-9
+    print(RESULT_MARK + json.dumps({
+        'spider': spider,
+        'pages': pages,
+        'bytes': nbytes,
+        'items': stats.get('item_scraped_count', 0),
+        'retries': stats.get('retry/count', 0),
+        'seconds': elapsed,
+        'pages_per_sec': pages / elapsed,
+        'bytes_per_sec': nbytes / elapsed,
+        'cpu_ms_per_page': cpu.get('seconds', 0) * 1000 / pages if pages else None,
+        'finish_reason': stats.get('finish_reason'),
+    }))
+
+
+def _serve_forever(config, port_queue):
+    server = serve(config)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def start_site(config):
+    """在独立进程中启动模拟站点，避免与爬虫争用 CPU 统计"""
+    port_queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_serve_forever, args=(config, port_queue), daemon=True)
+    proc.start()
+    return proc, f'http://127.0.0.1:{port_queue.get(timeout=10)}'
+
+
+def measure(spider, base_url, workdir, concurrency, max_pages):
+    proc = subprocess.run(
+        [sys.executable, '-m', 'yuemiao_scraper.benchmarks.crawl_bench',
+         '--run-spider', spider, '--base-url', base_url, '--workdir', workdir,
+         '--concurrency', str(concurrency), '--max-pages', str(max_pages)],
+        capture_output=True, text=True, encoding='utf-8',
+    )
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARK):
+            return json.loads(line[len(RESULT_MARK):])
+    raise RuntimeError(f'{spider} 运行失败:\n{proc.stdout}\n{proc.stderr}')
+
+
+def print_table(results):
+    print(f"{'spider':<14}{'pages':>8}{'pages/s':>10}{'MB/s':>10}{'CPU ms/page':>13}{'retries':>9}")
+    for r in results:
+        cpu = r['cpu_ms_per_page']
+        print(f"{r['spider']:<14}{r['pages']:>8}{r['pages_per_sec']:>10.1f}"
+              f"{r['bytes_per_sec'] / 1024 / 1024:>10.2f}"
+              f"{cpu if cpu is None else round(cpu, 2)!s:>13}{r['retries']:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='爬虫吞吐基准测试')
+    parser.add_argument('--spiders', default=','.join(SPIDERS), help='要测试的爬虫，逗号分隔')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--max-pages', type=int, default=1000, help='单个爬虫最多抓取的页面数')
+    parser.add_argument('--chapters', type=int, default=500)
+    parser.add_argument('--images', type=int, default=100)
+    parser.add_argument('--image-size', type=int, default=200 * 1024)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--burst-every', type=int, default=0)
+    parser.add_argument('--burst-length', type=int, default=0)
+    parser.add_argument('--output', help='结果写入 JSON 文件')
+    parser.add_argument('--run-spider', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_spider:
+        run_spider(args.run_spider, args.base_url, args.workdir, args.concurrency, args.max_pages)
+        return 0
+
+    config = SiteConfig(
+        chapters=args.chapters, images=args.images, image_size=args.image_size,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        burst_every=args.burst_every, burst_length=args.burst_length,
+    )
+    site, base_url = start_site(config)
+    results = []
+    try:
+        for spider in (s for s in args.spiders.split(',') if s):
+            workdir = tempfile.mkdtemp(prefix=f'bench_{spider}_')
+            try:
+                print(f'运行 {spider} ...')
+                results.append(measure(spider, base_url, workdir, args.concurrency, args.max_pages))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        site.terminate()
+
+    print_table(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'site': vars(config), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f'结果已保存: {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
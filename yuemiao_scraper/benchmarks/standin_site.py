@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+# 本地模拟站点，页面结构与爬虫依赖的选择器一致：
+#
+#   /book/<id>/               书籍目录，.list_dd a 指向章节
+#   /book/<id>/<n>.html       章节页，.book_con h1 为标题，#zoom 为正文
+#   /gallery/<id>             图集页，h1.tdb-title-text 为标题，//*[@id="tdi_78"]/div/div[2] 中为图片
+#   /img/<id>/<n>.jpg         图片内容
+#   /order/subscribe/add.do   预约接口，返回 JSON
+#
+#   python -m yuemiao_scraper.benchmarks.standin_site --port 8000 --latency 0.05 --error-rate 0.01
+#
+# 加 --proxy 时启动的是转发代理（用于测试 ProxyPoolMiddleware），--ban-requests 指定前多少个请求返回封禁状态码：
+#
+#   python -m yuemiao_scraper.benchmarks.standin_site --proxy --port 8001 --ban-requests 5 --ban-status 403
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class SiteConfig(object):
+    def __init__(self, chapters=200, paragraphs=30, images=50, image_size=200 * 1024,
+                 latency=0.0, jitter=0.0, error_rate=0.0, burst_every=0, burst_length=0,
+                 success_rate=0.0, invalid_rate=0.0, seed=0):
+        self.chapters = chapters          # 每本书的章节数
+        self.paragraphs = paragraphs      # 每章段落数
+        self.images = images              # 每个图集的图片数
+        self.image_size = image_size      # 图片字节数
+        self.latency = latency            # 每个响应的固定延迟（秒）
+        self.jitter = jitter              # 额外随机延迟上限（秒）
+        self.error_rate = error_rate      # 返回 500 的概率
+        self.burst_every = burst_every    # 每隔多少个请求进入一次 429 突发，0 为关闭
+        self.burst_length = burst_length  # 每次 429 突发持续的请求数
+        self.success_rate = success_rate  # 预约接口返回 ok=true 的概率
+        self.invalid_rate = invalid_rate  # 预约接口返回 200 的 HTML 登录页（不是 JSON）的概率
+        self.seed = seed
+
+
+class StandinSite(object):
+    """生成页面内容并按配置注入延迟、错误和 429 突发"""
+
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.counter = 0
+        block = random.Random(config.seed).randbytes(4096)
+        self.image_body = (block * (config.image_size // len(block) + 1))[:config.image_size]
+        # 图片支持 If-None-Match 条件请求（与常见的静态文件服务器一致），HTML 页面不带验证字段
+        self.image_etag = f'"img-{config.seed}-{config.image_size}"'
+
+    def fault(self):
+        """返回需要注入的错误状态码，没有则返回 None"""
+        with self.lock:
+            self.counter += 1
+            n = self.counter
+            roll = self.rng.random()
+        c = self.config
+        if c.burst_every and c.burst_length and n % c.burst_every < c.burst_length:
+            return 429
+        if roll < c.error_rate:
+            return 500
+        return None
+
+    def delay(self):
+        c = self.config
+        if c.latency or c.jitter:
+            time.sleep(c.latency + (self.rng.uniform(0, c.jitter) if c.jitter else 0))
+
+    def book_index(self, book_id):
+        links = ''.join(
+            f'<dd class="list_dd"><a href="/book/{book_id}/{n}.html">第{n + 1}章</a></dd>'
+            for n in range(self.config.chapters)
+        )
+        return f'<html><body><div class="listmain"><dl>{links}</dl></div></body></html>'
+
+    def chapter(self, book_id, n):
+        paragraph = '&nbsp;&nbsp;&nbsp;&nbsp;他走进房间，看见窗外的雨一直下个不停。' * 3
+        body = '<br><br>'.join(paragraph for _ in range(self.config.paragraphs))
+        return (f'<html><body><div class="book_con"><h1>第{n + 1}章 标题{book_id}-{n}</h1>'
+                f'<div id="zoom">{body}<br><br><br><br></div></div></body></html>')
+
+    def gallery(self, gallery_id):
+        images = ''.join(
+            f'<figure><img src="/img/{gallery_id}/{n:04d}.jpg"></figure>'
+            for n in range(self.config.images)
+        )
+        return (f'<html><body><h1 class="tdb-title-text">gallery_{gallery_id}</h1>'
+                f'<div id="tdi_78"><div><div>header</div><div>{images}</div></div></div>'
+                f'</body></html>')
+
+    def reservation_invalid(self):
+        with self.lock:
+            return self.rng.random() < self.config.invalid_rate
+
+    def reservation(self):
+        ok = self.rng.random() < self.config.success_rate
+        return {'ok': ok, 'code': '0000' if ok else '9999',
+                'msg': '预约成功' if ok else '暂无可预约号源', 'data': None}
+
+
+def make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body, content_type='text/html; charset=utf-8', etag=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            if etag:
+                self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            site.delay()
+            status = site.fault()
+            if status is not None:
+                self._send(status, b'error')
+                return
+
+            parts = [p for p in urlparse(self.path).path.split('/') if p]
+            if len(parts) == 2 and parts[0] == 'book':
+                self._send(200, site.book_index(parts[1]).encode('utf-8'))
+            elif len(parts) == 3 and parts[0] == 'book' and parts[2].endswith('.html'):
+                self._send(200, site.chapter(parts[1], int(parts[2][:-5])).encode('utf-8'))
+            elif len(parts) == 2 and parts[0] == 'gallery':
+                self._send(200, site.gallery(parts[1]).encode('utf-8'))
+            elif len(parts) == 3 and parts[0] == 'img':
+                if self.headers.get('If-None-Match') == site.image_etag:
+                    self._send(304, b'', etag=site.image_etag)
+                else:
+                    self._send(200, site.image_body, 'image/jpeg', etag=site.image_etag)
+            elif parts[-1:] == ['add.do'] and site.reservation_invalid():
+                self._send(200, '<html><body>请先登录</body></html>'.encode('utf-8'))
+            elif parts[-1:] == ['add.do']:
+                body = json.dumps(site.reservation(), ensure_ascii=False).encode('utf-8')
+                self._send(200, body, 'application/json; charset=utf-8')
+            else:
+                self._send(404, b'not found')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# 代理不转发的逐跳首部
+HOP_HEADERS = {'connection', 'proxy-connection', 'keep-alive', 'proxy-authorization',
+               'proxy-authenticate', 'te', 'trailers', 'transfer-encoding', 'upgrade', 'content-length'}
+
+
+class StandinProxy(object):
+    """转发代理的状态：前 ban_requests 个请求返回 ban_status，之后正常转发"""
+
+    def __init__(self, ban_requests=0, ban_status=403):
+        self.ban_requests = ban_requests
+        self.ban_status = ban_status
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.banned = 0
+        self.forwarded = 0
+
+    def should_ban(self):
+        with self.lock:
+            self.requests += 1
+            if self.requests <= self.ban_requests:
+                self.banned += 1
+                return True
+            self.forwarded += 1
+            return False
+
+
+def make_proxy_handler(proxy):
+    class ProxyHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body, headers=()):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not url.netloc:
+                self._send(400, b'absolute URL required')
+                return
+            if proxy.should_ban():
+                self._send(proxy.ban_status, b'banned')
+                return
+            headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS}
+            conn = http.client.HTTPConnection(url.netloc, timeout=30)
+            try:
+                conn.request('GET', url.path + (f'?{url.query}' if url.query else ''), headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except OSError as e:
+                self._send(502, str(e).encode('utf-8'))
+                return
+            finally:
+                conn.close()
+            self._send(response.status, body,
+                       [(k, v) for k, v in response.getheaders() if k.lower() not in HOP_HEADERS])
+
+        def log_message(self, format, *args):
+            pass
+
+    return ProxyHandler
+
+
+def serve_proxy(proxy, host='127.0.0.1', port=0):
+    """启动转发代理，返回 server（proxy 为 StandinProxy，可读取请求计数）"""
+    server = ThreadingHTTPServer((host, port), make_proxy_handler(proxy))
+    server.daemon_threads = True
+    return server
+
+
+def serve(config, host='127.0.0.1', port=0):
+    """启动模拟站点，返回 server（server.server_port 为实际端口）"""
+    server = ThreadingHTTPServer((host, port), make_handler(StandinSite(config)))
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地模拟站点')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--chapters', type=int, default=200)
+    parser.add_argument('--paragraphs', type=int, default=30)
+    parser.add_argument('--images', type=int, default=50)
+    parser.add_argument('--image-size', type=int, default=200 * 1024)
+    parser.add_argument('--latency', type=float, default=0.0, help='固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 500 的概率')
+    parser.add_argument('--burst-every', type=int, default=0, help='每隔多少个请求出现一次 429 突发')
+    parser.add_argument('--burst-length', type=int, default=0, help='429 突发持续的请求数')
+    parser.add_argument('--success-rate', type=float, default=0.0, help='预约接口成功概率')
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help='预约接口返回非 JSON 页面的概率')
+    parser.add_argument('--proxy', action='store_true', help='启动转发代理而不是模拟站点')
+    parser.add_argument('--ban-requests', type=int, default=0, help='代理模式：前多少个请求返回封禁状态码')
+    parser.add_argument('--ban-status', type=int, default=403, help='代理模式：封禁时的状态码')
+    args = parser.parse_args(argv)
+
+    if args.proxy:
+        server = serve_proxy(StandinProxy(args.ban_requests, args.ban_status), args.host, args.port)
+        print(f'转发代理已启动: http://{args.host}:{server.server_port}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    config = SiteConfig(
+        chapters=args.chapters, paragraphs=args.paragraphs, images=args.images,
+        image_size=args.image_size, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, burst_every=args.burst_every,
+        burst_length=args.burst_length, success_rate=args.success_rate, invalid_rate=args.invalid_rate,
+    )
+    server = serve(config, args.host, args.port)
+    print(f'模拟站点已启动: http://{args.host}:{server.server_port}/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+# 共享爬取队列（frontier）
+#
+# 调度队列和去重指纹保存在外部存储中（SQLite 文件或 Redis 兼容服务），
+# 多个爬虫进程可以从同一个队列取请求而不会重复抓取。
+# 超大规模爬取时可配合 BloomDupeFilter 使用，内存占用不随队列增长。
+# 用法见 settings.py 中的 FRONTIER_* / DUPEFILTER_BLOOM_* 配置。
+
+from yuemiao_scraper.frontier.stores import open_store
+from yuemiao_scraper.frontier.scheduler import FrontierScheduler
+from yuemiao_scraper.frontier.dupefilter import FrontierDupeFilter
+from yuemiao_scraper.frontier.bloom import BloomFilter, BloomDupeFilter
+
+__all__ = ['open_store', 'FrontierScheduler', 'FrontierDupeFilter', 'BloomFilter', 'BloomDupeFilter']
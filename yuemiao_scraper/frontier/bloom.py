@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import math
+import mmap
+import os
+import struct
+
+from scrapy.dupefilters import RFPDupeFilter
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter(object):
+    """
+    以文件为存储的布隆过滤器，通过 mmap 访问，内存占用固定为位数组大小，
+    进程退出后保留在磁盘上，下次打开继续使用
+    """
+
+    MAGIC = b'YMBF'
+    # 文件头：魔数、位数 m、哈希次数 k、容量、已加入数量、误判率
+    HEADER = struct.Struct('<4sQIQQd')
+
+    def __init__(self, path, capacity=10000000, error_rate=0.001):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if os.path.exists(path) and os.path.getsize(path) >= self.HEADER.size:
+            with open(path, 'rb') as f:
+                magic, m, k, capacity, count, error_rate = self.HEADER.unpack(f.read(self.HEADER.size))
+            if magic != self.MAGIC:
+                raise ValueError(f'不是有效的布隆过滤器文件: {path}')
+        else:
+            # m = -n·ln(p) / (ln2)^2，k = m/n·ln2
+            m = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+            k = max(1, int(round(m / capacity * math.log(2))))
+            count = 0
+            with open(path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, m, k, capacity, count, error_rate))
+                f.truncate(self.HEADER.size + (m + 7) // 8)
+
+        self.m, self.k = m, k
+        self.capacity, self.count, self.error_rate = capacity, count, error_rate
+        self.file = open(path, 'r+b')
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        self.offset = self.HEADER.size
+
+    def _positions(self, fp):
+        # 双重哈希：请求指纹本身就是均匀分布的摘要，直接切出两个 64 位整数
+        h1 = int.from_bytes(fp[:8], 'little')
+        h2 = int.from_bytes(fp[8:16], 'little') | 1
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def __contains__(self, fp):
+        mm, offset = self.mm, self.offset
+        return all(mm[offset + (p >> 3)] & (1 << (p & 7)) for p in self._positions(fp))
+
+    def add(self, fp):
+        """加入指纹，返回 True 表示之前不存在"""
+        mm, offset = self.mm, self.offset
+        added = False
+        for p in self._positions(fp):
+            i = offset + (p >> 3)
+            bit = 1 << (p & 7)
+            byte = mm[i]
+            if not byte & bit:
+                mm[i] = byte | bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def flush(self):
+        self.mm[:self.HEADER.size] = self.HEADER.pack(
+            self.MAGIC, self.m, self.k, self.capacity, self.count, self.error_rate)
+        self.mm.flush()
+
+    def close(self):
+        self.flush()
+        self.mm.close()
+        self.file.close()
+
+
+class BloomDupeFilter(RFPDupeFilter):
+    """
+    使用布隆过滤器的去重过滤器，内存占用与已抓取请求数无关
+
+    - DUPEFILTER_BLOOM_CAPACITY：预计的请求数量
+    - DUPEFILTER_BLOOM_ERROR_RATE：容量内的误判率（误判的请求会被当作重复而跳过）
+    - 过滤器保存在 DUPEFILTER_BLOOM_DIR/<spider>.bloom，暂停后再次运行会继续使用
+    """
+
+    def __init__(self, path, capacity=10000000, error_rate=0.001, debug=False, fingerprinter=None):
+        super().__init__(debug=debug, fingerprinter=fingerprinter)
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = None
+        self.warned_full = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        directory = settings.get('DUPEFILTER_BLOOM_DIR') or settings.get('JOBDIR') or 'crawls'
+        return cls(
+            os.path.join(directory, f'{crawler.spider.name}.bloom'),
+            capacity=settings.getint('DUPEFILTER_BLOOM_CAPACITY', 10000000),
+            error_rate=settings.getfloat('DUPEFILTER_BLOOM_ERROR_RATE', 0.001),
+            debug=settings.getbool('DUPEFILTER_DEBUG'),
+            fingerprinter=crawler.request_fingerprinter,
+        )
+
+    def open(self):
+        self.bloom = BloomFilter(self.path, self.capacity, self.error_rate)
+        if self.bloom.count:
+            logger.info('已加载布隆过滤器 %s（%d 个指纹）', self.path, self.bloom.count)
+
+    def request_seen(self, request):
+        added = self.bloom.add(self.fingerprinter.fingerprint(request))
+        if added and not self.warned_full and self.bloom.count > self.bloom.capacity:
+            logger.warning('布隆过滤器已超过设计容量 %d，误判率会上升，请调大 DUPEFILTER_BLOOM_CAPACITY',
+                           self.bloom.capacity)
+            self.warned_full = True
+        return not added
+
+    def close(self, reason):
+        if self.bloom is not None:
+            self.bloom.close()
+            self.bloom = None
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+from scrapy.dupefilters import RFPDupeFilter
+
+from yuemiao_scraper.frontier.stores import open_store
+
+
+class FrontierDupeFilter(RFPDupeFilter):
+    """指纹保存在共享存储中的去重过滤器，多个进程共用同一份指纹集合"""
+
+    def __init__(self, store_url, key, debug=False, fingerprinter=None):
+        super().__init__(debug=debug, fingerprinter=fingerprinter)
+        self.store_url = store_url
+        self.key = key
+        self.store = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            settings.get('FRONTIER_STORE_URL'),
+            settings.get('FRONTIER_KEY', '%(spider)s') % {'spider': crawler.spider.name},
+            debug=settings.getbool('DUPEFILTER_DEBUG'),
+            fingerprinter=crawler.request_fingerprinter,
+        )
+
+    def open(self):
+        self.store = open_store(self.store_url)
+
+    def request_seen(self, request):
+        fp = self.fingerprinter.fingerprint(request)
+        return not self.store.add_seen(self.key, fp)
+
+    def close(self, reason):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import pickle
+import time
+
+from scrapy import signals
+from scrapy.core.scheduler import BaseScheduler
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.misc import load_object
+from scrapy.utils.request import request_from_dict
+
+from yuemiao_scraper.frontier.stores import open_store
+
+logger = logging.getLogger(__name__)
+
+
+def build_dupefilter(dupefilter_cls, crawler):
+    """创建 DUPEFILTER_CLASS 实例：Scrapy 2.12+ 用 build_from_crawler，旧版本按 from_crawler / from_settings"""
+    try:
+        from scrapy.utils.misc import build_from_crawler
+    except ImportError:
+        build_from_crawler = None
+    if build_from_crawler is not None:
+        return build_from_crawler(dupefilter_cls, crawler)
+    if hasattr(dupefilter_cls, 'from_crawler'):
+        return dupefilter_cls.from_crawler(crawler)
+    if hasattr(dupefilter_cls, 'from_settings'):
+        return dupefilter_cls.from_settings(crawler.settings)
+    return dupefilter_cls()
+
+
+class FrontierScheduler(BaseScheduler):
+    """
+    使用共享存储作为请求队列的调度器
+
+    - 请求按 priority 从高到低出队，同优先级先进先出
+    - 去重由 DUPEFILTER_CLASS 决定，配合 FrontierDupeFilter 可在多个进程间去重
+    - FRONTIER_PERSIST=False 时，最后一个结束的进程清空队列和指纹（存储中记录使用同一队列的进程数；
+      异常退出的进程不会减少计数，这时队列会保留，可用 FRONTIER_FLUSH_ON_START 清空）
+    - FRONTIER_IDLE_TIMEOUT 秒内仍有其他进程在往队列里放请求时，爬虫不会提前关闭
+    """
+
+    def __init__(self, crawler, store_url, key, dupefilter, persist=True,
+                 flush_on_start=False, idle_timeout=0.0):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.store_url = store_url
+        self.key = key
+        self.df = dupefilter
+        self.persist = persist
+        self.flush_on_start = flush_on_start
+        self.idle_timeout = idle_timeout
+        self.store = None
+        self.spider = None
+        self.last_activity = time.time()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        dupefilter_cls = load_object(settings['DUPEFILTER_CLASS'])
+        s = cls(
+            crawler,
+            store_url=settings.get('FRONTIER_STORE_URL'),
+            key=settings.get('FRONTIER_KEY', '%(spider)s') % {'spider': crawler.spider.name},
+            dupefilter=build_dupefilter(dupefilter_cls, crawler),
+            persist=settings.getbool('FRONTIER_PERSIST', True),
+            flush_on_start=settings.getbool('FRONTIER_FLUSH_ON_START'),
+            idle_timeout=settings.getfloat('FRONTIER_IDLE_TIMEOUT', 0.0),
+        )
+        crawler.signals.connect(s.spider_idle, signal=signals.spider_idle)
+        return s
+
+    def open(self, spider):
+        self.spider = spider
+        self.store = open_store(self.store_url)
+        if self.flush_on_start:
+            self.store.clear(self.key, workers=True)
+        self.store.join(self.key)
+        pending = self.store.size(self.key)
+        if pending:
+            logger.info('从共享队列恢复 %d 个待处理请求', pending, extra={'spider': spider})
+        return self.df.open()
+
+    def close(self, reason):
+        remaining = self.store.leave(self.key)
+        if not self.persist and remaining == 0:
+            # 其他进程还在使用队列和指纹时不清空
+            self.store.clear(self.key)
+        self.store.close()
+        return self.df.close(reason)
+
+    def has_pending_requests(self):
+        return self.store.has_pending(self.key)
+
+    def enqueue_request(self, request):
+        if not request.dont_filter and self.df.request_seen(request):
+            self.df.log(request, self.spider)
+            return False
+        data = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+        self.store.push(self.key, request.priority, data)
+        self.stats.inc_value('scheduler/enqueued/frontier')
+        self.stats.inc_value('scheduler/enqueued')
+        return True
+
+    def next_request(self):
+        data = self.store.pop(self.key)
+        if data is None:
+            return None
+        self.last_activity = time.time()
+        self.stats.inc_value('scheduler/dequeued/frontier')
+        self.stats.inc_value('scheduler/dequeued')
+        return request_from_dict(pickle.loads(data))
+
+    def spider_idle(self, spider):
+        # 其他进程可能还在解析页面、即将放入新请求，稍等一会再关闭
+        if time.time() - self.last_activity < self.idle_timeout:
+            raise DontCloseSpider
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+# 队列存储后端
+#
+#   sqlite:///frontier.db      单机多进程共享，使用 WAL 模式
+#   redis://localhost:6379/0   多机共享，需要安装 redis 包
+
+import os
+import sqlite3
+
+
+def open_store(url):
+    """根据 URL 创建存储后端"""
+    if url.startswith('sqlite:///'):
+        # sqlite:///相对路径 或 sqlite:////绝对路径
+        return SQLiteStore(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStore(url)
+    raise ValueError(f"不支持的队列存储地址: {url}")
+
+
+class SQLiteStore(object):
+    """基于 SQLite 文件的优先级队列和指纹集合，适合同一台机器上的多个进程"""
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: 手动控制事务，保证出队操作的原子性
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS queue ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' key TEXT NOT NULL,'
+            ' priority INTEGER NOT NULL,'
+            ' data BLOB NOT NULL)'
+        )
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS queue_order ON queue (key, priority DESC, id)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS seen ('
+            ' key TEXT NOT NULL,'
+            ' fp BLOB NOT NULL,'
+            ' PRIMARY KEY (key, fp)) WITHOUT ROWID'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS workers ('
+            ' key TEXT PRIMARY KEY,'
+            ' count INTEGER NOT NULL)'
+        )
+
+    def push(self, key, priority, data):
+        self.conn.execute(
+            'INSERT INTO queue (key, priority, data) VALUES (?, ?, ?)',
+            (key, priority, data),
+        )
+
+    def pop(self, key):
+        # BEGIN IMMEDIATE 先拿写锁，避免两个进程取到同一条请求（锁等待时间由 timeout 控制）
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute(
+                'SELECT id, data FROM queue WHERE key = ?'
+                ' ORDER BY priority DESC, id LIMIT 1',
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            self.conn.execute('DELETE FROM queue WHERE id = ?', (row[0],))
+            self.conn.execute('COMMIT')
+            return row[1]
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def size(self, key):
+        return self.conn.execute(
+            'SELECT COUNT(*) FROM queue WHERE key = ?', (key,)
+        ).fetchone()[0]
+
+    def has_pending(self, key):
+        # 只查是否存在，避免大队列上的 COUNT(*) 全量扫描
+        return self.conn.execute(
+            'SELECT EXISTS (SELECT 1 FROM queue WHERE key = ?)', (key,)
+        ).fetchone()[0] == 1
+
+    def add_seen(self, key, fp):
+        """记录指纹，返回 True 表示是新指纹"""
+        cursor = self.conn.execute(
+            'INSERT OR IGNORE INTO seen (key, fp) VALUES (?, ?)', (key, fp)
+        )
+        return cursor.rowcount == 1
+
+    def join(self, key):
+        """登记一个使用该队列的进程，返回当前进程数"""
+        self.conn.execute(
+            'INSERT INTO workers (key, count) VALUES (?, 1)'
+            ' ON CONFLICT(key) DO UPDATE SET count = count + 1', (key,)
+        )
+        return self.workers(key)
+
+    def leave(self, key):
+        """注销一个进程，返回剩余进程数"""
+        self.conn.execute('UPDATE workers SET count = MAX(count - 1, 0) WHERE key = ?', (key,))
+        return self.workers(key)
+
+    def workers(self, key):
+        row = self.conn.execute('SELECT count FROM workers WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else 0
+
+    def clear(self, key, workers=False):
+        self.conn.execute('DELETE FROM queue WHERE key = ?', (key,))
+        self.conn.execute('DELETE FROM seen WHERE key = ?', (key,))
+        if workers:
+            self.conn.execute('DELETE FROM workers WHERE key = ?', (key,))
+
+    def close(self):
+        self.conn.close()
+
+
+class RedisStore(object):
+    """基于 Redis 有序集合的优先级队列，适合多台机器共享"""
+
+    # 每条请求前加 16 位序号，同优先级按入队顺序出队，且相同内容不会被合并
+    SEQ_WIDTH = 16
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("使用 Redis 队列需要先安装 redis：pip install redis")
+        self.server = redis.Redis.from_url(url)
+
+    def push(self, key, priority, data):
+        seq = self.server.incr(f'{key}:seq')
+        member = b'%016x' % seq + data
+        self.server.zadd(f'{key}:queue', {member: -priority})
+
+    def pop(self, key):
+        result = self.server.zpopmin(f'{key}:queue')
+        if not result:
+            return None
+        member, _ = result[0]
+        return member[self.SEQ_WIDTH:]
+
+    def size(self, key):
+        return self.server.zcard(f'{key}:queue')
+
+    def has_pending(self, key):
+        return self.size(key) > 0
+
+    def add_seen(self, key, fp):
+        return self.server.sadd(f'{key}:seen', fp) == 1
+
+    def join(self, key):
+        return self.server.incr(f'{key}:workers')
+
+    def leave(self, key):
+        remaining = self.server.decr(f'{key}:workers')
+        if remaining < 0:
+            self.server.set(f'{key}:workers', 0)
+            remaining = 0
+        return remaining
+
+    def workers(self, key):
+        return int(self.server.get(f'{key}:workers') or 0)
+
+    def clear(self, key, workers=False):
+        self.server.delete(f'{key}:queue', f'{key}:seq', f'{key}:seen')
+        if workers:
+            self.server.delete(f'{key}:workers')
+
+    def close(self):
+        self.server.close()
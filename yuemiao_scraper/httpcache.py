@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+重复抓取时的 HTTP 缓存策略（HTTPCACHE_POLICY = 'yuemiao_scraper.httpcache.RecrawlCachePolicy'）
+
+按请求的 meta['cache_kind'] 区分：
+- index：书籍目录页，每次都重新下载，不缓存
+- chapter：章节页，最后修改（没有 Last-Modified 时为缓存时的 Date）超过
+  HTTPCACHE_CHAPTER_IMMUTABLE_AGE 秒后视为不会再变，直接使用缓存；未到时间的用
+  ETag / Last-Modified 重新验证，服务器不支持时重新下载，内容未变则保留原来的缓存
+- gallery / image：图集页和图片，按 RFC2616 缓存，过期后用 ETag / Last-Modified 重新验证
+- 没有 cache_kind 的请求（如预约接口）不缓存
+
+这样重新抓取一本书时，只有目录页和新增（或仍在修改期内）的章节需要下载。
+"""
+from time import time
+
+from scrapy.extensions.httpcache import RFC2616Policy, rfc1123_to_epoch
+
+# 会被缓存的 cache_kind
+CACHED_KINDS = ('chapter', 'gallery', 'image')
+
+
+def cache_kind(request):
+    return request.meta.get('cache_kind')
+
+
+class RecrawlCachePolicy(RFC2616Policy):
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        # 章节页的不可变期限（秒），默认 7 天，0 为缓存后立即视为不变
+        self.chapter_immutable_age = settings.getint('HTTPCACHE_CHAPTER_IMMUTABLE_AGE', 7 * 24 * 3600)
+
+    def should_cache_request(self, request):
+        if cache_kind(request) not in CACHED_KINDS:
+            return False
+        return super().should_cache_request(request)
+
+    def should_cache_response(self, response, request):
+        if cache_kind(request) == 'chapter' and response.status == 200:
+            # 章节页通常没有过期时间和验证字段，也要缓存，靠不可变期限判断是否使用
+            return b'no-store' not in self._parse_cachecontrol(response)
+        return super().should_cache_response(response, request)
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        if cache_kind(request) == 'chapter':
+            if b'no-cache' not in self._parse_cachecontrol(request) and \
+                    self.chapter_age(cachedresponse) >= self.chapter_immutable_age:
+                return True
+        # 未过期时直接使用；过期时带上 If-None-Match / If-Modified-Since 重新验证
+        return super().is_cached_response_fresh(cachedresponse, request)
+
+    def is_cached_response_valid(self, cachedresponse, response, request):
+        if super().is_cached_response_valid(cachedresponse, response, request):
+            return True
+        # 服务器不支持条件请求时比较内容，未变则保留原缓存，不可变期限从首次缓存算起
+        return (cache_kind(request) == 'chapter' and response.status == 200
+                and response.body == cachedresponse.body)
+
+    def chapter_age(self, cachedresponse, now=None):
+        """章节页最后修改至今的秒数：优先用 Last-Modified，其次为缓存响应的 Date"""
+        now = time() if now is None else now
+        headers = cachedresponse.headers
+        since = rfc1123_to_epoch(headers.get(b'Last-Modified')) or rfc1123_to_epoch(headers.get(b'Date'))
+        if not since:
+            return 0
+        return max(0, now - since)
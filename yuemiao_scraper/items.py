@@ -12,3 +12,34 @@ class YuemiaoScraperItem(scrapy.Item):
     # define the fields for your item here like:
     # name = scrapy.Field()
     pass
+
+
+class ChapterItem(scrapy.Item):
+    # BookSpider 抓取的章节
+    index = scrapy.Field()    # 章节序号，从 0 开始
+    title = scrapy.Field()
+    content = scrapy.Field()
+    url = scrapy.Field()
+
+
+class ImageItem(scrapy.Item):
+    # ImageSpider 下载的图片，body 由 ImageStorePipeline 写入 path 后清空
+    url = scrapy.Field()
+    path = scrapy.Field()
+    body = scrapy.Field()
+    size = scrapy.Field()
+    transcoded = scrapy.Field()  # ImageTranscodePipeline 生成的文件，{配置名: 路径}
+
+
+class ReservationItem(scrapy.Item):
+    # yuemiaoSpider 预约接口 add.do 的返回结果
+    url = scrapy.Field()
+    status = scrapy.Field()   # HTTP 状态码
+    ok = scrapy.Field()
+    code = scrapy.Field()
+    msg = scrapy.Field()
+    data = scrapy.Field()
+    # 多账号模式（-a config=...）下才有
+    account = scrapy.Field()
+    linkman = scrapy.Field()
+    latency = scrapy.Field()  # 下载耗时（秒）
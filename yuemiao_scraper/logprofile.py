@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+生产环境日志配置（LOG_PROFILE = 'production'）
+
+启用后由 LogProfile 扩展接管 Scrapy 的根日志处理器：
+- LOG_LEVEL 改为 LOG_PROFILE_LEVEL、COOKIES_DEBUG 关闭（命令行 -s 显式指定的除外）
+- 日志级别以下的调用在 logger.isEnabledFor 处直接返回，不再创建日志记录
+- 按 logger 名称抽样（LOG_PROFILE_SAMPLING），WARNING 及以上始终保留
+- 日志先放入队列，由单独的线程格式化并写出，爬虫线程不做磁盘/终端 I/O
+- 输出为每行一个 JSON 事件（LOG_PROFILE_FORMAT = 'text' 时为普通文本），
+  超过 LOG_PROFILE_MAX_LENGTH 的消息被截断
+
+单个爬虫的日志级别不用改代码即可调整：
+    scrapy crawl image_spider -a log_level=DEBUG
+    scrapy crawl yuemiao -s LOG_PROFILE_SPIDER_LEVELS='{"yuemiao": "DEBUG"}'
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.log import get_scrapy_root_handler
+
+logger = logging.getLogger(__name__)
+
+# 接管时调整级别的 logger：根 logger 和 Scrapy 默认配置为 DEBUG 的 scrapy
+LEVEL_LOGGERS = ('', 'scrapy')
+# 日志参数为这些类型时，推迟到写出线程再格式化；其他对象之后可能被修改，入队前先格式化
+PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+def truncate(text, limit=2000):
+    """截断过长的文本，并注明截掉的字符数"""
+    text = str(text)
+    if limit and len(text) > limit:
+        return f'{text[:limit]}…（截断，共 {len(text)} 字符）'
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志一行 JSON：时间、级别、logger、消息，有异常时附带 traceback"""
+
+    def __init__(self, max_length=2000):
+        super().__init__()
+        self.max_length = max_length
+
+    def format(self, record):
+        event = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+                    + '.%03d' % record.msecs,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': truncate(record.getMessage(), self.max_length),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            event['exc'] = record.exc_text
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class TruncatingFormatter(logging.Formatter):
+    """普通文本格式，只截断消息部分"""
+
+    def __init__(self, fmt=None, datefmt=None, max_length=2000):
+        super().__init__(fmt, datefmt)
+        self.max_length = max_length
+
+    def format(self, record):
+        record = copy.copy(record)
+        record.msg = truncate(record.getMessage(), self.max_length)
+        record.args = None
+        return super().format(record)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按 logger 名称前缀抽样，rates 如 {'scrapy.core.scraper': 0.1}：每 10 条保留 1 条，
+    0 为全部丢弃；匹配最长的前缀，WARNING 及以上不抽样。
+    每条累加 rate，累计满 1 时保留一条，任意比例（如 0.3）都能按比例保留
+    """
+
+    def __init__(self, rates, stats=None):
+        super().__init__()
+        self.rates = {name: float(rate) for name, rate in rates.items()}
+        self.stats = stats
+        self._credits = {}  # 前缀 → 累计的 rate
+        self._cache = {}  # logger 名称 → 匹配的前缀（没有时为 None）
+
+    def _match(self, name):
+        if name not in self._cache:
+            prefixes = [p for p in self.rates if name == p or name.startswith(p + '.')]
+            self._cache[name] = max(prefixes, key=len) if prefixes else None
+        return self._cache[name]
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix = self._match(record.name)
+        if prefix is None:
+            return True
+        rate = self.rates[prefix]
+        if rate >= 1:
+            return True
+        credit = self._credits.get(prefix, 0.0) + rate
+        keep = credit >= 1 - 1e-9  # 累加 0.1 十次略小于 1
+        self._credits[prefix] = credit - 1 if keep else credit
+        if keep:
+            return True
+        if self.stats is not None:
+            self.stats.inc_value('log_profile/sampled_out')
+        return False
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    只把日志记录放入队列，格式化和写出在 QueueListener 的线程中完成；
+    队列满时丢弃并计数，不阻塞爬虫
+    """
+
+    def __init__(self, log_queue, stats=None):
+        super().__init__(log_queue)
+        self.stats = stats
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        args = record.args
+        if isinstance(args, dict):
+            values = args.values()
+        else:
+            values = args or ()
+        if not all(isinstance(v, PLAIN_TYPES) for v in values):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.stats is not None:
+                self.stats.inc_value('log_profile/dropped')
+
+
+class LogProfile:
+    """
+    爬虫打开（spider_opened）时替换 Scrapy 的根日志处理器，引擎停止（engine_stopped）时还原；
+    启动阶段的日志（启用的组件、覆盖的设置等）仍按原格式输出
+    """
+
+    def __init__(self, level='INFO', fmt='json', max_length=2000, sampling=None,
+                 queue_size=10000, spider_levels=None, stats=None):
+        self.level = level.upper() if isinstance(level, str) else level
+        self.fmt = fmt
+        self.max_length = max_length
+        self.sampling = sampling or {}
+        self.queue_size = queue_size
+        self.spider_levels = spider_levels or {}
+        self.stats = stats
+        self.settings = None
+        self.target = None
+        self.saved_formatter = None
+        self.handler = None
+        self.listener = None
+        self.saved_levels = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        profile = settings.get('LOG_PROFILE')
+        if not profile:
+            raise NotConfigured('LOG_PROFILE 未设置')
+        if profile != 'production':
+            raise NotConfigured(f'未知的 LOG_PROFILE: {profile}')
+
+        # 扩展在设置冻结前创建，-s LOG_PROFILE=production 和环境变量一样生效；
+        # 以 project 优先级覆盖，命令行 -s 显式指定的仍然优先
+        for name, value in (('LOG_LEVEL', settings.get('LOG_PROFILE_LEVEL', 'INFO')),
+                            ('COOKIES_DEBUG', False)):
+            settings.set(name, value, priority='project')
+
+        ext = cls(
+            level=settings.get('LOG_PROFILE_LEVEL', 'INFO'),
+            fmt=settings.get('LOG_PROFILE_FORMAT', 'json'),
+            max_length=settings.getint('LOG_PROFILE_MAX_LENGTH', 2000),
+            sampling=settings.getdict('LOG_PROFILE_SAMPLING'),
+            queue_size=settings.getint('LOG_PROFILE_QUEUE_SIZE', 10000),
+            spider_levels=settings.getdict('LOG_PROFILE_SPIDER_LEVELS'),
+            stats=crawler.stats,
+        )
+        ext.settings = settings
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.engine_stopped, signal=signals.engine_stopped)
+        return ext
+
+    def make_formatter(self, settings):
+        if self.fmt == 'json':
+            return JsonFormatter(self.max_length)
+        return TruncatingFormatter(settings.get('LOG_FORMAT'), settings.get('LOG_DATEFORMAT'),
+                                   max_length=self.max_length)
+
+    def install(self, settings):
+        root = logging.getLogger()
+        self.target = get_scrapy_root_handler()
+        if self.target is None:
+            # 不是通过 scrapy crawl / CrawlerProcess 运行时没有根处理器，输出到 stderr
+            self.target = logging.StreamHandler()
+        else:
+            root.removeHandler(self.target)
+        self.saved_formatter = self.target.formatter
+        self.target.setFormatter(self.make_formatter(settings))
+
+        log_queue = queue.Queue(self.queue_size if self.queue_size > 0 else -1)
+        self.handler = AsyncQueueHandler(log_queue, stats=self.stats)
+        if self.sampling:
+            self.handler.addFilter(SamplingFilter(self.sampling, stats=self.stats))
+        self.listener = logging.handlers.QueueListener(log_queue, self.target, respect_handler_level=False)
+        self.listener.start()
+        root.addHandler(self.handler)
+
+        # 级别以下的日志在 isEnabledFor 处返回，不创建记录
+        for name in LEVEL_LOGGERS:
+            self.saved_levels[name] = logging.getLogger(name).level
+            logging.getLogger(name).setLevel(self.level)
+
+    def spider_opened(self, spider):
+        # Crawler.crawl 在创建扩展之后会重新安装根处理器，所以在爬虫打开时才接管
+        self.install(self.settings)
+        level = getattr(spider, 'log_level', None) or self.spider_levels.get(spider.name)
+        if level:
+            self.saved_levels.setdefault(spider.name, logging.getLogger(spider.name).level)
+            logging.getLogger(spider.name).setLevel(level.upper())
+            logger.info('爬虫 %s 的日志级别: %s', spider.name, level.upper())
+
+    def engine_stopped(self):
+        # 停止时写出队列中剩余的日志，再把根处理器还原给 Scrapy
+        if self.listener is None:
+            return
+        root = logging.getLogger()
+        root.removeHandler(self.handler)
+        self.listener.stop()
+        if self.target is get_scrapy_root_handler():
+            self.target.setFormatter(self.saved_formatter)
+            root.addHandler(self.target)
+        for name, level in self.saved_levels.items():
+            logging.getLogger(name).setLevel(level)
+        self.saved_levels.clear()
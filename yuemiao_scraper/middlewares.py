@@ -5,7 +5,10 @@
 # See documentation in:
 # https://doc.scrapy.org/en/latest/topics/spider-middleware.html
 
+import time
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
 
 
 class YuemiaoScraperSpiderMiddleware(object):
@@ -78,6 +81,12 @@ class YuemiaoScraperDownloaderMiddleware(object):
         # - or return a Request object
         # - or raise IgnoreRequest: process_exception() methods of
         #   installed downloader middleware will be called
+
+        # 爬虫可定义 should_download(request)：请求在调度队列中等待期间变得不再需要时，
+        # 在真正发出前放弃（如 yuemiao 中已预约成功的就诊人）
+        should_download = getattr(spider, 'should_download', None)
+        if should_download is not None and not should_download(request):
+            raise IgnoreRequest(f'请求已不再需要: {request.url}')
         return None
 
     def process_response(self, request, response, spider):
@@ -101,3 +110,189 @@ class YuemiaoScraperDownloaderMiddleware(object):
 
     def spider_opened(self, spider):
         spider.logger.info('Spider opened: %s' % spider.name)
+
+
+class ProxyState(object):
+    """单个代理的健康状态：成功率、延迟、封禁/隔离情况"""
+
+    def __init__(self, url, alpha=0.3):
+        self.url = url
+        self.alpha = alpha  # 指数滑动平均的权重
+        self.success_rate = 1.0
+        self.latency = None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.bans = 0
+        self.consecutive_failures = 0
+        self.strikes = 0  # 连续被隔离的次数，用于指数退避
+        self.quarantined_until = 0.0
+
+    def is_available(self, now):
+        return now >= self.quarantined_until
+
+    def score(self):
+        # 成功率越高、延迟越低、在途请求越少，得分越高
+        latency = self.latency if self.latency is not None else 1.0
+        return self.success_rate / (1.0 + latency) / (1.0 + self.in_flight)
+
+    def record_success(self, latency):
+        self.success_rate += self.alpha * (1.0 - self.success_rate)
+        if latency is not None:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.alpha * (latency - self.latency)
+        self.consecutive_failures = 0
+        self.strikes = 0
+
+    def record_failure(self):
+        self.success_rate -= self.alpha * self.success_rate
+        self.failures += 1
+        self.consecutive_failures += 1
+
+    def quarantine(self, now, base, maximum):
+        self.strikes += 1
+        backoff = min(base * 2 ** (self.strikes - 1), maximum)
+        self.quarantined_until = now + backoff
+        self.consecutive_failures = 0
+        return backoff
+
+
+class ProxyPoolMiddleware(object):
+    """
+    代理池下载中间件
+
+    - 代理来源：PROXY_POOL_FILE（每行一个，# 开头为注释）和 PROXY_POOL_LIST
+    - 每个请求挑选当前得分最高的可用代理，并把代理地址作为 download_slot，
+      使 DOWNLOAD_DELAY / CONCURRENT_REQUESTS_PER_DOMAIN 按代理分别生效
+    - 命中 PROXY_POOL_BAN_CODES 或连续失败 PROXY_POOL_MAX_FAILURES 次的代理
+      会被隔离，隔离时间按 PROXY_POOL_BACKOFF_BASE 指数增长，上限 PROXY_POOL_BACKOFF_MAX
+    - 需要放在 RetryMiddleware(550) 之后、HttpProxyMiddleware(750) 之前
+    """
+
+    META_KEY = '_proxy_pool_proxy'
+
+    def __init__(self, proxies, stats=None, ban_codes=(403, 429), max_failures=3,
+                 backoff_base=30.0, backoff_max=600.0, max_in_flight=4):
+        self.proxies = [ProxyState(url) for url in proxies]
+        self.by_url = {p.url: p for p in self.proxies}
+        self.stats = stats
+        self.ban_codes = set(ban_codes)
+        self.max_failures = max_failures
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_in_flight = max_in_flight
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('PROXY_POOL_ENABLED'):
+            raise NotConfigured('PROXY_POOL_ENABLED 未开启')
+
+        proxies = list(settings.getlist('PROXY_POOL_LIST'))
+        proxy_file = settings.get('PROXY_POOL_FILE')
+        if proxy_file:
+            proxies.extend(cls.load_proxy_file(proxy_file))
+        proxies = [cls.normalize_proxy(p) for p in proxies]
+        # 去重并保持顺序
+        proxies = list(dict.fromkeys(p for p in proxies if p))
+        if not proxies:
+            raise NotConfigured('代理池为空，请配置 PROXY_POOL_FILE 或 PROXY_POOL_LIST')
+
+        s = cls(
+            proxies,
+            stats=crawler.stats,
+            ban_codes=[int(c) for c in settings.getlist('PROXY_POOL_BAN_CODES', [403, 429])],
+            max_failures=settings.getint('PROXY_POOL_MAX_FAILURES', 3),
+            backoff_base=settings.getfloat('PROXY_POOL_BACKOFF_BASE', 30.0),
+            backoff_max=settings.getfloat('PROXY_POOL_BACKOFF_MAX', 600.0),
+            max_in_flight=settings.getint('PROXY_POOL_MAX_IN_FLIGHT', 4),
+        )
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    @staticmethod
+    def load_proxy_file(path):
+        with open(path, encoding='utf-8') as f:
+            return [line.strip() for line in f
+                    if line.strip() and not line.strip().startswith('#')]
+
+    @staticmethod
+    def normalize_proxy(proxy):
+        proxy = proxy.strip()
+        if proxy and '://' not in proxy:
+            proxy = 'http://' + proxy
+        return proxy
+
+    def choose_proxy(self, now=None):
+        """挑选得分最高的可用代理；全部被隔离时选择最早恢复的那个"""
+        now = time.time() if now is None else now
+        available = [p for p in self.proxies if p.is_available(now)]
+        if not available:
+            return min(self.proxies, key=lambda p: p.quarantined_until)
+        # 优先选择未达到在途上限的代理
+        idle = [p for p in available if p.in_flight < self.max_in_flight]
+        return max(idle or available, key=lambda p: p.score())
+
+    def process_request(self, request, spider):
+        # 用户手动指定的代理不做处理
+        if 'proxy' in request.meta and self.META_KEY not in request.meta:
+            return None
+
+        # 重试请求会带着上一次的代理，这里重新挑选
+        proxy = self.choose_proxy()
+        proxy.in_flight += 1
+        proxy.requests += 1
+        request.meta['proxy'] = proxy.url
+        request.meta[self.META_KEY] = proxy.url
+        request.meta['_proxy_pool_active'] = True
+        request.meta['download_slot'] = proxy.url
+        return None
+
+    def _release(self, request):
+        proxy = self.by_url.get(request.meta.get(self.META_KEY))
+        if proxy is None or not request.meta.pop('_proxy_pool_active', False):
+            return None
+        proxy.in_flight = max(proxy.in_flight - 1, 0)
+        return proxy
+
+    def _quarantine(self, proxy, spider, reason):
+        backoff = proxy.quarantine(time.time(), self.backoff_base, self.backoff_max)
+        spider.logger.warning('代理 %s 已隔离 %.0f 秒（%s）', proxy.url, backoff, reason)
+        if self.stats:
+            self.stats.inc_value('proxy_pool/quarantined', spider=spider)
+
+    def process_response(self, request, response, spider):
+        proxy = self._release(request)
+        if proxy is None:
+            return response
+
+        if response.status in self.ban_codes:
+            proxy.record_failure()
+            proxy.bans += 1
+            if self.stats:
+                self.stats.inc_value('proxy_pool/banned', spider=spider)
+            self._quarantine(proxy, spider, f'HTTP {response.status}')
+        else:
+            proxy.record_success(request.meta.get('download_latency'))
+        return response
+
+    def process_exception(self, request, exception, spider):
+        proxy = self._release(request)
+        if proxy is None:
+            return None
+
+        proxy.record_failure()
+        if self.stats:
+            self.stats.inc_value('proxy_pool/failures', spider=spider)
+        if proxy.consecutive_failures >= self.max_failures:
+            self._quarantine(proxy, spider, exception.__class__.__name__)
+        return None
+
+    def spider_closed(self, spider):
+        for p in self.proxies:
+            spider.logger.info(
+                '代理 %s：请求 %d，失败 %d，封禁 %d，成功率 %.2f，延迟 %s',
+                p.url, p.requests, p.failures, p.bans, p.success_rate,
+                f'{p.latency:.3f}s' if p.latency is not None else '-')
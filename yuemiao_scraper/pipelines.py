@@ -5,7 +5,419 @@
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: https://doc.scrapy.org/en/latest/topics/item-pipeline.html
 
+import io
+import json
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from itemadapter import ItemAdapter
+from scrapy.exceptions import NotConfigured
+from twisted.internet import defer, task, threads
+
+try:
+    from PIL import Image
+except ImportError:  # 可选依赖：pip install Pillow（AVIF 需要 Pillow 11.2+ 或 pillow-avif-plugin）
+    Image = None
+
+from yuemiao_scraper.items import ChapterItem, ImageItem
+
 
 class YuemiaoScraperPipeline(object):
     def process_item(self, item, spider):
         return item
+
+
+class SerialWriter(object):
+    """
+    在线程池中依次执行写入任务：不阻塞 reactor，同一输出的写入也不会交错
+
+    失败的写入记入 errors 和 stats 中的 errors_key，丢失的条目数（submit 的 count）记入 lost，
+    由调用方在关闭时报告
+    """
+
+    def __init__(self, logger=None, stats=None, errors_key=None):
+        self.logger = logger
+        self.stats = stats
+        self.errors_key = errors_key
+        self.errors = 0
+        self.lost = 0
+        self._last = defer.succeed(None)
+
+    def submit(self, func, *args, count=1):
+        self._last.addCallback(lambda _: threads.deferToThread(func, *args))
+        self._last.addErrback(self._log_error, count)
+
+    def wait(self):
+        """返回一个在当前所有写入完成后触发的 Deferred"""
+        d = defer.Deferred()
+
+        def _fire(result):
+            d.callback(None)
+            return result
+
+        self._last.addBoth(_fire)
+        return d
+
+    def _log_error(self, failure, count):
+        self.errors += 1
+        self.lost += count
+        if self.stats is not None and self.errors_key:
+            self.stats.inc_value(self.errors_key)
+        if self.logger is not None:
+            self.logger.error('写入失败: %s', failure.getErrorMessage())
+
+
+def _append_text(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _write_bytes(path, body):
+    with open(path, 'wb') as f:
+        f.write(body)
+
+
+class BookTextPipeline(object):
+    """
+    按章节序号把 ChapterItem 追加到 spider.output_file
+
+    章节下载完成的顺序不固定，未轮到的章节暂存在内存中，
+    序号连续的部分会合并成一次写入
+    """
+
+    def open_spider(self, spider):
+        self.output_file = getattr(spider, 'output_file', None)
+        self.next_index = 0
+        self.pending = {}
+        self.max_pending = 0
+        self.writer = SerialWriter(spider.logger, spider.crawler.stats, 'book/write_errors')
+
+    def process_item(self, item, spider):
+        if not isinstance(item, ChapterItem) or not self.output_file:
+            return item
+
+        index = item['index']
+        if index < self.next_index or index in self.pending:
+            # 重复的章节（如继续抓取时持久化队列中遗留的请求），只写一次
+            return item
+        self.pending[index] = f"{item['title']}\n\n{item['content']}\n\n"
+        self.max_pending = max(self.max_pending, len(self.pending))
+
+        chunks = []
+        while self.next_index in self.pending:
+            chunks.append(self.pending.pop(self.next_index))
+            self.next_index += 1
+        if chunks:
+            self.writer.submit(_append_text, self.output_file, ''.join(chunks), count=len(chunks))
+        return item
+
+    def close_spider(self, spider):
+        if not self.output_file:
+            return None
+        # 缺失的章节跳过，剩余章节按序号写入
+        if self.pending:
+            spider.logger.warning('有 %d 个章节未按顺序到达，按序号补写', len(self.pending))
+            chunks = [self.pending[i] for i in sorted(self.pending)]
+            self.writer.submit(_append_text, self.output_file, ''.join(chunks), count=len(chunks))
+            self.pending.clear()
+        spider.crawler.stats.set_value('book/reorder_window_max', self.max_pending, spider=spider)
+        d = self.writer.wait()
+        d.addCallback(lambda _: self._report(spider))
+        return d
+
+    def _report(self, spider):
+        if self.writer.errors:
+            spider.logger.error('%d 次写入失败，%d 个章节未保存到 %s',
+                                self.writer.errors, self.writer.lost, self.output_file)
+        else:
+            spider.log("所有章节已保存到文件中")
+
+
+class ImageStorePipeline(object):
+    """在线程池中把 ImageItem 的 body 写入 path，写完后清空 body 只保留大小"""
+
+    def process_item(self, item, spider):
+        if not isinstance(item, ImageItem) or item.get('body') is None:
+            return item
+
+        body = item['body']
+        path = item['path']
+
+        def _done(_):
+            item['size'] = len(body)
+            item['body'] = None
+            spider.log(f"图片已保存: {path}")
+            return item
+
+        d = threads.deferToThread(_write_bytes, path, body)
+        d.addCallback(_done)
+        return d
+
+
+IMAGE_EXTENSIONS = {'WEBP': 'webp', 'AVIF': 'avif', 'JPEG': 'jpg', 'PNG': 'png'}
+
+
+def transcode_image(body, outputs):
+    """
+    在子进程中执行：解码一次原图，按各输出配置缩放并转码，先写临时文件再替换
+    outputs 为 [(路径, 配置)]，返回 [(路径, 字节数)]
+    """
+    image = Image.open(io.BytesIO(body))
+    image.load()
+    results = []
+    for path, profile in outputs:
+        fmt = profile.get('format', 'WEBP').upper()
+        out = image
+        max_size = profile.get('max_size')
+        if max_size:
+            out = image.copy()
+            out.thumbnail(tuple(max_size), Image.LANCZOS)
+        if fmt == 'JPEG' and out.mode not in ('RGB', 'L'):
+            out = out.convert('RGB')
+        elif out.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            out = out.convert('RGBA' if 'transparency' in out.info else 'RGB')
+
+        options = {k: v for k, v in profile.items() if k not in ('format', 'max_size', 'ext')}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        out.save(tmp_path, format=fmt, **options)
+        os.replace(tmp_path, path)
+        results.append((path, os.path.getsize(path)))
+    return results
+
+
+def _deferred_from_future(future):
+    """concurrent.futures.Future → 在 reactor 线程中触发的 Deferred"""
+    from twisted.internet import reactor
+
+    d = defer.Deferred()
+
+    def _done(f):
+        exc = f.exception()
+        if exc is not None:
+            reactor.callFromThread(d.errback, exc)
+        else:
+            reactor.callFromThread(d.callback, f.result())
+
+    future.add_done_callback(_done)
+    return d
+
+
+class ImageTranscodePipeline(object):
+    """
+    在进程池中把 ImageItem 的 body 按 IMAGE_PROFILES 转码/缩放（WebP、AVIF、缩略图等），
+    直接使用内存中的原图，不再从磁盘读取；目标文件已存在时跳过
+
+    需位于 ImageStorePipeline 之前（body 被写入磁盘后会清空）。
+    同时在进程池中的图片不超过 IMAGE_TRANSCODE_MAX_PENDING 张，其余 item 等待，
+    由 Scrapy 的 scraper 限流反压到下载
+    """
+
+    def __init__(self, profiles, output_dir=None, workers=0, max_pending=0, keep_original=True,
+                 stats=None):
+        self.profiles = profiles
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self.keep_original = keep_original
+        self.stats = stats
+        self.executor = None
+        self.semaphore = defer.DeferredSemaphore(self.max_pending)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('IMAGE_TRANSCODE_ENABLED'):
+            raise NotConfigured('IMAGE_TRANSCODE_ENABLED 未开启')
+        if Image is None:
+            raise NotConfigured('未安装 Pillow，无法转码图片')
+        profiles = settings.getdict('IMAGE_PROFILES')
+        if not profiles:
+            raise NotConfigured('IMAGE_PROFILES 为空')
+        return cls(
+            profiles,
+            output_dir=settings.get('IMAGE_TRANSCODE_DIR'),
+            workers=settings.getint('IMAGE_TRANSCODE_WORKERS', 0),
+            max_pending=settings.getint('IMAGE_TRANSCODE_MAX_PENDING', 0),
+            keep_original=settings.getbool('IMAGE_TRANSCODE_KEEP_ORIGINAL', True),
+            stats=crawler.stats,
+        )
+
+    def open_spider(self, spider):
+        # reactor 已有线程在运行，fork 不安全，统一用 spawn（与 Windows 相同）
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+
+    def output_path(self, path, name, profile):
+        """默认保存在原图所在文件夹下的 <配置名>/ 子目录，文件名不变、扩展名按格式"""
+        folder, filename = os.path.split(path)
+        ext = profile.get('ext') or IMAGE_EXTENSIONS.get(profile.get('format', 'WEBP').upper(), 'img')
+        stem = os.path.splitext(filename)[0]
+        if self.output_dir:
+            folder = os.path.join(self.output_dir, os.path.basename(folder))
+        return os.path.join(folder, name, f'{stem}.{ext}')
+
+    def process_item(self, item, spider):
+        if not isinstance(item, ImageItem) or item.get('body') is None:
+            return item
+
+        paths = {name: self.output_path(item['path'], name, profile)
+                 for name, profile in self.profiles.items()}
+        outputs = [(paths[name], profile) for name, profile in self.profiles.items()
+                   if not os.path.exists(paths[name])]
+        item['transcoded'] = paths
+        if not outputs:
+            self.stats.inc_value('image_transcode/skipped')
+            return self._finish(item)
+
+        body = item['body']
+
+        def _submit():
+            return _deferred_from_future(self.executor.submit(transcode_image, body, outputs))
+
+        def _done(results):
+            self.stats.inc_value('image_transcode/files', len(results))
+            self.stats.inc_value('image_transcode/bytes_in', len(body))
+            self.stats.inc_value('image_transcode/bytes_out', sum(size for _, size in results))
+            return self._finish(item)
+
+        def _failed(failure):
+            # 转码失败不影响原图保存
+            self.stats.inc_value('image_transcode/errors')
+            spider.logger.error('图片转码失败: %s (%s)', item['path'], failure.getErrorMessage())
+            return item
+
+        d = self.semaphore.run(_submit)
+        d.addCallbacks(_done, _failed)
+        return d
+
+    def _finish(self, item):
+        if not self.keep_original:
+            # 不保存原图：清空 body，ImageStorePipeline 会跳过
+            item['size'] = len(item['body'])
+            item['body'] = None
+        return item
+
+    def close_spider(self, spider):
+        if self.executor is None:
+            return None
+        return threads.deferToThread(self.executor.shutdown)
+
+
+class JsonLinesBatchExporter(object):
+    def __init__(self, path):
+        self.path = path
+
+    def write_batch(self, records):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(r, ensure_ascii=False, default=str) + '\n'
+                         for r in records)
+
+    def close(self):
+        pass
+
+
+class SqliteBatchExporter(object):
+    def __init__(self, path):
+        self.path = path
+        # 写入在线程池中进行，由 SerialWriter 保证同一时刻只有一个线程使用连接
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS items ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' type TEXT NOT NULL,'
+            ' data TEXT NOT NULL)'
+        )
+        self.conn.commit()
+
+    def write_batch(self, records):
+        self.conn.executemany(
+            'INSERT INTO items (type, data) VALUES (?, ?)',
+            [(r.get('_type'), json.dumps(r, ensure_ascii=False, default=str)) for r in records],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class BatchExportPipeline(object):
+    """
+    缓冲 item，攒够 BATCH_EXPORT_SIZE 条或每隔 BATCH_EXPORT_INTERVAL 秒
+    批量写入 JSON Lines 或 SQLite，写入在线程池中进行
+    """
+
+    exporters = {
+        'jsonl': JsonLinesBatchExporter,
+        'sqlite': SqliteBatchExporter,
+    }
+
+    def __init__(self, path, fmt='jsonl', batch_size=500, interval=5.0, exclude=('body',), stats=None):
+        if fmt not in self.exporters:
+            raise NotConfigured(f'不支持的导出格式: {fmt}')
+        self.path = path
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.interval = interval
+        self.exclude = set(exclude)
+        self.stats = stats
+        self.buffer = []
+        self.exporter = None
+        self.writer = None
+        self.loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('BATCH_EXPORT_ENABLED'):
+            raise NotConfigured('BATCH_EXPORT_ENABLED 未开启')
+        return cls(
+            settings.get('BATCH_EXPORT_PATH', 'exports/%(name)s.%(format)s'),
+            fmt=settings.get('BATCH_EXPORT_FORMAT', 'jsonl'),
+            batch_size=settings.getint('BATCH_EXPORT_SIZE', 500),
+            interval=settings.getfloat('BATCH_EXPORT_INTERVAL', 5.0),
+            exclude=settings.getlist('BATCH_EXPORT_EXCLUDE_FIELDS', ['body']),
+            stats=crawler.stats,
+        )
+
+    def open_spider(self, spider):
+        path = self.path % {'name': spider.name, 'format': self.fmt}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.exporter = self.exporters[self.fmt](path)
+        self.writer = SerialWriter(spider.logger, self.stats, 'batch_export/errors')
+        if self.interval > 0:
+            self.loop = task.LoopingCall(self.flush)
+            self.loop.start(self.interval, now=False)
+
+    def process_item(self, item, spider):
+        record = {k: v for k, v in ItemAdapter(item).items() if k not in self.exclude}
+        record['_type'] = type(item).__name__
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+        return item
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        self.writer.submit(self.exporter.write_batch, batch, count=len(batch))
+
+    def close_spider(self, spider):
+        if self.loop is not None and self.loop.running:
+            self.loop.stop()
+        self.flush()
+        d = self.writer.wait()
+        d.addCallback(lambda _: threads.deferToThread(self.exporter.close))
+        d.addCallback(lambda _: self._report(spider))
+        return d
+
+    def _report(self, spider):
+        if not self.writer.errors:
+            return
+        if self.stats is not None:
+            self.stats.set_value('batch_export/lost', self.writer.lost)
+        spider.logger.error('%d 次批量写入失败，%d 条 item 未导出到 %s',
+                            self.writer.errors, self.writer.lost, self.exporter.path)
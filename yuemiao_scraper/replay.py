@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+# 录制 / 回放
+#
+# 录制：REPLAY_MODE=record 时 RecordMiddleware 把每个真实下载的请求/响应
+#       存进 REPLAY_ARCHIVE（SQLite 文件，响应体 zlib 压缩）
+# 回放：REPLAY_MODE=replay 时 settings.py 把 http/https 下载处理器换成
+#       ReplayDownloadHandler，从存档返回响应，不访问网络，可模拟延迟
+#
+#   REPLAY_MODE=record scrapy crawl book_spider
+#   REPLAY_MODE=replay scrapy crawl book_spider -s REPLAY_LATENCY=0.05
+
+import json
+import os
+import random
+import sqlite3
+import time
+import zlib
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from twisted.internet import reactor
+from twisted.internet.task import deferLater
+
+
+class ReplayArchive(object):
+    """以请求指纹为键保存响应的本地存档"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' fp TEXT PRIMARY KEY,'
+            ' method TEXT NOT NULL,'
+            ' url TEXT NOT NULL,'
+            ' status INTEGER NOT NULL,'
+            ' headers TEXT NOT NULL,'
+            ' body BLOB NOT NULL,'
+            ' recorded_at REAL NOT NULL)'
+        )
+        self.pending = 0
+
+    def put(self, fp, request, response):
+        headers = {
+            k.decode('latin-1'): [v.decode('latin-1') for v in vs]
+            for k, vs in response.headers.items()
+        }
+        # 重试时同一请求会录到多个响应：已有 2xx 时不被之后的 429 / 5xx 等覆盖
+        self.conn.execute(
+            'INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)'
+            ' ON CONFLICT(fp) DO UPDATE SET'
+            ' method = excluded.method, url = excluded.url, status = excluded.status,'
+            ' headers = excluded.headers, body = excluded.body, recorded_at = excluded.recorded_at'
+            ' WHERE excluded.status BETWEEN 200 AND 299 OR responses.status NOT BETWEEN 200 AND 299',
+            (fp, request.method, response.url, response.status,
+             json.dumps(headers), zlib.compress(response.body), time.time()),
+        )
+        # 每 100 条提交一次，减少磁盘同步次数
+        self.pending += 1
+        if self.pending >= 100:
+            self.commit()
+
+    def get(self, fp):
+        row = self.conn.execute(
+            'SELECT url, status, headers, body FROM responses WHERE fp = ?', (fp,)
+        ).fetchone()
+        if row is None:
+            return None
+        url, status, headers, body = row
+        return url, status, json.loads(headers), zlib.decompress(body)
+
+    def commit(self):
+        self.conn.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+class RecordMiddleware(object):
+    """
+    录制下载器中间件，放在压缩/缓存等中间件之后（靠近下载器），
+    这样存下来的是服务器原始返回的内容
+    """
+
+    def __init__(self, archive, fingerprinter):
+        self.archive = archive
+        self.fingerprinter = fingerprinter
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if settings.get('REPLAY_MODE') != 'record':
+            raise NotConfigured
+        s = cls(ReplayArchive(settings.get('REPLAY_ARCHIVE')), crawler.request_fingerprinter)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_response(self, request, response, spider):
+        fp = self.fingerprinter.fingerprint(request).hex()
+        self.archive.put(fp, request, response)
+        return response
+
+    def spider_closed(self, spider):
+        self.archive.close()
+
+
+class ReplayDownloadHandler(object):
+    """从录制存档返回响应的下载处理器，REPLAY_LATENCY 秒后返回（可加随机抖动）"""
+
+    lazy = False
+
+    def __init__(self, settings, crawler=None):
+        self.archive = ReplayArchive(settings.get('REPLAY_ARCHIVE'))
+        self.latency = settings.getfloat('REPLAY_LATENCY', 0.0)
+        self.jitter = settings.getfloat('REPLAY_LATENCY_JITTER', 0.0)
+        self.missing = settings.get('REPLAY_MISSING', 'error')
+        self.fingerprinter = crawler.request_fingerprinter if crawler else None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings, crawler)
+
+    def download_request(self, request, spider):
+        delay = self.latency
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        return deferLater(reactor, delay, self._build_response, request, delay)
+
+    def _build_response(self, request, delay):
+        fp = self.fingerprinter.fingerprint(request).hex()
+        record = self.archive.get(fp)
+        if record is None:
+            if self.missing == '404':
+                return responsetypes.from_args(url=request.url)(
+                    url=request.url, status=404, body=b'', request=request, flags=['replay'])
+            raise IgnoreRequest(f'回放存档中没有该请求: {request.url}')
+
+        url, status, headers, body = record
+        headers = Headers(headers)
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        request.meta['download_latency'] = delay
+        return respcls(url=url, status=status, headers=headers, body=body,
+                       request=request, flags=['replay'])
+
+    def close(self):
+        self.archive.close()
@@ -1,74 +1,231 @@
 import scrapy
 import os
+from scrapy import signals
+
+from yuemiao_scraper.items import ChapterItem
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax 为可选依赖
+    LexborHTMLParser = None
+
+
+# 正文中被拼音/符号替换的字词，按顺序依次还原
+WORD_REPLACEMENTS = (
+    ('ru', '乳'),
+    ('yin水', '淫水'),
+    ('yin蒂', '阴蒂'),
+    ('yin唇', '阴唇'),
+    ('yin道', '阴道'),
+    ('gui头', '龟头'),
+    ('ji巴', '鸡巴'),
+    ('ai', '爱'),
+    ('rou棒', '肉棒'),
+    ('jing液', '精液'),
+    ('高氵朝', '高潮'),
+    ('xiāo穴', '小穴'),
+    ('yin户', '阴户'),
+    ('yin茎', '阴茎'),
+    ('mi穴', '蜜穴'),
+    ('yáng具', '阳具'),
+)
+
+# 文本片段之间的换行标记
+_BR = object()
+_BREAK = object()
+
+
+def restore_words(text):
+    for old, new in WORD_REPLACEMENTS:
+        text = text.replace(old, new)
+    return text
+
+
+def join_zoom_parts(parts):
+    """
+    拼接正文片段：连续 4 个 <br> 合并为一个换行，其余每个 <br> 一个换行，
+    &nbsp; 去掉
+    """
+    chunks = []
+    br_run = 0
+    for part in parts:
+        if part is _BR:
+            br_run += 1
+            continue
+        if br_run:
+            chunks.append('\n' * (br_run // 4 + br_run % 4))
+            br_run = 0
+        if part is not _BREAK:
+            chunks.append(part)
+    if br_run:
+        chunks.append('\n' * (br_run // 4 + br_run % 4))
+    return restore_words(''.join(chunks).replace('\xa0', '')).strip()
+
+
+def iter_lxml_parts(element):
+    """遍历 lxml 节点的文本和 <br>，不做序列化"""
+    if element.text:
+        yield element.text
+    for child in element:
+        if child.tag == 'br':
+            yield _BR
+        elif isinstance(child.tag, str):
+            yield _BREAK
+            yield from iter_lxml_parts(child)
+            yield _BREAK
+        else:
+            # 注释等非元素节点，不取文本
+            yield _BREAK
+        if child.tail:
+            yield child.tail
+
+
+def iter_lexbor_parts(node):
+    """遍历 selectolax(lexbor) 节点的文本和 <br>"""
+    for child in node.iter(include_text=True):
+        tag = child.tag
+        if tag == '-text':
+            yield child.text(deep=False)
+        elif tag == 'br':
+            yield _BR
+        elif tag.startswith(('-', '_')):
+            yield _BREAK
+        else:
+            yield _BREAK
+            yield from iter_lexbor_parts(child)
+            yield _BREAK
+
+
+def extract_chapter_lxml(response):
+    """使用 Scrapy 自带的 lxml 解析树提取 (标题, 正文)"""
+    title = response.css('.book_con h1::text').get()
+    zoom = response.css('#zoom')
+    if not zoom:
+        return title, ''
+    return title, join_zoom_parts(iter_lxml_parts(zoom[0].root))
+
+
+def extract_chapter_lexbor(response):
+    """使用 selectolax(lexbor) 提取 (标题, 正文)，比 lxml 解析更快"""
+    tree = LexborHTMLParser(response.text)
+    title = None
+    h1 = tree.css_first('.book_con h1')
+    if h1 is not None:
+        # 与 ::text 一致，只取 h1 下的第一个文本节点
+        for child in h1.iter(include_text=True):
+            if child.tag == '-text':
+                title = child.text(deep=False)
+                break
+    zoom = tree.css_first('#zoom')
+    if zoom is None:
+        return title, ''
+    return title, join_zoom_parts(iter_lexbor_parts(zoom))
 
 
 class BookSpider(scrapy.Spider):
     name = "book_spider"
     start_urls = ['https://www.quddu.com/book/40679/']  # 初始页面
 
-    def __init__(self):
-        # 初始化存储章节链接的列表和输出文件
+    def __init__(self, start_url=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 可通过 -a start_url=... 指定书籍目录页
+        if start_url:
+            self.start_urls = [start_url]
+        # 初始化存储章节链接的列表和输出文件（由 BookTextPipeline 按章节顺序写入）
         self.chapter_list = []
-        self.content_dict = {}  # 存储章节内容
+        self.next_chapter = 0  # 下一个待请求的章节序号
         self.output_file = "book_content.txt"
+        self.dropped = 0  # 被去重过滤器丢弃、尚未补上的章节请求数
+        self.refilling = False
+        self._extract_chapter = None
         # 确保输出文件是空的
         if os.path.exists(self.output_file):
             os.remove(self.output_file)
 
+    async def start(self):
+        # Scrapy 2.13 起的入口（新版本不再调用 start_requests），旧版本仍使用 start_requests
+        for request in self.start_requests():
+            yield request
+
+    def start_requests(self):
+        # 目录页每次都要重新下载才能发现新章节，不走 HTTP 缓存
+        for url in self.start_urls:
+            yield scrapy.Request(url, dont_filter=True, meta={'cache_kind': 'index'})
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.request_dropped, signal=signals.request_dropped)
+        return spider
+
+    @property
+    def extract_chapter(self):
+        # BOOK_HTML_PARSER: auto（安装了 selectolax 时使用 lexbor）/ lxml / lexbor
+        if self._extract_chapter is None:
+            parser = self.settings.get('BOOK_HTML_PARSER', 'auto')
+            if parser == 'lexbor' and LexborHTMLParser is None:
+                self.logger.warning("未安装 selectolax，改用 lxml 解析")
+                parser = 'lxml'
+            if parser == 'lexbor' or (parser == 'auto' and LexborHTMLParser is not None):
+                self._extract_chapter = extract_chapter_lexbor
+            else:
+                self._extract_chapter = extract_chapter_lxml
+        return self._extract_chapter
+
     def parse(self, response):
-        # 找到 class="list_dd" 下的所有 a 标签，提取 href 属性
+        # 找到 class="list_dd" 下的所有 a 标签，提取 href 属性（去重，避免被过滤后占住名额）
         chapter_links = response.css('.list_dd a::attr(href)').getall()
-        self.chapter_list = ['https://www.quddu.com' + link for link in chapter_links]
-
-        # 按顺序请求章节链接
-        for index, link in enumerate(self.chapter_list):
-            yield scrapy.Request(link, callback=self.parse_chapter, meta={'index': index})
+        self.chapter_list = list(dict.fromkeys(response.urljoin(link) for link in chapter_links))
+        self.next_chapter = 0
 
-    def parse_chapter(self, response):
-        # 提取章节名称
-        chapter_title = response.css('.book_con h1::text').get()
-        # 提取章节内容，处理替换格式
-        raw_content = response.css('#zoom').get()
-
-        formatted_content = (
-            raw_content.replace('&nbsp;', '')
-            .replace('<br><br><br><br>', '\n')
-            .replace('<br>', '\n')
-            .replace('ru', '乳')
-            .replace('yin水', '淫水')
-            .replace('yin蒂', '阴蒂')
-            .replace('yin唇', '阴唇')
-            .replace('yin道', '阴道')
-            .replace('gui头', '龟头')
-            .replace('ji巴', '鸡巴')
-            .replace('ai', '爱')
-            .replace('rou棒', '肉棒')
-            .replace('jing液', '精液')
-            .replace('高氵朝', '高潮')
-            .replace('xiāo穴', '小穴')
-            .replace('yin户', '阴户')
-            .replace('yin茎', '阴茎')
-            .replace('mi穴', '蜜穴')
-            .replace('yáng具', '阳具')
-            .replace('mi穴', '蜜穴')
+        # 先放入 BOOK_MAX_PENDING_CHAPTERS 个章节请求，之后每完成一章再补一章（0 为不限制）
+        max_pending = self.settings.getint('BOOK_MAX_PENDING_CHAPTERS', 32)
+        yield from self.schedule_chapters(max_pending or len(self.chapter_list))
 
-        )
-        # 使用 Scrapy 的选择器提取纯文本
-        chapter_content = scrapy.Selector(text=formatted_content).xpath('//text()').getall()
-        chapter_content = ''.join(chapter_content).strip()
+    def schedule_chapters(self, count):
+        # 按章节顺序生成请求，序号越小优先级越高，结果基本按顺序到达。
+        # 先占用序号再逐个生成：生成过程中 request_dropped 可能再次调用本方法
+        start = self.next_chapter
+        end = min(start + count, len(self.chapter_list))
+        self.next_chapter = end
+        for index in range(start, end):
+            yield scrapy.Request(
+                self.chapter_list[index],
+                callback=self.parse_chapter,
+                errback=self.chapter_failed,
+                priority=-index,
+                meta={'index': index, 'cache_kind': 'chapter'},
+            )
 
-        # 存储章节内容到字典，按索引顺序
-        index = response.meta['index']
-        self.content_dict[index] = f"{chapter_title}\n\n{chapter_content}\n\n"
+    def request_dropped(self, request, spider):
+        # 已抓取过的章节被去重过滤器（如续爬时的 BloomDupeFilter / FrontierDupeFilter）丢弃，
+        # 不会触发回调，由这里补上名额。补上的请求可能再次被丢弃，在同一个循环中处理，不递归
+        if spider is not self or 'index' not in request.meta:
+            return
+        self.dropped += 1
+        if self.refilling:
+            return
+        self.refilling = True
+        try:
+            while self.dropped:
+                count, self.dropped = self.dropped, 0
+                for next_request in self.schedule_chapters(count):
+                    self.crawler.engine.crawl(next_request)
+        finally:
+            self.refilling = False
 
-        # 检查是否所有章节已经爬取完成
-        if len(self.content_dict) == len(self.chapter_list):
-            self.save_content_to_file()
+    def chapter_failed(self, failure):
+        self.logger.error("章节下载失败: %s (%s)", failure.request.url, failure.getErrorMessage())
+        yield from self.schedule_chapters(1)
 
-    def save_content_to_file(self):
-        # 按照章节顺序写入文件
-        with open(self.output_file, 'a', encoding='utf-8') as f:
-            for index in sorted(self.content_dict.keys()):
-                f.write(self.content_dict[index])
-        self.log("所有章节已保存到文件中")
+    def parse_chapter(self, response):
+        # 直接遍历原始解析树中 #zoom 的文本节点和 <br>，提取章节名称和正文
+        chapter_title, chapter_content = self.extract_chapter(response)
 
+        yield ChapterItem(
+            index=response.meta['index'],
+            title=chapter_title,
+            content=chapter_content,
+            url=response.url,
+        )
+        yield from self.schedule_chapters(1)
@@ -1,11 +1,17 @@
+import logging
 import os
 import scrapy
 import urllib.parse
 from twisted.internet.error import ConnectionLost
 
+from yuemiao_scraper.items import ImageItem
+from yuemiao_scraper.logprofile import truncate
+
 
 class ImageSpider(scrapy.Spider):
     name = "image_spider"
+    # 图集页面，可通过 -a start_url=... 覆盖
+    start_url = "https://xiunice.com/xiuren%e7%a7%80%e4%ba%ba%e7%bd%91-no-5946-%e5%a6%b2%e5%b7%b1_toxic-71p-4k"
 
     BROWSER_HEADERS = {
         "connection": "close",
@@ -26,27 +32,29 @@ class ImageSpider(scrapy.Spider):
         # "connection": "keep-alive"
     }
 
+    async def start(self):
+        # Scrapy 2.13 起的入口（新版本不再调用 start_requests），旧版本仍使用 start_requests
+        for request in self.start_requests():
+            yield request
+
     def start_requests(self):
         yield scrapy.Request(
-            url="https://xiunice.com/xiuren%e7%a7%80%e4%ba%ba%e7%bd%91-no-5946-%e5%a6%b2%e5%b7%b1_toxic-71p-4k",
+            url=self.start_url,
             headers=self.BROWSER_HEADERS,
             cookies={  # 单独处理 Cookie
                 "_ga": "GA1.1.1412762376.1732553742",
                 "_ga_4VHH86F4BG": "GS1.1.1739677305.22.1.1739677629.0.0.0"
             },
-            meta={'max_retry_times': 10}
+            meta={'max_retry_times': 10, 'cache_kind': 'gallery'}
         )
 
     def download_image(self, response):
-        # 保存图片到指定文件夹
+        # 图片交给 ImageStorePipeline 保存到指定文件夹
         folder_path = response.meta["folder_path"]
         image_name = response.url.split("/")[-1]  # 从URL中提取图片文件名
         image_path = os.path.join(folder_path, image_name)
 
-        # 保存图片到本地
-        with open(image_path, "wb") as f:
-            f.write(response.body)
-        self.log(f"图片已保存: {image_path}")
+        yield ImageItem(url=response.url, path=image_path, body=response.body)
 
     def parse(self, response):
         # 获取文件夹名称
@@ -66,8 +74,9 @@ class ImageSpider(scrapy.Spider):
             self.logger.error("未找到父容器，请检查 XPath 是否正确")
             return
 
-        # 打印父容器的内容
-        self.logger.info(f"父容器内容：{parent_container.get()}")
+        # 打印父容器的内容（HTML 较大，只在 DEBUG 时输出并截断）
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("父容器内容：%s", truncate(parent_container.get(), 500))
 
         # 从父容器中查找所有的 <a> 标签
         links = parent_container.css("img::attr(src)").getall()
@@ -80,9 +89,9 @@ class ImageSpider(scrapy.Spider):
         # 下载图片
         for image_link in links:
             yield scrapy.Request(
-                image_link,
+                response.urljoin(image_link),
                 callback=self.download_image,
-                meta={"folder_path": folder_path},
+                meta={"folder_path": folder_path, "cache_kind": "image"},
             )
 
 
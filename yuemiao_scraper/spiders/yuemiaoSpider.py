@@ -1,6 +1,108 @@
 from scrapy.spiders import Spider
-from scrapy import Request
+from scrapy import Request, signals
+from scrapy.exceptions import DontCloseSpider, IgnoreRequest
+from scrapy.utils.defer import deferred_from_coro
+from scrapy.utils.log import failure_to_exc_info
+from twisted.internet import task
+from urllib.parse import urlencode
 import json
+import time
+
+from yuemiao_scraper.items import ReservationItem
+
+
+# 预约接口的参数顺序，linkmanId 由账号配置提供，其余来自 targets
+TARGET_PARAMS = ('vaccineCode', 'vaccineIndex', 'linkmanId', 'subscribeDate', 'subscirbeTime',
+                 'departmentVaccineId', 'depaCode')
+
+
+class Token(object):
+    """一组 st/tk，两次请求至少间隔 interval 秒，同时最多 max_in_flight 个请求"""
+
+    def __init__(self, key, account, st, tk, interval=1.0, max_in_flight=1):
+        self.key = key
+        self.account = account
+        self.st = st
+        self.tk = tk
+        self.interval = interval
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.requests = 0
+        self.next_time = 0.0
+
+    def ready(self, now):
+        return self.in_flight < self.max_in_flight and now >= self.next_time
+
+    def acquire(self, now):
+        self.in_flight += 1
+        self.requests += 1
+        self.next_time = now + self.interval
+
+    def release(self):
+        self.in_flight = max(self.in_flight - 1, 0)
+
+
+class TokenPool(object):
+    def __init__(self, tokens):
+        self.tokens = {t.key: t for t in tokens}
+
+    def get(self, key):
+        return self.tokens.get(key)
+
+    def ready_tokens(self, now):
+        """可以发出请求的 token，在途和已发请求少的优先"""
+        ready = [t for t in self.tokens.values() if t.ready(now)]
+        return sorted(ready, key=lambda t: (t.in_flight, t.requests))
+
+
+class Account(object):
+    """一个账号：若干 token、若干就诊人，每个就诊人轮流尝试所有预约目标"""
+
+    def __init__(self, name, linkmen, targets):
+        self.name = name
+        self.linkmen = [str(l) for l in linkmen]
+        self.attempts = [(linkman, target) for linkman in self.linkmen for target in targets]
+        self.cursor = 0
+
+    def next_attempt(self, is_open):
+        """从上次的位置开始，返回下一个仍需尝试的 (就诊人, 目标)，没有时返回 None"""
+        for i in range(len(self.attempts)):
+            index = (self.cursor + i) % len(self.attempts)
+            linkman, target = self.attempts[index]
+            if is_open(linkman):
+                self.cursor = index + 1
+                return linkman, target
+        return None
+
+
+def load_config(path):
+    """
+    读取账号配置（JSON）：
+
+        {
+          "url": "https://wx.healthych.com/order/subscribe/add.do",
+          "token_interval": 1.0,        // 每个 token 两次请求的最小间隔（秒），可在 token 中单独设置
+          "token_max_in_flight": 1,     // 每个 token 的在途请求上限，可在 token 中单独设置
+          "max_attempts": 0,            // 每个就诊人最多尝试次数，0 为直到成功
+          "accounts": [
+            {"name": "账号1", "tokens": [{"st": "...", "tk": "..."}], "linkmen": [1069828]}
+          ],
+          "targets": [
+            {"vaccineCode": "8803", "vaccineIndex": 1, "subscribeDate": "2019-05-23",
+             "subscirbeTime": 891, "departmentVaccineId": 3181, "depaCode": "5101090088_..."}
+          ]
+        }
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not config.get('accounts'):
+        raise ValueError(f'{path} 中没有配置 accounts')
+    if not config.get('targets'):
+        raise ValueError(f'{path} 中没有配置 targets')
+    for account in config['accounts']:
+        if not account.get('tokens') or not account.get('linkmen'):
+            raise ValueError(f"账号 {account.get('name')} 缺少 tokens 或 linkmen")
+    return config
 
 
 class yuemiaoSpider(Spider):
@@ -16,18 +118,203 @@ class yuemiaoSpider(Spider):
     # vaccine.do疫苗详情查询接口返回数据:vaccineCode: code;departmentVaccineId: id
     # departmentWorkTimes2.do接种日期接口返回数据：subscirbeTime：id
     # department/detail.do 医院查询接口返回数据： depaCode：code
+    # 预约接口地址，可通过 -a url=... 覆盖
     url = 'https://wx.healthych.com/order/subscribe/add.do?vaccineCode=8803&vaccineIndex=1&linkmanId=1069828&subscribeDate=2019-05-23&subscirbeTime=891&departmentVaccineId=3181&depaCode=5101090088_daebd8c891c5c69d7767dbe01e5b813f'
 
+    # 多账号模式：-a config=accounts.json 或 YUEMIAO_CONFIG，格式见 load_config
+    config = None
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        config_path = spider.config or crawler.settings.get('YUEMIAO_CONFIG')
+        spider.accounts = {}
+        if config_path:
+            spider.setup_accounts(load_config(config_path))
+            crawler.signals.connect(spider.spider_opened, signal=signals.spider_opened)
+            crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+            crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
+        return spider
+
+    def setup_accounts(self, config):
+        self.base_url = config.get('url') or self.url.split('?')[0]
+        self.max_attempts = int(config.get('max_attempts', 0))
+        targets = config['targets']
+        tokens = []
+        for account_config in config['accounts']:
+            name = str(account_config.get('name') or f'account{len(self.accounts) + 1}')
+            self.accounts[name] = Account(name, account_config['linkmen'], targets)
+            for i, token in enumerate(account_config['tokens']):
+                tokens.append(Token(
+                    f'{name}#{i}', name, token['st'], token['tk'],
+                    interval=float(token.get('interval', config.get('token_interval', 1.0))),
+                    max_in_flight=int(token.get('max_in_flight', config.get('token_max_in_flight', 1))),
+                ))
+        self.pool = TokenPool(tokens)
+        self.succeeded = {}   # 就诊人 → 成功的账号
+        self.attempted = {}   # 就诊人 → 已发出的请求数
+        self.latency = {name: [] for name in self.accounts}
+        self.dispatcher = None
+
     def start_requests(self):
+        if self.accounts:
+            # 请求由 dispatch 按 token 的速率和在途上限发出
+            return
         yield Request(self.url, headers=self.headers)
 
-    def parse(self, response):
-        datas = json.loads(response.body)
-        print(datas, datas['ok'], datas['ok'] == False )
-        if datas and datas['ok'] == False:
-            yield Request(self.url, headers=self.headers, dont_filter=True)
+    def spider_opened(self, spider):
+        interval = self.settings.getfloat('YUEMIAO_DISPATCH_INTERVAL', 0.1)
+        self.dispatcher = task.LoopingCall(self.dispatch)
+        # dispatch 出错时 LoopingCall 停止，爬虫会因 spider_idle 一直等待，直接关闭
+        self.dispatcher.start(interval).addErrback(self.dispatch_failed)
+        self.logger.info('多账号模式：%d 个账号，%d 个 token，%d 个就诊人',
+                         len(self.accounts), len(self.pool.tokens), len(self.linkmen()))
+
+    def linkmen(self):
+        return {l for account in self.accounts.values() for l in account.linkmen}
+
+    def is_open(self, linkman):
+        """就诊人还需要继续尝试：未成功，且未达到最多尝试次数"""
+        if linkman in self.succeeded:
+            return False
+        return not self.max_attempts or self.attempted.get(linkman, 0) < self.max_attempts
+
+    def finished(self):
+        return not any(self.is_open(l) for l in self.linkmen())
+
+    def dispatch_failed(self, failure):
+        from twisted.internet import reactor
 
+        self.logger.error('分发预约请求出错，关闭爬虫', exc_info=failure_to_exc_info(failure))
+        # 第一次 dispatch 在 spider_opened 中执行，此时引擎还未启动，推迟到下一轮再关闭
+        reactor.callLater(0, self.close_crawl, 'dispatch_error')
+
+    def close_crawl(self, reason):
+        engine = self.crawler.engine
+        if hasattr(engine, 'close_spider_async'):
+            # Scrapy 2.14 起 close_spider 已弃用
+            return deferred_from_coro(engine.close_spider_async(reason=reason))
+        return engine.close_spider(self, reason)
+
+    def dispatch(self):
+        now = time.monotonic()
+        for token in self.pool.ready_tokens(now):
+            attempt = self.accounts[token.account].next_attempt(self.is_open)
+            if attempt is None:
+                continue
+            linkman, target = attempt
+            request = self.make_request(token, linkman, target)
+            token.acquire(now)
+            self.attempted[linkman] = self.attempted.get(linkman, 0) + 1
+            self.crawler.stats.inc_value(f'yuemiao/{token.account}/attempts')
+            self.crawler.engine.crawl(request)
+        if self.finished() and self.dispatcher.running:
+            self.dispatcher.stop()
+
+    def make_request(self, token, linkman, target):
+        params = dict(target, linkmanId=linkman)
+        query = [(k, params[k]) for k in TARGET_PARAMS if k in params]
+        query += [(k, v) for k, v in params.items() if k not in TARGET_PARAMS]
+        headers = dict(self.headers, st=token.st, tk=token.tk)
+        return Request(
+            f'{self.base_url}?{urlencode(query)}',
+            headers=headers,
+            dont_filter=True,
+            errback=self.attempt_failed,
+            # 每个 token 单独一个下载槽位，DOWNLOAD_DELAY 等按 token 生效
+            meta={'token': token.key, 'linkman': linkman, 'download_slot': f'yuemiao:{token.key}'},
+        )
+
+    def should_download(self, request):
+        """由下载中间件在请求发出前调用：在调度队列中等待期间就诊人已预约成功的，不再发出"""
+        return not self.accounts or request.meta.get('linkman') not in self.succeeded
+
+    def spider_idle(self, spider):
+        if not self.finished():
+            raise DontCloseSpider
+
+    def release(self, request):
+        token = self.pool.get(request.meta.get('token'))
+        if token is not None:
+            token.release()
+        return token
+
+    def attempt_failed(self, failure):
+        token = self.release(failure.request)
+        if failure.check(IgnoreRequest) and failure.request.meta.get('linkman') in self.succeeded:
+            if token is not None:
+                self.crawler.stats.inc_value(f'yuemiao/{token.account}/skipped')
+            self.logger.debug('就诊人 %s 已预约成功，放弃排队中的请求', failure.request.meta.get('linkman'))
+            return
+        if token is not None:
+            self.crawler.stats.inc_value(f'yuemiao/{token.account}/errors')
+        self.logger.warning('预约请求失败: %s (%s)', failure.request.meta.get('linkman'),
+                            failure.getErrorMessage())
+
+    def parse(self, response):
+        # 先归还 token：回调中出错时 errback 不会执行，token 会一直占着在途名额
+        token = self.release(response.request) if self.accounts else None
+        latency = response.meta.get('download_latency')
+        if token is not None and latency is not None:
+            self.latency[token.account].append(latency)
 
+        self.logger.debug("预约接口返回：%s", response.text)
+        try:
+            datas = json.loads(response.body)
+        except ValueError:
+            datas = None
+        if not isinstance(datas, dict):
+            # 登录页、错误页或空响应；多账号模式下该就诊人之后继续尝试
+            if token is not None:
+                self.crawler.stats.inc_value(f'yuemiao/{token.account}/errors')
+            self.logger.warning('预约接口返回的不是 JSON: %s (HTTP %s，%d 字节)',
+                                response.meta.get('linkman', response.url), response.status, len(response.body))
+            return
 
+        item = ReservationItem(
+            url=response.url,
+            status=response.status,
+            ok=datas.get('ok'),
+            code=datas.get('code'),
+            msg=datas.get('msg'),
+            data=datas.get('data'),
+        )
+        if token is None:
+            yield item
+            if datas and datas['ok'] == False:
+                yield Request(self.url, headers=self.headers, dont_filter=True)
+            return
 
+        linkman = response.meta['linkman']
+        item['account'] = token.account
+        item['linkman'] = linkman
+        item['latency'] = latency
+        if datas.get('ok'):
+            self.crawler.stats.inc_value(f'yuemiao/{token.account}/success')
+            if linkman not in self.succeeded:
+                # 之后不再为该就诊人发出请求
+                self.succeeded[linkman] = token.account
+                self.logger.info('就诊人 %s 预约成功（账号 %s）', linkman, token.account)
+        else:
+            self.crawler.stats.inc_value(f'yuemiao/{token.account}/failed')
+        yield item
 
+    def spider_closed(self, spider):
+        if self.dispatcher is not None and self.dispatcher.running:
+            self.dispatcher.stop()
+        stats = self.crawler.stats
+        for name, values in self.latency.items():
+            if values:
+                stats.set_value(f'yuemiao/{name}/latency_avg', round(sum(values) / len(values), 4))
+                stats.set_value(f'yuemiao/{name}/latency_max', round(max(values), 4))
+            self.logger.info(
+                '账号 %s：请求 %d，成功 %d，失败 %d，错误 %d，平均耗时 %.3f 秒', name,
+                stats.get_value(f'yuemiao/{name}/attempts', 0),
+                stats.get_value(f'yuemiao/{name}/success', 0),
+                stats.get_value(f'yuemiao/{name}/failed', 0),
+                stats.get_value(f'yuemiao/{name}/errors', 0),
+                sum(values) / len(values) if values else 0.0,
+            )
+        missing = sorted(self.linkmen() - set(self.succeeded))
+        if missing:
+            self.logger.warning('未预约成功的就诊人: %s', ', '.join(missing))
@@ -0,0 +1,207 @@
+"""
+Excel → Word 流程基准测试
+
+分别测量 excel_generate / excel_merge / excel_to_word 三个阶段在不同数据量下的
+耗时、吞吐（行/秒、文档/秒）和峰值内存。每个阶段在独立子进程中运行，互不影响。
+
+    python benchmarks/bench_pipeline.py --sizes 5,20,50
+    python benchmarks/bench_pipeline.py --sizes 50 --output result.json
+    # 回归检查：任一阶段吞吐低于基线 25% 以上时返回非 0
+    python benchmarks/bench_pipeline.py --sizes 50 --baseline result.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+EXCEL_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, EXCEL_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+STAGES = ('generate', 'merge', 'word')
+RESULT_MARK = '@@BENCH@@'
+
+
+def peak_rss_mb():
+    """当前进程的峰值内存（MB）"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+
+
+def run_generate(workdir):
+    import excel_generate
+    excel_generate.CONFIG['input_directory'] = os.path.join(workdir, 'input_files')
+    excel_generate.CONFIG['output_filename'] = os.path.join(workdir, 'output_summary.xlsx')
+    excel_generate.main()
+
+
+def run_merge(workdir):
+    import excel_merge
+    excel_merge.SOURCE_FILE = os.path.join(workdir, 'source.xlsx')
+    excel_merge.TARGET_FILE = os.path.join(workdir, 'output_summary.xlsx')
+    excel_merge.OUTPUT_FILE = os.path.join(workdir, '合并文件.xlsx')
+    excel_merge.main()
+
+
+def run_word(workdir):
+    import excel_to_word
+    excel_to_word.EXCEL_PATH = os.path.join(workdir, 'output_summary.xlsx')
+    excel_to_word.TEMPLATE_PATH = os.path.join(EXCEL_DIR, 'template.docx')
+    excel_to_word.OUTPUT_DIR = os.path.join(workdir, 'words')
+    excel_to_word.main()
+
+
+STAGE_RUNNERS = {
+    'generate': run_generate,
+    'merge': run_merge,
+    'word': run_word,
+}
+
+
+def run_stage(stage, workdir):
+    """子进程入口：运行一个阶段并输出测量结果"""
+    os.chdir(workdir)
+    stdout = sys.stdout
+    # 各工具的逐行日志写到文件，不计入终端输出开销
+    with open(os.path.join(workdir, f'{stage}.log'), 'w', encoding='utf-8') as log:
+        sys.stdout = log
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            STAGE_RUNNERS[stage](workdir)
+        finally:
+            sys.stdout = stdout
+        elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    print(RESULT_MARK + json.dumps({
+        'seconds': elapsed,
+        'cpu_seconds': cpu,
+        'peak_rss_mb': peak_rss_mb(),
+    }))
+
+
+def measure(stage, workdir):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run-stage', stage, '--workdir', workdir],
+        capture_output=True, text=True, encoding='utf-8',
+    )
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARK):
+            return json.loads(line[len(RESULT_MARK):])
+    raise RuntimeError(f'阶段 {stage} 运行失败:\n{proc.stdout}\n{proc.stderr}')
+
+
+def bench_size(size, stages, rows_per_sheet, sheets, keep=False):
+    from datagen import generate_employee_workbooks, generate_source_workbook
+
+    workdir = tempfile.mkdtemp(prefix=f'bench_excel_{size}_')
+    try:
+        info = generate_employee_workbooks(
+            os.path.join(workdir, 'input_files'), size, rows_per_sheet, sheets)
+        source_rows = generate_source_workbook(
+            os.path.join(workdir, 'source.xlsx'), size, max(info['rows'] // 4, 1))
+
+        # merge / word 依赖 generate 的输出，未选择 generate 时先不计时地运行一次
+        if 'generate' not in stages:
+            measure('generate', workdir)
+
+        results = []
+        for stage in STAGES:
+            if stage not in stages:
+                continue
+            r = measure(stage, workdir)
+            r.update(stage=stage, size=size)
+            if stage == 'word':
+                r['docs'] = info['groups']
+                r['docs_per_sec'] = info['groups'] / r['seconds']
+                r['throughput'] = r['docs_per_sec']
+            else:
+                rows = info['rows'] + (source_rows if stage == 'merge' else 0)
+                r['rows'] = rows
+                r['rows_per_sec'] = rows / r['seconds']
+                r['throughput'] = r['rows_per_sec']
+            results.append(r)
+        return results
+    finally:
+        if keep:
+            print(f'保留测试目录: {workdir}')
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_table(results):
+    print(f"{'阶段':<10}{'人数':>8}{'耗时(s)':>10}{'CPU(s)':>10}{'行/秒':>12}{'文档/秒':>10}{'峰值内存(MB)':>14}")
+    for r in results:
+        rss = r['peak_rss_mb']
+        print(f"{r['stage']:<10}{r['size']:>8}{r['seconds']:>10.2f}{r['cpu_seconds']:>10.2f}"
+              f"{r.get('rows_per_sec', 0):>12.1f}{r.get('docs_per_sec', 0):>10.2f}"
+              f"{rss if rss is None else round(rss, 1)!s:>14}")
+
+
+def check_baseline(results, baseline_path, tolerance):
+    """与基线比较吞吐，返回退化的条目"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['stage'], r['size']): r for r in json.load(f)['results']}
+    regressions = []
+    for r in results:
+        base = baseline.get((r['stage'], r['size']))
+        if base and r['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append((r, base))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Excel → Word 流程基准测试')
+    parser.add_argument('--sizes', default='5,20,50', help='员工文件数，逗号分隔')
+    parser.add_argument('--stages', default=','.join(STAGES), help='要测量的阶段，逗号分隔')
+    parser.add_argument('--rows', type=int, default=8, help='每个 sheet 的数据行数')
+    parser.add_argument('--sheets', type=int, default=2, help='每个文件的 sheet 数')
+    parser.add_argument('--output', help='结果写入 JSON 文件')
+    parser.add_argument('--baseline', help='基线 JSON 文件，用于回归检查')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的吞吐下降比例')
+    parser.add_argument('--keep', action='store_true', help='保留生成的测试目录')
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_stage:
+        run_stage(args.run_stage, args.workdir)
+        return 0
+
+    stages = [s for s in args.stages.split(',') if s]
+    results = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        print(f'测试规模: {size} 个员工文件...')
+        results.extend(bench_size(size, stages, args.rows, args.sheets, args.keep))
+
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f'结果已保存: {args.output}')
+
+    if args.baseline:
+        regressions = check_baseline(results, args.baseline, args.tolerance)
+        for r, base in regressions:
+            print(f"[退化] {r['stage']} @ {r['size']}: {r['throughput']:.2f}/s < 基线 {base['throughput']:.2f}/s")
+        if regressions:
+            return 1
+        print('未发现性能退化')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
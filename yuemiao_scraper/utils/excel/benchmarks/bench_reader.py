@@ -0,0 +1,100 @@
+"""
+ExcelReader 读取引擎基准测试
+
+用 excel_generate.process_excel_file 分别以各个读取引擎（openpyxl/xlrd、calamine）
+提取同一批审批表，比较耗时，并检查提取结果是否完全一致。
+
+    python benchmarks/bench_reader.py                 # 生成 200 个模拟审批表测试
+    python benchmarks/bench_reader.py ./input_files   # 使用实际的审批表目录
+    python benchmarks/bench_reader.py -n 500 --repeat 3
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+EXCEL_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, EXCEL_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import excel_generate
+import excel_reader
+
+
+def list_input_files(input_dir):
+    files = []
+    for root, dirs, names in os.walk(input_dir):
+        for name in names:
+            if name.endswith(('.xlsx', '.xls')) and not name.startswith('~$'):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def extract_all(files, backend):
+    """返回 (提取结果, 耗时)，工具自身的打印不计入终端输出"""
+    excel_reader.READER_BACKEND = backend
+    results = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for filepath in files:
+            results.append(excel_generate.process_excel_file(filepath))
+    return results, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ExcelReader 读取引擎基准测试')
+    parser.add_argument('input_dir', nargs='?', help='审批表目录，不填时生成模拟数据')
+    parser.add_argument('-n', '--files', type=int, default=200, help='生成的模拟审批表数量')
+    parser.add_argument('--rows', type=int, default=8, help='每个 sheet 的数据行数')
+    parser.add_argument('--sheets', type=int, default=2, help='每个文件的 sheet 数')
+    parser.add_argument('--repeat', type=int, default=1, help='每个引擎重复次数，取最快一次')
+    args = parser.parse_args(argv)
+
+    workdir = None
+    input_dir = args.input_dir
+    if not input_dir:
+        from datagen import generate_employee_workbooks
+
+        workdir = tempfile.mkdtemp(prefix='bench_reader_')
+        input_dir = os.path.join(workdir, 'input_files')
+        generate_employee_workbooks(input_dir, args.files, args.rows, args.sheets)
+
+    try:
+        files = list_input_files(input_dir)
+        if not files:
+            print(f'{input_dir} 中没有 .xlsx / .xls 文件')
+            return 1
+
+        # openpyxl 和 xlrd 按文件类型自动选择，合在一起作为基准
+        backends = ['openpyxl'] + [b for b in excel_reader.available_backends() if b == 'calamine']
+        if 'calamine' not in backends:
+            print('未安装 python-calamine，只测试 openpyxl/xlrd')
+
+        baseline = None
+        print(f"{'引擎':<12}{'文件数':>8}{'行数':>10}{'耗时(s)':>10}{'文件/秒':>10}{'结果一致':>10}")
+        mismatched = False
+        for backend in backends:
+            best = None
+            for _ in range(args.repeat):
+                results, seconds = extract_all(files, backend)
+                best = seconds if best is None else min(best, seconds)
+            if baseline is None:
+                baseline = results
+            same = results == baseline
+            mismatched = mismatched or not same
+            rows = sum(len(r) for r in results)
+            name = 'openpyxl/xlrd' if backend == 'openpyxl' else backend
+            print(f"{name:<12}{len(files):>8}{rows:>10}{best:>10.2f}{len(files) / best:>10.1f}{'是' if same else '否':>10}")
+        return 1 if mismatched else 0
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
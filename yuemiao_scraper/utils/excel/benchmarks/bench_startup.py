@@ -0,0 +1,120 @@
+"""
+Excel 工具启动耗时基准测试
+
+在子进程中用 python -X importtime 导入各个工具模块，记录导入耗时（毫秒）、
+子进程总耗时以及耗时最多的依赖，用于跟踪启动优化的效果。
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --without numpy,pandas   # 模拟打包时排除这些依赖
+    python benchmarks/bench_startup.py --output startup.json
+    python benchmarks/bench_startup.py --baseline startup.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+EXCEL_DIR = os.path.dirname(BENCH_DIR)
+
+MODULES = ('excel_generate', 'excel_merge', 'excel_to_word', 'watch')
+
+
+def import_code(module, without=()):
+    lines = ['import sys']
+    # sys.modules 中设为 None 的模块导入时会抛出 ImportError，相当于未安装
+    lines += [f'sys.modules[{name!r}] = None' for name in without]
+    lines.append(f'import {module}')
+    return '\n'.join(lines)
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 [(模块, 累计微秒, 层级)]"""
+    result = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip())) // 2
+        result.append((name.strip(), int(cumulative), level))
+    return result
+
+
+def measure(module, without=(), repeat=5):
+    """返回 {'import_ms', 'process_ms', 'top'}，取多次运行的最小值"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', import_code(module, without)],
+            cwd=EXCEL_DIR, capture_output=True, text=True, encoding='utf-8',
+        )
+        process_ms = (time.perf_counter() - start) * 1000
+        if proc.returncode != 0:
+            raise RuntimeError(f'导入 {module} 失败:\n{proc.stderr[-2000:]}')
+        entries = parse_importtime(proc.stderr)
+        import_us = next(us for name, us, level in entries if name == module and level == 0)
+        if best is None or import_us < best['import_ms'] * 1000:
+            # 直接依赖中耗时最多的几个
+            deps = sorted((e for e in entries if e[2] == 1), key=lambda e: -e[1])
+            best = {
+                'module': module,
+                'import_ms': import_us / 1000,
+                'process_ms': process_ms,
+                'top': [(name, us / 1000) for name, us, level in deps[:3]],
+            }
+    return best
+
+
+def print_table(results):
+    print(f"{'模块':<16}{'导入(ms)':>10}{'进程(ms)':>10}  主要依赖")
+    for r in results:
+        top = ', '.join(f'{name} {ms:.0f}' for name, ms in r['top'])
+        print(f"{r['module']:<16}{r['import_ms']:>10.1f}{r['process_ms']:>10.1f}  {top}")
+
+
+def check_baseline(results, baseline_path, tolerance):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {r['module']: r for r in json.load(f)['results']}
+    regressions = []
+    for r in results:
+        base = baseline.get(r['module'])
+        if base and r['import_ms'] > base['import_ms'] * (1 + tolerance):
+            regressions.append((r, base))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Excel 工具启动耗时基准测试')
+    parser.add_argument('--modules', default=','.join(MODULES), help='要测量的模块，逗号分隔')
+    parser.add_argument('--without', default='', help='视为未安装的模块，逗号分隔，如 numpy,pandas')
+    parser.add_argument('--repeat', type=int, default=5, help='每个模块运行次数，取最快一次')
+    parser.add_argument('--output', help='结果写入 JSON 文件')
+    parser.add_argument('--baseline', help='基线 JSON 文件，导入耗时超出时返回非 0')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的导入耗时增加比例')
+    args = parser.parse_args(argv)
+
+    without = [m for m in args.without.split(',') if m]
+    results = [measure(m, without, args.repeat) for m in args.modules.split(',') if m]
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version, 'without': without, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+        print(f'结果已保存: {args.output}')
+
+    if args.baseline:
+        regressions = check_baseline(results, args.baseline, args.tolerance)
+        for r, base in regressions:
+            print(f"[退化] {r['module']}: {r['import_ms']:.1f}ms > 基线 {base['import_ms']:.1f}ms")
+        if regressions:
+            return 1
+        print('未发现启动耗时退化')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+生成基准测试用的模拟数据
+
+- 员工审批表：与 excel_generate.CONFIG 的布局一致
+  B3 姓名、F3 部门、B4 岗位，第 6 行开始为数据行，数据行之后为“审批意见”结束标记
+- 合并源文件：与 output_summary.xlsx 相同的 13 列汇总格式，
+  一部分行与审批表数据重复，用于 excel_merge 的去重/插入
+"""
+import json
+import os
+import random
+from datetime import date, timedelta
+
+from openpyxl import Workbook
+
+HEADER = ['序号', '执行时间', '调资文号', '下文时间', '调资前岗薪工资级档',
+          '调资后岗薪工资级档', '本次调资原因', '备注']
+SUMMARY_COLUMNS = ['姓名', '员工编号', '变动后部门/单位', '变动后岗位', '执行工资级别起算时间',
+                   '文号', '下文时间', '调整前执行工资级别', '调整前执行工资档位',
+                   '调整后执行工资级别', '调整后执行工资档位', '本次调资原因', '备注']
+DEPARTMENTS = ['南海西部石油研究院', '科技与信息化部', '工程技术部', '生产部', '财务部']
+POSTS = ['工程师', '高级工程师', '数据治理工程师（工程）', '主管', '经理']
+REASONS = ['晋升', '调档', '改革套入', '转正定级']
+LEVELS = ['GM', 'T13', 'T12', 'T11', 'T10', 'B6', 'B5']
+
+
+def _history(rng, rows):
+    """生成一个人连续的调资记录：(执行时间, 文号, 下文时间, 调整前, 调整后, 原因, 备注)"""
+    start = date(2005, 1, 1) + timedelta(days=rng.randint(0, 3650))
+    level = f'{rng.choice(LEVELS)}/01'
+    records = []
+    for i in range(rows):
+        effective = start + timedelta(days=365 * i + rng.randint(0, 200))
+        issued = effective + timedelta(days=rng.randint(0, 180))
+        new_level = f'{rng.choice(LEVELS)}/{rng.randint(1, 9):02d}'
+        records.append((
+            effective,
+            f'中海油湛人字〔{effective.year}〕{rng.randint(1, 400)}号',
+            issued,
+            level,
+            new_level,
+            rng.choice(REASONS),
+            rng.choice([None, '专业技术序列晋升']),
+        ))
+        level = new_level
+    return records
+
+
+def generate_employee_workbooks(out_dir, n_files, rows_per_sheet=8, sheets_per_file=2, seed=0):
+    """生成 n_files 个员工审批表，返回数据清单（行数、分组数、文件列表）"""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    files = []
+    total_rows = 0
+
+    for n in range(n_files):
+        name = f'员工{n:05d}'
+        filename = f'{10000000 + n}-{name}.xlsx'
+        wb = Workbook()
+        wb.remove(wb.active)
+        for s in range(sheets_per_file):
+            ws = wb.create_sheet(str(2020 + s))
+            ws['A1'] = '岗位工资调整审批表'
+            ws['A2'] = '单位名称：中海石油（中国）有限公司湛江分公司'
+            ws['A3'], ws['B3'], ws['C3'] = '姓名', name, '工作部门'
+            ws['F3'] = DEPARTMENTS[(n + s) % len(DEPARTMENTS)]
+            ws['A4'], ws['B4'] = '目前职务', POSTS[(n + s) % len(POSTS)]
+            ws.append(HEADER)
+            for i, record in enumerate(_history(rng, rows_per_sheet), 1):
+                ws.append((i,) + record)
+            ws.append(['审批意见'])
+            total_rows += rows_per_sheet
+        wb.save(os.path.join(out_dir, filename))
+        files.append(filename)
+
+    return {
+        'files': n_files,
+        'rows': total_rows,
+        'groups': n_files * sheets_per_file,
+    }
+
+
+def generate_source_workbook(path, n_files, rows, seed=1):
+    """
+    生成 excel_merge 的源文件：行的前四列取自已有员工（同一分组），
+    约一半的行执行时间与审批表数据不同，会被插入到对应分组中
+    """
+    rng = random.Random(seed)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '汇总数据'
+    ws.append(SUMMARY_COLUMNS)
+    for _ in range(rows):
+        n = rng.randrange(max(n_files, 1))
+        s = rng.randrange(2)
+        effective = date(2005, 1, 1) + timedelta(days=rng.randint(0, 7000))
+        ws.append([
+            f'员工{n:05d}',
+            f'{10000000 + n}-员工{n:05d}',
+            DEPARTMENTS[(n + s) % len(DEPARTMENTS)],
+            POSTS[(n + s) % len(POSTS)],
+            effective.strftime('%Y-%m-%d'),
+            f'中海油湛人字〔{effective.year}〕{rng.randint(1, 400)}号',
+            (effective + timedelta(days=30)).strftime('%Y-%m-%d'),
+            rng.choice(LEVELS), '01', rng.choice(LEVELS), '02',
+            rng.choice(REASONS), None,
+        ])
+    wb.save(path)
+    return rows
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='生成模拟审批表')
+    parser.add_argument('out_dir')
+    parser.add_argument('-n', '--files', type=int, default=100)
+    parser.add_argument('--rows', type=int, default=8, help='每个 sheet 的数据行数')
+    parser.add_argument('--sheets', type=int, default=2, help='每个文件的 sheet 数')
+    args = parser.parse_args()
+    info = generate_employee_workbooks(args.out_dir, args.files, args.rows, args.sheets)
+    print(json.dumps(info, ensure_ascii=False))
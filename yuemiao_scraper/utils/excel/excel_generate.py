@@ -5,12 +5,18 @@ from openpyxl.utils import get_column_letter
 from datetime import datetime
 
 from excel_reader import ExcelReader
+import instrumentation
+import table_store
+
+log = instrumentation.get_logger('generate')
 
 # 配置项
 CONFIG = {
     'input_directory': './input_files',  # 要遍历的目录路径
     'output_filename': 'output_summary.xlsx',  # 输出文件名
     'sheet_name': '汇总数据',  # 输出文件的sheet名称
+    # 同时写出的中间数据文件（SQLite），excel_to_word / excel_merge 可直接读取，None 为不生成
+    'intermediate_store': None,  # 如 'output_summary.sqlite'
 
     # 固定字段的单元格配置（每个文件只读取一次）
     'fixed_fields': {
@@ -77,75 +83,110 @@ def process_excel_file(filepath):
     """
     处理单个Excel文件，提取所有有效数据
     """
-    reader = ExcelReader(filepath)  # 使用导入的类
     filename = os.path.basename(filepath)
     employee_id = parse_employee_id(filename)
 
     all_data = []
 
-    for sheet_name in reader.sheetnames:
-        sheet = reader.get_sheet(sheet_name)
-
-        # 读取固定字段的值
-        fixed_data = {
-            '员工编号': employee_id
-        }
-
-        for field, cell_ref in CONFIG['fixed_fields'].items():
-            try:
-                # 确保单元格引用格式正确
-                if not isinstance(cell_ref, str) or not cell_ref[0].isalpha():
-                    print(f"警告: 无效的单元格引用格式 {cell_ref}")
-                    cell_value = None
-                else:
-                    # 使用reader的方法获取单元格值
-                    cell_value = reader.get_cell_value(sheet, cell_ref)
-
-            except Exception as e:
-                print(f"读取 {field} @ {cell_ref} 出错: {str(e)}")
-                cell_value = None
+    with instrumentation.stage('read'):
+        reader = ExcelReader(filepath)  # 使用导入的类
+
+    # with 结束时关闭文件，避免批量处理大量文件时句柄和内存累积
+    with reader:
+        for sheet_name in reader.sheetnames:
+            with instrumentation.stage('read'):
+                reader.get_sheet(sheet_name)
+            with instrumentation.stage('extract'):
+                all_data.extend(process_sheet(reader, sheet_name, employee_id))
+            instrumentation.count('sheets')
+            # 每个 sheet 处理完立即释放
+            reader.unload_sheet(sheet_name)
+
+    return all_data
+
+
+# 由调整前/调整后工资级别解析出的列，顺序与 parse_salary_info 的结果对应
+DERIVED_COLUMNS = ('调整前执行工资级别', '调整前执行工资档位', '调整后执行工资级别', '调整后执行工资档位')
+# 原始的工资级别字段，不在最终输出中
+RAW_SALARY_COLUMNS = ('调整前工资级别', '调整后工资级别')
+
+
+def row_layout():
+    """
+    CONFIG['output_columns'] 中每一列的取值来源，用于直接按输出列顺序生成每行的 tuple：
+    ('derived', 序号) / ('dynamic', 字段) / ('fixed', 字段) / ('', None) 表示空字符串
+    同名字段的优先级与原来逐行组装 dict 时相同：解析出的列 > 动态字段 > 固定字段
+    """
+    layout = []
+    for column in CONFIG['output_columns']:
+        if column in DERIVED_COLUMNS:
+            layout.append(('derived', DERIVED_COLUMNS.index(column)))
+        elif column in RAW_SALARY_COLUMNS:
+            layout.append(('', None))
+        elif column in CONFIG['dynamic_columns']:
+            layout.append(('dynamic', column))
+        elif column == '员工编号' or column in CONFIG['fixed_fields']:
+            layout.append(('fixed', column))
+        else:
+            layout.append(('', None))
+    return layout
+
+
+def process_sheet(reader, sheet_name, employee_id):
+    """
+    提取单个sheet中的所有有效数据
+    每行为按 CONFIG['output_columns'] 排列的 tuple，固定字段的值在同一个 sheet 的各行间共用
+    """
+    all_data = []
+    layout = row_layout()
 
-            fixed_data[field] = cell_value
+    sheet = reader.get_sheet(sheet_name)
 
-        # 处理动态数据行
-        row_num = CONFIG['data_start_row']
-        while True:
-            # 检查是否到达结束标记（使用reader的方法）
-            if reader.check_end_marker(sheet, row_num, CONFIG['end_marker']):
-                break
+    # 读取固定字段的值
+    fixed_data = {
+        '员工编号': employee_id
+    }
 
-            # 创建当前行数据的副本（包含固定字段）
-            row_data = fixed_data.copy()
+    for field, cell_ref in CONFIG['fixed_fields'].items():
+        try:
+            # 确保单元格引用格式正确
+            if not isinstance(cell_ref, str) or not cell_ref[0].isalpha():
+                print(f"警告: 无效的单元格引用格式 {cell_ref}")
+                cell_value = None
+            else:
+                # 使用reader的方法获取单元格值
+                cell_value = reader.get_cell_value(sheet, cell_ref)
+
+        except Exception as e:
+            print(f"读取 {field} @ {cell_ref} 出错: {str(e)}")
+            cell_value = None
 
-            # 读取动态字段的值（使用reader的方法）
-            dynamic_values = reader.get_row_values(sheet, row_num, CONFIG['dynamic_columns'])
-            row_data.update(dynamic_values)
+        fixed_data[field] = cell_value
 
-            # 解析调整前工资级别
-            before_salary = row_data['调整前工资级别']
-            before_level, before_grade = parse_salary_info(before_salary)
-            row_data['调整前执行工资级别'] = before_level
-            row_data['调整前执行工资档位'] = before_grade
+    # 处理动态数据行
+    row_num = CONFIG['data_start_row']
+    while True:
+        # 检查是否到达结束标记（使用reader的方法）
+        if reader.check_end_marker(sheet, row_num, CONFIG['end_marker']):
+            break
 
-            # 解析调整后工资级别
-            after_salary = row_data['调整后工资级别']
-            after_level, after_grade = parse_salary_info(after_salary)
-            row_data['调整后执行工资级别'] = after_level
-            row_data['调整后执行工资档位'] = after_grade
+        # 读取动态字段的值（使用reader的方法）
+        dynamic_values = reader.get_row_values(sheet, row_num, CONFIG['dynamic_columns'])
 
-            # 删除原始的工资级别字段（不在最终输出中）
-            del row_data['调整前工资级别']
-            del row_data['调整后工资级别']
+        # 解析调整前/调整后工资级别 → (级别, 档位, 级别, 档位)
+        derived = (parse_salary_info(dynamic_values['调整前工资级别'])
+                   + parse_salary_info(dynamic_values['调整后工资级别']))
 
-            all_data.append(row_data)
-            row_num += 1
+        sources = {'derived': derived, 'dynamic': dynamic_values, 'fixed': fixed_data}
+        all_data.append(tuple(sources[kind][key] if kind else '' for kind, key in layout))
+        row_num += 1
 
     return all_data
 
 
 def generate_output_file(data):
     """
-    生成汇总的Excel文件
+    生成汇总的Excel文件，data 中每行为按 CONFIG['output_columns'] 排列的 tuple
     """
     wb = Workbook()
     ws = wb.active
@@ -157,39 +198,51 @@ def generate_output_file(data):
         ws[f'{col_letter}1'] = column_title
 
     # 写入数据
-    for row_num, row_data in enumerate(data, 2):
-        for col_num, column_key in enumerate(CONFIG['output_columns'], 1):
-            col_letter = get_column_letter(col_num)
-            cell_value = row_data.get(column_key, '')
-
+    store_path = CONFIG.get('intermediate_store')
+    store_rows = []
+    with instrumentation.stage('render'):
+        for row in data:
             # 处理日期格式
-            if isinstance(cell_value, datetime):
-                cell_value = cell_value.strftime('%Y-%m-%d')
-
-            ws[f'{col_letter}{row_num}'] = cell_value
-
-    # 自动调整列宽
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter  # 获取列字母
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2) * 1.2
-        ws.column_dimensions[column].width = adjusted_width
+            values = [v.strftime('%Y-%m-%d') if isinstance(v, datetime) else v for v in row]
+            ws.append(values)
+            if store_path:
+                store_rows.append(values)
+
+        # 自动调整列宽
+        for col in ws.columns:
+            max_length = 0
+            column = col[0].column_letter  # 获取列字母
+            for cell in col:
+                try:
+                    if len(str(cell.value)) > max_length:
+                        max_length = len(str(cell.value))
+                except:
+                    pass
+            adjusted_width = (max_length + 2) * 1.2
+            ws.column_dimensions[column].width = adjusted_width
 
     # 保存文件
-    wb.save(CONFIG['output_filename'])
+    with instrumentation.stage('save'):
+        wb.save(CONFIG['output_filename'])
     print(f"汇总文件已生成: {CONFIG['output_filename']}")
 
+    # 在 xlsx 之后写入，保证中间文件不早于 xlsx
+    if store_path:
+        with instrumentation.stage('save'):
+            table_store.write_table(store_path, CONFIG['output_columns'], store_rows)
+        print(f"中间数据文件已生成: {store_path}")
+
 
 def main():
     """
     主函数：遍历目录，处理所有Excel文件
+    各步骤耗时和计数（设置 EXCEL_REPORT 时写入 excel_generate.report.json），见 instrumentation.py
     """
+    with instrumentation.Run('excel_generate'):
+        run_generate()
+
+
+def run_generate():
     start_time = datetime.now()
     print(f"开始处理，时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
 
@@ -202,18 +255,22 @@ def main():
             if file.endswith(('.xlsx', '.xls')):
                 filepath = os.path.join(root, file)
                 try:
-                    print(f"开始处理文件: {file}")
+                    log.debug("开始处理文件: %s", file)
                     file_data = process_excel_file(filepath)
                     all_data.extend(file_data)
                     processed_files += 1
-                    print(f"已处理文件: {file}")
+                    log.info("已处理文件: %s", file)
                 except Exception as e:
-                    print(f"处理文件 {file} 时出错: {str(e)}")
+                    instrumentation.count('errors')
+                    log.error("处理文件 %s 时出错: %s", file, e)
 
     if not all_data:
         print("没有找到可处理的数据")
         return
 
+    instrumentation.count('files', processed_files)
+    instrumentation.count('rows', len(all_data))
+
     # 生成汇总文件
     generate_output_file(all_data)
 
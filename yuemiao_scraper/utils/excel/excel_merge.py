@@ -1,13 +1,29 @@
+import argparse
+import glob
+import os
+
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from datetime import datetime, date
 from dateutil.parser import parse
 
+import instrumentation
+import table_store
+
+log = instrumentation.get_logger('merge')
+
 SOURCE_FILE = './source.xlsx'
+SOURCE_FILES = []  # 多个源文件或目录（目录下的所有 .xlsx），非空时代替 SOURCE_FILE
 TARGET_FILE = './output_summary.xlsx'
+TARGET_STORE = None  # excel_generate 生成的中间数据文件（如 './output_summary.sqlite'），比 TARGET_FILE 新时代替它读取
 OUTPUT_FILE = './合并文件.xlsx'
 CONDITION_COLUMNS = 4
 TIME_COLUMN = 5
 DATE_COLUMNS = [5, 7]  # 只处理 E 和 G 列为日期
+STREAM_MODE = False  # 文件过大无法一次读入内存时开启，见 merge_stream.py
+INDEX_MODE = False   # 增量合并：结果保存在输出文件旁的索引中，见 merge_index.py
+INDEX_FILE = None    # 索引文件，默认 OUTPUT_FILE + '.index.sqlite'
+INDEX_EXPORT = False  # 索引模式下每次合并后都重新导出 OUTPUT_FILE（否则只在 --export 时导出）
 
 
 def format_date_value(value):
@@ -20,7 +36,7 @@ def format_date_value(value):
             dt = parse(value)
             return dt.strftime('%Y-%m-%d')
         except Exception as e:
-            print(f"[警告] 日期解析失败（format）: '{value}' → {e}")
+            log.warning("[警告] 日期解析失败（format）: '%s' → %s", value, e)
     return str(value)
 
 
@@ -28,53 +44,94 @@ def parse_date_safe(val):
     try:
         return parse(val).date()
     except Exception as e:
-        print(f"[警告] 日期解析失败（parse）: '{val}' → {e}")
+        log.warning("[警告] 日期解析失败（parse）: '%s' → %s", val, e)
         return None
 
 
-def read_data_from_workbook(wb):
-    """仅读取指定列为日期格式，其余强制文本"""
-    sheet = wb.worksheets[0]
-    data = []
+def format_row(row):
+    """仅指定列按日期格式化，其余强制文本"""
+    formatted_row = []
+    for col_idx, cell in enumerate(row, 1):
+        if col_idx in DATE_COLUMNS:
+            formatted_cell = format_date_value(cell)
+        else:
+            formatted_cell = str(cell) if cell is not None else ""
+        formatted_row.append(formatted_cell)
+    return formatted_row
+
 
-    for row_idx, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+def iter_formatted_rows(sheet):
+    """逐行读取并格式化，跳过空行"""
+    for row in sheet.iter_rows(values_only=True):
         if not any(row):
             continue
-        formatted_row = []
-        for col_idx, cell in enumerate(row, 1):
-            if col_idx in DATE_COLUMNS:
-                formatted_cell = format_date_value(cell)
-            else:
-                formatted_cell = str(cell) if cell is not None else ""
-            formatted_row.append(formatted_cell)
-        data.append(formatted_row)
+        yield format_row(row)
+
+
+def read_data_from_workbook(wb):
+    """仅读取指定列为日期格式，其余强制文本"""
+    sheet = wb.worksheets[0]
+    data = list(iter_formatted_rows(sheet))
     print(f"[信息] 读取工作簿共 {len(data)} 行（含表头）")
     return data
 
 
-def write_data_to_workbook(data, output_file):
-    wb = openpyxl.Workbook()
-    sheet = wb.active
-
-    for row_idx, row in enumerate(data, 1):
-        for col_idx, value in enumerate(row, 1):
-            cell = sheet.cell(row=row_idx, column=col_idx, value=value)
+def iter_store_rows(path):
+    """逐行读取中间数据文件，格式化方式与读取 xlsx 相同"""
+    for row in table_store.iter_table(path):
+        if not any(row):
+            continue
+        yield format_row(row)
+
+
+def read_data_from_path(path):
+    if table_store.is_store(path):
+        data = list(iter_store_rows(path))
+        print(f"[信息] 读取中间数据文件共 {len(data)} 行（含表头）")
+        return data
+    return read_data_from_workbook(openpyxl.load_workbook(path, data_only=True))
+
+
+def target_input():
+    """目标数据的来源：中间数据文件不早于 TARGET_FILE 时直接读取它"""
+    if table_store.is_fresh(TARGET_STORE, TARGET_FILE):
+        return TARGET_STORE
+    return TARGET_FILE
+
+
+def write_text_rows(rows, output_file):
+    """
+    只写模式写出，所有单元格为文本格式，返回写出的行数
+    每列复用同一个设置好文本格式的单元格，只替换值，不为每个单元格创建样式
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = wb.create_sheet('Sheet')
+    text_cells = []
+    count = 0
+    for row in rows:
+        while len(text_cells) < len(row):
+            cell = WriteOnlyCell(sheet)
             cell.number_format = '@'  # 设置为文本格式
-
+            text_cells.append(cell)
+        cells = text_cells[:len(row)]
+        for cell, value in zip(cells, row):
+            cell.value = value
+        sheet.append(cells)  # 只写模式下 append 时即写入，之后可以复用这些单元格
+        count += 1
     wb.save(output_file)
-    print(f"[信息] 写入完成，共输出 {len(data)} 行 → {output_file}")
+    return count
 
 
-def merge_by_insertion(source_data, target_data):
-    if not target_data:
-        return source_data
+def write_data_to_workbook(data, output_file):
+    count = write_text_rows(data, output_file)
+    print(f"[信息] 写入完成，共输出 {count} 行 → {output_file}")
 
-    header = target_data[0]
-    result = target_data[:]
-    existing_keys = {tuple(row[:5]) for row in result[1:]}
-
-    print(f"[信息] 目标数据现有 {len(result) - 1} 条（不含表头）")
 
+def merge_rows_into(result, existing_keys, source_data):
+    """
+    把 source_data（含表头）逐行插入 result，existing_keys 为 result 中已有的前五列
+    返回 (插入数, 跳过数)
+    """
     inserted_count = 0
     skipped_count = 0
 
@@ -84,7 +141,7 @@ def merge_by_insertion(source_data, target_data):
         src_date = parse_date_safe(src_row[TIME_COLUMN - 1])
 
         if key_5 in existing_keys:
-            print(f"[跳过] 第 {row_index} 行前五列重复，未插入：{key_5}")
+            log.debug("[跳过] 第 %s 行前五列重复，未插入：%s", row_index, key_5)
             skipped_count += 1
             continue
 
@@ -97,7 +154,7 @@ def merge_by_insertion(source_data, target_data):
             if tgt_key_4 == key_4:
                 if src_date and tgt_date and src_date < tgt_date:
                     result.insert(i, src_row)
-                    print(f"[插入-中间] 行 {row_index} 插入第 {i + 1} 行：{key_5} < {tgt_date}")
+                    log.debug("[插入-中间] 行 %s 插入第 %s 行：%s < %s", row_index, i + 1, key_5, tgt_date)
                     existing_keys.add(key_5)
                     inserted = True
                     inserted_count += 1
@@ -110,36 +167,209 @@ def merge_by_insertion(source_data, target_data):
                     last_group_index = i
             if last_group_index != -1:
                 result.insert(last_group_index + 1, src_row)
-                print(f"[插入-分组尾] 行 {row_index} 插入到分组末尾（第 {last_group_index + 2} 行）: {key_4}")
+                log.debug("[插入-分组尾] 行 %s 插入到分组末尾（第 %s 行）: %s", row_index, last_group_index + 2, key_4)
             else:
                 result.append(src_row)
-                print(f"[插入-文件尾] 行 {row_index} 新分组，追加至文件末尾：{key_4}")
+                log.debug("[插入-文件尾] 行 %s 新分组，追加至文件末尾：%s", row_index, key_4)
             existing_keys.add(key_5)
             inserted_count += 1
 
+    return inserted_count, skipped_count
+
+
+def merge_by_insertion(source_data, target_data):
+    if not target_data:
+        return source_data
+
+    result = target_data[:]
+    existing_keys = {tuple(row[:5]) for row in result[1:]}
+
+    print(f"[信息] 目标数据现有 {len(result) - 1} 条（不含表头）")
+
+    inserted_count, skipped_count = merge_rows_into(result, existing_keys, source_data)
+
     print(f"[汇总] 插入 {inserted_count} 行，跳过 {skipped_count} 行")
     return result
 
 
-def main():
-    print("[开始] 读取文件...")
-    source_wb = openpyxl.load_workbook(SOURCE_FILE, data_only=True)
-    target_wb = openpyxl.load_workbook(TARGET_FILE, data_only=True)
+def merge_many(sources_data, target_data):
+    """
+    一次性把多个源文件按顺序合并进目标，结果与逐个运行 merge_by_insertion 相同
+    sources_data 为 [(名称, 数据)]，返回 (结果, [(名称, 插入数, 跳过数)])
+    """
+    report = []
+    result = target_data[:]
+    if not result and sources_data:
+        # 目标为空时第一个源文件直接作为基础
+        name, data = sources_data[0]
+        result = data[:]
+        report.append((name, max(len(data) - 1, 0), 0))
+        sources_data = sources_data[1:]
+    if not result:
+        return result, report
+
+    existing_keys = {tuple(row[:5]) for row in result[1:]}
+    print(f"[信息] 目标数据现有 {len(result) - 1} 条（不含表头）")
 
-    source_data = read_data_from_workbook(source_wb)
-    target_data = read_data_from_workbook(target_wb)
+    for name, data in sources_data:
+        print(f"[开始] 合并源文件：{name}")
+        inserted_count, skipped_count = merge_rows_into(result, existing_keys, data)
+        report.append((name, inserted_count, skipped_count))
+
+    return result, report
+
+
+def print_report(report):
+    total_inserted = total_skipped = 0
+    for name, inserted_count, skipped_count in report:
+        print(f"[汇总] {name}：插入 {inserted_count} 行，跳过 {skipped_count} 行")
+        total_inserted += inserted_count
+        total_skipped += skipped_count
+    instrumentation.count('inserted', total_inserted)
+    instrumentation.count('skipped', total_skipped)
+    if len(report) > 1:
+        print(f"[汇总] 共 {len(report)} 个源文件，插入 {total_inserted} 行，跳过 {total_skipped} 行")
+
+
+def collect_source_files(paths, exclude=()):
+    """展开目录为其中的 .xlsx 文件（按文件名排序），跳过 Excel 临时文件和 exclude 中的文件"""
+    excluded = {os.path.abspath(p) for p in exclude}
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = sorted(glob.glob(os.path.join(path, '*.xlsx')))
+        else:
+            candidates = [path]
+        for file in candidates:
+            if os.path.basename(file).startswith('~$'):
+                continue
+            if os.path.abspath(file) in excluded:
+                continue
+            files.append(file)
+    return files
+
+
+def merge_with_index(source_files, export=INDEX_EXPORT, rebuild=False):
+    """增量合并：只把新的源数据合并进索引，需要时再从索引导出 OUTPUT_FILE"""
+    from merge_index import open_index
+
+    index = open_index(OUTPUT_FILE, INDEX_FILE)
+    try:
+        if rebuild or index.is_empty():
+            target_path = target_input()
+            print(f"[开始] 从目标文件建立索引：{target_path}")
+            target_data = []
+            with instrumentation.stage('read'):
+                if os.path.exists(target_path):
+                    target_data = read_data_from_path(target_path)
+            with instrumentation.stage('merge'):
+                index.build(target_data)
+        else:
+            print(f"[信息] 使用已有索引 {index.path}（{index.row_count()} 条），目标文件更新后请加 --rebuild-index")
+
+        report = []
+        for source_file in source_files:
+            print(f"[开始] 合并源文件：{source_file}")
+            with instrumentation.stage('read'):
+                source_data = read_data_from_workbook(openpyxl.load_workbook(source_file, data_only=True))
+            with instrumentation.stage('merge'):
+                inserted_count, skipped_count = index.merge(source_data)
+            report.append((source_file, inserted_count, skipped_count))
+        print_report(report)
+
+        if export:
+            print("[开始] 从索引导出结果文件...")
+            with instrumentation.stage('save'):
+                write_data_to_workbook(index.iter_rows(), OUTPUT_FILE)
+        else:
+            print(f"[信息] 未导出 {OUTPUT_FILE}，需要时使用 --export")
+    finally:
+        index.close()
+
+
+def main(sources=None, stream=None, index=None, export=None, rebuild_index=False):
+    # 各步骤耗时和计数（设置 EXCEL_REPORT 时写入 excel_merge.report.json），见 instrumentation.py
+    with instrumentation.Run('excel_merge'):
+        run_merge(sources, stream, index, export, rebuild_index)
+
+
+def run_merge(sources, stream, index, export, rebuild_index):
+    if sources is None:
+        sources = SOURCE_FILES or [SOURCE_FILE]
+    if stream is None:
+        stream = STREAM_MODE
+    if index is None:
+        index = INDEX_MODE
+    if export is None:
+        export = INDEX_EXPORT
+    source_files = collect_source_files(sources, exclude=[TARGET_FILE, OUTPUT_FILE])
+    instrumentation.count('sources', len(source_files))
+    if TARGET_STORE and target_input() == TARGET_STORE:
+        print(f"[信息] 使用中间数据文件代替目标文件：{TARGET_STORE}")
+
+    if index:
+        merge_with_index(source_files, export=export, rebuild=rebuild_index)
+        print("[完成] 合并任务完成")
+        return
+
+    if not source_files:
+        print("[错误] 没有找到源文件")
+        return
+
+    if stream:
+        from merge_stream import merge_streaming
+        with instrumentation.stage('merge'):
+            report = merge_streaming(source_files, target_input(), OUTPUT_FILE)
+        print_report(report)
+        print("[完成] 合并任务完成")
+        return
+
+    print("[开始] 读取文件...")
+    with instrumentation.stage('read'):
+        target_data = read_data_from_path(target_input())
+        sources_data = []
+        for source_file in source_files:
+            source_wb = openpyxl.load_workbook(source_file, data_only=True)
+            sources_data.append((source_file, read_data_from_workbook(source_wb)))
 
     print("[开始] 执行合并逻辑...")
-    merged_data = merge_by_insertion(source_data, target_data)
+    with instrumentation.stage('merge'):
+        merged_data, report = merge_many(sources_data, target_data)
+    print_report(report)
 
     print("[开始] 写入结果文件...")
-    write_data_to_workbook(merged_data, OUTPUT_FILE)
+    with instrumentation.stage('save'):
+        write_data_to_workbook(merged_data, OUTPUT_FILE)
+    instrumentation.count('output_rows', max(len(merged_data) - 1, 0))
 
     print("[完成] 合并任务完成")
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='把一个或多个源文件合并进目标文件')
+    parser.add_argument('sources', nargs='*',
+                        help='源文件或目录（目录下的所有 .xlsx），不填时使用 SOURCE_FILES / SOURCE_FILE')
+    parser.add_argument('--target', default=None, help=f'目标文件，默认 {TARGET_FILE}')
+    parser.add_argument('--output', default=None, help=f'输出文件，默认 {OUTPUT_FILE}')
+    parser.add_argument('--stream', action='store_true', help='流式合并，用于超出内存的大文件')
+    parser.add_argument('--index', action='store_true', help='增量合并，结果保存在输出文件旁的索引中')
+    parser.add_argument('--rebuild-index', action='store_true', help='重新从目标文件建立索引')
+    parser.add_argument('--export', action='store_true', help='索引模式下从索引导出输出文件')
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.target:
+        TARGET_FILE = args.target
+    if args.output:
+        OUTPUT_FILE = args.output
+    sources = args.sources or None
+    if not args.sources and not args.index and (args.export or args.rebuild_index):
+        # 只加 --export / --rebuild-index 时只导出或重建索引，不合并默认的源文件
+        sources = []
+    main(sources=sources, stream=args.stream or None,
+         index=args.index or args.rebuild_index or args.export or None, export=args.export or None,
+         rebuild_index=args.rebuild_index)
     print("程序执行完毕！")
     input("按 Enter 键退出...")
-
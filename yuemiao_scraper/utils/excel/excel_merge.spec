@@ -10,7 +10,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['numpy', 'pandas'],  # 不需要，openpyxl 在没有 numpy 时也能正常工作，减小体积和启动时间
     noarchive=False,
     optimize=0,
 )
@@ -1,38 +1,177 @@
 import os
 import openpyxl
 import xlrd
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
 from typing import Any, Union
 
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # 可选依赖：pip install python-calamine
+    CalamineWorkbook = None
+
+# 读取引擎：auto（安装了 python-calamine 时使用 calamine，否则 openpyxl/xlrd）/ openpyxl / xlrd / calamine
+READER_BACKEND = 'auto'
+
+
+def available_backends():
+    backends = ['openpyxl', 'xlrd']
+    if CalamineWorkbook is not None:
+        backends.append('calamine')
+    return backends
+
+
+class SheetGrid:
+    """
+    按需读入内存的单张 sheet（openpyxl 只读模式或 calamine），
+    单元格值转换为 openpyxl（xlsx）/ xlrd（xls）普通模式会返回的值，保证与原来的读取结果一致
+    """
+
+    def __init__(self, rows, file_type, backend):
+        self.rows = rows
+        self.file_type = file_type
+        self.backend = backend
+
+    def cell_value(self, row_num, col_num):
+        """行列号从 1 开始；xls 超出范围时与 xlrd 一样抛出 IndexError"""
+        try:
+            value = self.rows[row_num - 1][col_num - 1]
+        except IndexError:
+            if self.file_type == 'xls':
+                raise
+            return None
+        if self.backend == 'openpyxl':
+            # 处理xlsx的日期格式
+            if isinstance(value, datetime):
+                return value.strftime('%Y-%m-%d')
+            return value
+        return self._convert(value)
+
+    def _convert(self, value):
+        # 日期统一格式化，与 openpyxl / xlrd 分支的处理相同
+        if isinstance(value, (datetime, date)):
+            return value.strftime('%Y-%m-%d')
+
+        if self.file_type == 'xlsx':
+            if value == '':
+                return None
+            # openpyxl 对不带小数点/指数的数字返回 int
+            if isinstance(value, float) and value.is_integer() and 'e' not in '%.16g' % value:
+                return int(value)
+            return value
+
+        # xls：xlrd 的数字都是 float，布尔值为 0/1，时间按 1899-12-31 的日期处理
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, int):
+            return float(value)
+        if isinstance(value, time):
+            return '1899-12-31'
+        if isinstance(value, timedelta):
+            # 与 xlrd.xldate_as_datetime 相同（1900 日期系统）
+            epoch = datetime(1899, 12, 31) if value.days < 60 else datetime(1899, 12, 30)
+            return (epoch + value).strftime('%Y-%m-%d')
+        return value
+
 
 class ExcelReader:
-    """统一封装xls和xlsx的读取操作"""
+    """
+    统一封装xls和xlsx的读取操作
+
+    打开文件时只读取 sheet 列表，get_sheet 时才加载对应的 sheet，unload_sheet 释放；
+    用完后调用 close()，或者用 with 语句：
 
-    def __init__(self, filepath):
+        with ExcelReader(filepath) as reader:
+            ...
+    """
+
+    def __init__(self, filepath, backend=None):
         self.filepath = filepath
         _, ext = os.path.splitext(filepath)
         ext = ext.lower()
 
         if ext == '.xlsx':
-            self.wb = openpyxl.load_workbook(filepath, data_only=True)
             self.file_type = 'xlsx'
         elif ext == '.xls':
-            self.wb = xlrd.open_workbook(filepath)
             self.file_type = 'xls'
         else:
             raise ValueError(f"不支持的文件格式: {ext}")
 
+        self.backend = self._choose_backend(backend or READER_BACKEND)
+        self._sheets = {}
+        if self.backend == 'calamine':
+            self.wb = CalamineWorkbook.from_path(filepath)
+        elif self.file_type == 'xlsx':
+            # 只读模式不会一次解析所有 sheet
+            self.wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+        else:
+            self.wb = xlrd.open_workbook(filepath, on_demand=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """释放已加载的 sheet 并关闭文件"""
+        if self.wb is None:
+            return
+        self._sheets.clear()
+        if self.backend == 'calamine':
+            self.wb.close()
+        elif self.file_type == 'xlsx':
+            self.wb.close()
+        else:
+            self.wb.release_resources()
+        self.wb = None
+
+    def _choose_backend(self, backend):
+        if backend == 'auto':
+            return 'calamine' if CalamineWorkbook is not None else self._default_backend()
+        if backend == 'calamine':
+            if CalamineWorkbook is None:
+                raise ValueError("未安装 python-calamine，无法使用 calamine 读取")
+            return backend
+        if backend in ('openpyxl', 'xlrd'):
+            # openpyxl 只能读 xlsx，xlrd 只能读 xls
+            return self._default_backend()
+        raise ValueError(f"不支持的读取引擎: {backend}")
+
+    def _default_backend(self):
+        return 'openpyxl' if self.file_type == 'xlsx' else 'xlrd'
+
     @property
     def sheetnames(self):
+        if self.backend == 'calamine':
+            return self.wb.sheet_names
         if self.file_type == 'xlsx':
             return self.wb.sheetnames
         return self.wb.sheet_names()
 
     def get_sheet(self, sheet_name):
+        sheet = self._sheets.get(sheet_name)
+        if sheet is None:
+            sheet = self._load_sheet(sheet_name)
+            self._sheets[sheet_name] = sheet
+        return sheet
+
+    def _load_sheet(self, sheet_name):
+        if self.backend == 'calamine':
+            rows = self.wb.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False)
+            return SheetGrid(rows, self.file_type, self.backend)
         if self.file_type == 'xlsx':
-            return self.wb[sheet_name]
+            ws = self.wb[sheet_name]
+            # 部分软件写出的 sheet 尺寸信息不准确，忽略它读取全部行
+            ws.reset_dimensions()
+            return SheetGrid(list(ws.iter_rows(values_only=True)), self.file_type, self.backend)
         return self.wb.sheet_by_name(sheet_name)
 
+    def unload_sheet(self, sheet_name):
+        """释放已加载的 sheet，之后再次 get_sheet 会重新读取"""
+        self._sheets.pop(sheet_name, None)
+        if self.backend == 'xlrd' and self.wb is not None:
+            self.wb.unload_sheet(sheet_name)
+
     def _convert_cell_ref(self, cell_ref: str) -> tuple:
         """将A1格式的单元格引用转换为(行号, 列号)"""
         col_letter = ''.join([c for c in cell_ref if c.isalpha()])
@@ -49,15 +188,13 @@ class ExcelReader:
         """统一获取单元格值的方法"""
         row_num, col_num = self._convert_cell_ref(cell_ref)
 
-        if self.file_type == 'xlsx':
-            # openpyxl的行列索引从1开始
-            cell = sheet.cell(row=row_num, column=col_num)
-            value = cell.value
-
-            # 处理xlsx的日期格式
-            if isinstance(value, datetime):
-                return value.strftime('%Y-%m-%d')
-            return value
+        if isinstance(sheet, SheetGrid):
+            # 行列号从1开始
+            try:
+                return sheet.cell_value(row_num, col_num)
+            except IndexError:
+                print(f"单元格 {cell_ref} 超出范围")
+                return None
         else:
             # xlrd的行列索引从0开始
             try:
@@ -85,8 +222,11 @@ class ExcelReader:
 
     def check_end_marker(self, sheet, row_num: int, end_marker: str) -> bool:
         """检查是否到达结束标记"""
-        if self.file_type == 'xlsx':
-            value = sheet.cell(row=row_num, column=1).value  # 第一列
+        if isinstance(sheet, SheetGrid):
+            try:
+                value = sheet.cell_value(row_num, 1)  # 第一列
+            except IndexError:
+                return True
         else:
             try:
                 value = sheet.cell_value(row_num - 1, 0)  # xls行号从0开始
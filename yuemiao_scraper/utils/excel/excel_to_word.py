@@ -1,101 +1,284 @@
 # main.py
+import hashlib
+import json
 import os
-import pandas as pd
 from concurrent.futures import ThreadPoolExecutor
 from word_processor import WordProcessor
 from collections import defaultdict
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+import instrumentation
+import table_store
+
+log = instrumentation.get_logger('word')
 
 # 配置部分
 EXCEL_PATH = 'output_summary.xlsx'
+STORE_PATH = None  # excel_generate 生成的中间数据文件（如 'output_summary.sqlite'），比 xlsx 新时优先读取
 TEMPLATE_PATH = 'template.docx'
 OUTPUT_DIR = './words'
 MAX_WORKERS = 4  # 并行处理的线程数
+INCREMENTAL = True  # 只重新生成内容或模板有变化的Word文件，False 时全部重新生成
+MANIFEST_NAME = '.manifest.json'  # 保存在 OUTPUT_DIR 中，记录每个分组对应的文件名和数据哈希
+
+# (表头, 数据行)，所有值都是字符串
+Table = Tuple[List[str], List[List[str]]]
+
+
+def read_excel(file_path: str) -> Table:
+    """
+    读取Excel文件并保留数字格式
+    所有列作为字符串处理，结果与 pd.read_excel(dtype=str, na_values=['', 'NA', 'N/A'],
+    keep_default_na=False).fillna('') 相同，不需要 pandas
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = wb.worksheets[0]
+        sheet.reset_dimensions()
+        values = [list(row) for row in sheet.iter_rows(values_only=True)]
+    finally:
+        wb.close()
 
+    # 与 pandas 一样去掉末尾的空行
+    while values and all(v is None or v == '' for v in values[-1]):
+        values.pop()
+    if not values:
+        return [], []
 
-def read_excel(file_path: str) -> pd.DataFrame:
-    """读取Excel文件并保留数字格式"""
-    # 读取时将所有列作为字符串处理，保留原始格式
-    df = pd.read_excel(
-        file_path,
-        sheet_name=0,
-        dtype=str,  # 所有列作为字符串读取
-        na_values=['', 'NA', 'N/A'],  # 自定义NA值
-        keep_default_na=False  # 不将空字符串等自动转为NaN
-    )
+    width = max(len(row) for row in values)
+    header = [str(v) if v is not None else '' for v in values[0]]
+    header += [''] * (width - len(header))
+    rows = []
+    for row in values[1:]:
+        text_row = [table_store.to_text(v) for v in row]
+        rows.append(text_row + [''] * (width - len(text_row)))
+    return header, rows
 
-    # 替换真正的NaN值为空字符串
-    return df.fillna('')
 
+def read_store(file_path: str) -> Table:
+    """读取中间数据文件，结果与 read_excel 读取对应的 xlsx 相同"""
+    columns, rows = table_store.read_table(file_path)
+    return list(columns), [[table_store.to_text(v) for v in row] for row in rows]
 
-def aggregate_data(df: pd.DataFrame) -> List[Dict[str, Any]]:
+
+def read_table_data() -> Table:
+    if table_store.is_fresh(STORE_PATH, EXCEL_PATH):
+        print(f"读取中间数据文件 {STORE_PATH}...")
+        return read_store(STORE_PATH)
+    if STORE_PATH:
+        print(f"中间数据文件 {STORE_PATH} 不存在或早于 {EXCEL_PATH}，改为读取 xlsx")
+    print("读取Excel文件...")
+    return read_excel(EXCEL_PATH)
+
+
+def aggregate_data(table: Table) -> List[Dict[str, Any]]:
     """聚合数据，按照前四列分组"""
     grouped = defaultdict(list)
 
     # 确保列名正确，假设前四列名为A,B,C,D
-    columns = df.columns.tolist()
+    columns, rows = table
     if len(columns) < 4:
         raise ValueError("Excel文件必须至少包含4列数据")
 
-    for _, row in df.iterrows():
+    for row in rows:
         # 直接使用原始字符串值，不做类型转换
-        key = tuple(row.iloc[:4])
-        grouped[key].append(row.iloc[4:].tolist())
+        key = tuple(row[:4])
+        grouped[key].append(row[4:])
 
     result = []
-    for (a, b, c, d), rows in grouped.items():
+    for (a, b, c, d), group_rows in grouped.items():
         result.append({
             'a': a,
             'b': b,
             'c': c,
             'd': d,
-            'rows': rows
+            'rows': group_rows
         })
     return result
 
 
-def generate_word_files(data: List[Dict[str, Any]], template_path: str, output_dir: str):
-    """生成Word文件，使用并行处理"""
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    wp = WordProcessor(template_path)
+def assign_file_names(data: List[Dict[str, Any]]) -> List[str]:
+    """按数据顺序生成文件名，处理重复情况（顺序固定，每次运行结果相同）"""
     name_counter = {}
-
-    def process_item(item):
-        # 生成文件名，处理重复情况
+    file_names = []
+    for item in data:
         base_name = f"{item['b']}-{item['a']}"
         if base_name in name_counter:
             name_counter[base_name] += 1
-            file_name = f"{base_name}(重复{name_counter[base_name]}).docx"
+            file_names.append(f"{base_name}(重复{name_counter[base_name]}).docx")
         else:
             name_counter[base_name] = 0
-            file_name = f"{base_name}.docx"
+            file_names.append(f"{base_name}.docx")
+    return file_names
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def group_key(item: Dict[str, Any]) -> str:
+    """清单中分组的键：前四列的值，与文件名无关（文件名会随重复分组的顺序变化）"""
+    return json.dumps([item['a'], item['b'], item['c'], item['d']], ensure_ascii=False)
+
+
+def group_hash(item: Dict[str, Any], template_hash: str) -> str:
+    """分组数据（前四列 + 所有行）与模板共同决定生成的文件内容"""
+    content = json.dumps([item['a'], item['b'], item['c'], item['d'], item['rows'], template_hash],
+                         ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
+
+def load_manifest(output_dir: str) -> Dict[str, Any]:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'files': {}}
+    # 旧版清单以文件名为键，前四列记在 'key' 中，转换为以前四列为键
+    files = {}
+    for key, entry in manifest.get('files', {}).items():
+        if 'key' in entry:
+            key, entry = json.dumps(entry['key'], ensure_ascii=False), {'name': key, 'hash': entry.get('hash')}
+        files[key] = entry
+    manifest['files'] = files
+    return manifest
+
+
+def save_manifest(output_dir: str, manifest: Dict[str, Any]):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def generate_word_files(data: List[Dict[str, Any]], template_path: str, output_dir: str):
+    """
+    生成Word文件，使用并行处理
+    增量模式下只生成新增或变化的分组，内容未变只是文件名变了的改名，删除已不存在的分组的旧文件，
+    有变化时才重新生成汇总文档
+    返回 (生成数, 跳过数, 删除数)
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    # 汇总文档在全部文件生成后统一生成一次
+    wp = WordProcessor(template_path, auto_generate_summary=False)
+    template_hash = file_hash(template_path)
+    old_files = load_manifest(output_dir).get('files', {}) if INCREMENTAL else {}
+
+    file_names = assign_file_names(data)
+    new_files = {}
+    todo = []
+    renames = []
+    for item, file_name in zip(data, file_names):
+        key = group_key(item)
+        digest = group_hash(item, template_hash)
+        new_files[key] = {'name': file_name, 'hash': digest}
         output_path = os.path.join(output_dir, file_name)
-        print(f"正在生成: {file_name}。。。")
-        wp.generate_document(output_path, item)
-        print(f"{file_name}创建成功！")
+        entry = old_files.get(key)
+        if entry and entry.get('hash') == digest:
+            old_path = os.path.join(output_dir, entry['name'])
+            if entry['name'] == file_name and os.path.exists(output_path):
+                continue
+            if entry['name'] != file_name and os.path.exists(old_path):
+                # 内容未变，只是文件名变了（如前面新增了同名分组），改名即可
+                renames.append((item, file_name, old_path, output_path))
+                continue
+        todo.append((item, file_name, output_path))
+
+    # 先全部改为临时名再改为新名，两个文件互换名字时不会互相覆盖；改名失败的重新生成
+    moved = []
+    for item, file_name, old_path, output_path in renames:
+        tmp_path = output_path + '.renaming'
+        try:
+            os.replace(old_path, tmp_path)
+        except OSError:
+            todo.append((item, file_name, output_path))
+            continue
+        moved.append((old_path, tmp_path, output_path))
+    for old_path, tmp_path, output_path in moved:
+        os.replace(tmp_path, output_path)
+        log.info("重命名: %s -> %s", os.path.basename(old_path), os.path.basename(output_path))
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        executor.map(process_item, data)
+    def process_item(task):
+        item, file_name, output_path = task
+        log.debug("正在生成: %s。。。", file_name)
+        ok = wp.generate_document(output_path, item)
+        if ok:
+            log.info("%s创建成功！", file_name)
+        return ok
+
+    with instrumentation.stage('render'):
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            results = list(executor.map(process_item, todo))
+
+    # 生成失败的文件不记录，下次运行时重试
+    for (item, file_name, output_path), ok in zip(todo, results):
+        if not ok:
+            new_files.pop(group_key(item), None)
+
+    # 删除已不存在的分组留下的文件（只删除清单中记录过的文件，已改名的文件不在原处）
+    removed = 0
+    current_names = set(file_names)
+    for entry in old_files.values():
+        file_name = entry['name']
+        if file_name in current_names:
+            continue
+        output_path = os.path.join(output_dir, file_name)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+            log.info("删除过期文件: %s", file_name)
+            removed += 1
+
+    save_manifest(output_dir, {'template': template_hash, 'files': new_files})
+
+    generated = sum(1 for ok in results if ok)
+    skipped = len(data) - len(todo)
+    if wp.summary_enabled:
+        summary_path = wp.summary_generator.output_path
+        if todo or moved or removed or not os.path.exists(summary_path):
+            with instrumentation.stage('summarize'):
+                wp.summary_generator.generate([os.path.join(output_dir, name) for name in file_names])
+        else:
+            print("Word文件没有变化，跳过生成汇总文档")
+    return generated, skipped, removed
 
 
 def main():
+    # 各步骤耗时和计数（设置 EXCEL_REPORT 时写入 excel_to_word.report.json），见 instrumentation.py
+    with instrumentation.Run('excel_to_word'):
+        run_word()
+
+
+def run_word():
     print("开始处理...")
 
     # 读取Excel数据
-    print("读取Excel文件...")
-    df = read_excel(EXCEL_PATH)
+    with instrumentation.stage('read'):
+        table = read_table_data()
 
     # 聚合数据
-    aggregated_data = aggregate_data(df)
+    with instrumentation.stage('extract'):
+        aggregated_data = aggregate_data(table)
 
     # 生成Word文件
     print(f"生成Word文件到 {OUTPUT_DIR}...")
-    generate_word_files(aggregated_data, TEMPLATE_PATH, OUTPUT_DIR)
+    generated, skipped, removed = generate_word_files(aggregated_data, TEMPLATE_PATH, OUTPUT_DIR)
+    instrumentation.count('groups', len(aggregated_data))
+    instrumentation.count('generated', generated)
+    instrumentation.count('skipped', skipped)
+    instrumentation.count('removed', removed)
 
-    print(f"处理完成，共生成 {len(aggregated_data)} 个Word文件")
+    print(f"处理完成，共 {len(aggregated_data)} 个Word文件：生成 {generated} 个，"
+          f"未变化跳过 {skipped} 个，删除过期文件 {removed} 个")
 
 
 if __name__ == "__main__":
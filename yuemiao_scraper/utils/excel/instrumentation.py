@@ -0,0 +1,274 @@
+"""
+Excel 工具共用的计时、计数、性能分析和日志
+
+各工具的 main 用 Run 包住一次运行，运行中用 stage / count 记录各步骤的耗时和计数，
+结束时打印汇总，设置了 EXCEL_REPORT 时再写出 JSON 报告：
+
+    with instrumentation.Run('excel_generate'):
+        with instrumentation.stage('read'):
+            ...
+        instrumentation.count('rows', len(rows))
+
+没有正在进行的 Run 时 stage / count 什么都不做，单独调用各函数不受影响。
+
+环境变量：
+- EXCEL_LOG_LEVEL：日志级别，默认 INFO；DEBUG 时输出逐行的插入/跳过等明细
+- EXCEL_LOG_RATE：同一类日志每秒最多输出的条数，默认 20，0 为不限制；超出的只计数
+- EXCEL_PROFILE：cprofile / tracemalloc / all（可逗号分隔），默认不开启
+- EXCEL_REPORT：JSON 报告文件（.json）或目录，on 为当前目录下的 <工具名>.report.json，默认不写
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+LOG_LEVEL = os.environ.get('EXCEL_LOG_LEVEL', 'INFO').upper()
+LOG_RATE = int(os.environ.get('EXCEL_LOG_RATE', '20'))
+LOG_RATE_WINDOW = 1.0  # 秒
+PROFILE = os.environ.get('EXCEL_PROFILE', '')
+REPORT = os.environ.get('EXCEL_REPORT', '')
+PROFILE_TOP = 20  # 报告中保留的 cProfile / tracemalloc 条目数
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """始终写到当前的 sys.stdout，与 print 的输出顺序一致（也能被 redirect_stdout 捕获）"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    同一条日志模板（msg 相同，参数不同）在 window 秒内最多输出 rate 条，其余只计数，
+    下一次输出时附上省略的条数。WARNING 及以上的日志全部输出
+    """
+
+    def __init__(self, rate=LOG_RATE, window=LOG_RATE_WINDOW):
+        super().__init__()
+        self.rate = rate
+        self.window = window
+        self._state = {}  # (logger, level, msg) → [窗口开始时间, 已输出, 已省略]
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    def filter(self, record):
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._state[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f'{record.getMessage()}（此前省略 {suppressed} 条同类日志）'
+                    record.args = None
+                return True
+            if state[1] < self.rate:
+                state[1] += 1
+                return True
+            state[2] += 1
+            self.suppressed_total += 1
+            return False
+
+    def flush(self):
+        """返回并清空尚未报告的省略条数 {msg: 条数}"""
+        with self._lock:
+            pending = {key[2]: state[2] for key, state in self._state.items() if state[2]}
+            self._state.clear()
+        return pending
+
+
+rate_limiter = RateLimitFilter()
+
+
+def _setup_logging():
+    logger = logging.getLogger('excel')
+    if logger.handlers:
+        return logger
+    handler = _StdoutHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    handler.addFilter(rate_limiter)
+    logger.addHandler(handler)
+    logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    logger.propagate = False
+    return logger
+
+
+_setup_logging()
+
+
+def get_logger(name):
+    """各工具的日志，如 get_logger('merge') → excel.merge"""
+    return logging.getLogger(f'excel.{name}')
+
+
+log = get_logger('instrumentation')
+
+_current = None  # 正在进行的 Run
+
+
+class Run:
+    """一次运行的耗时、计数和性能分析结果"""
+
+    def __init__(self, name, profile=None, report_path=None):
+        self.name = name
+        profile = PROFILE if profile is None else profile
+        parts = {p.strip().lower() for p in profile.split(',') if p.strip()}
+        if 'all' in parts:
+            parts = {'cprofile', 'tracemalloc'}
+        self.profile = parts
+        self.report_path = self._resolve_report_path(REPORT if report_path is None else report_path)
+        self.stages = {}    # 名称 → [秒数, 次数]
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._profiler = None
+        self._previous = None
+
+    def _resolve_report_path(self, path):
+        # 报告需要显式开启，不设置时不在当前目录留下文件
+        if not path or path.lower() in ('off', 'none', '0', 'false'):
+            return None
+        if path.lower() in ('on', '1', 'true'):
+            return f'{self.name}.report.json'
+        if os.path.isdir(path) or not path.lower().endswith('.json'):
+            return os.path.join(path, f'{self.name}.report.json')
+        return path
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def __enter__(self):
+        global _current
+        self._previous, _current = _current, self
+        self.started = datetime.now()
+        self._suppressed_base = rate_limiter.suppressed_total
+        self._start = time.perf_counter()
+        if 'tracemalloc' in self.profile:
+            import tracemalloc
+            tracemalloc.start()
+        if 'cprofile' in self.profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        global _current
+        self.elapsed = time.perf_counter() - self._start
+        directory = os.path.dirname(self.report_path or '')
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        profile = {}
+        if self._profiler is not None:
+            self._profiler.disable()
+            profile['cprofile'] = self._cprofile_result()
+        if 'tracemalloc' in self.profile:
+            profile['tracemalloc'] = self._tracemalloc_result()
+        _current = self._previous
+
+        suppressed = rate_limiter.flush()
+        for msg, n in suppressed.items():
+            log.info(f'（省略了 {n} 条日志：{msg}）')
+        self.print_summary()
+        if self.report_path:
+            self.write_report(profile, exc_type)
+        return False
+
+    def _cprofile_result(self):
+        import pstats
+
+        stats = pstats.Stats(self._profiler)
+        result = {'top': []}
+        if self.report_path:
+            result['file'] = os.path.splitext(self.report_path)[0] + '.prof'
+            stats.dump_stats(result['file'])
+        entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        for (filename, line, func), (cc, nc, tt, ct, callers) in entries[:PROFILE_TOP]:
+            result['top'].append({
+                'function': f'{os.path.basename(filename)}:{line}({func})',
+                'calls': nc,
+                'self_seconds': round(tt, 6),
+                'cumulative_seconds': round(ct, 6),
+            })
+        return result
+
+    def _tracemalloc_result(self):
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP]
+        tracemalloc.stop()
+        return {
+            'current_mb': round(current / 1e6, 3),
+            'peak_mb': round(peak / 1e6, 3),
+            'top': [{'location': str(stat.traceback[0]), 'size_kb': round(stat.size / 1e3, 1),
+                     'blocks': stat.count} for stat in top],
+        }
+
+    def report(self, profile=None, exc_type=None):
+        return {
+            'tool': self.name,
+            'started': self.started.isoformat(timespec='seconds'),
+            'elapsed_seconds': round(self.elapsed, 6),
+            'status': 'error' if exc_type else 'ok',
+            'stages': {name: {'seconds': round(seconds, 6), 'calls': calls}
+                       for name, (seconds, calls) in self.stages.items()},
+            'counters': dict(self.counters),
+            'log_level': logging.getLevelName(logging.getLogger('excel').level),
+            'suppressed_logs': rate_limiter.suppressed_total - self._suppressed_base,
+            'profile': profile or {},
+        }
+
+    def print_summary(self):
+        stages = ' | '.join(f'{name} {seconds:.2f}s' for name, (seconds, calls) in self.stages.items())
+        log.info(f'[耗时] 共 {self.elapsed:.2f}s' + (f'：{stages}' if stages else ''))
+        if self.counters:
+            log.info('[计数] ' + ' | '.join(f'{k} {v}' for k, v in self.counters.items()))
+
+    def write_report(self, profile=None, exc_type=None):
+        import json
+
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(profile, exc_type), f, ensure_ascii=False, indent=1)
+        log.info(f'[报告] 运行报告已写入 {self.report_path}')
+
+
+def current():
+    return _current
+
+
+@contextmanager
+def stage(name):
+    """记录一个步骤的耗时，同名步骤多次执行时累加"""
+    run = _current
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add_time(name, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    run = _current
+    if run is not None:
+        run.count(name, n)
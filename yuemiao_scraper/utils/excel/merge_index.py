@@ -0,0 +1,170 @@
+"""
+excel_merge 的增量合并索引，保存在输出文件旁边（如 合并文件.xlsx.index.sqlite）
+
+索引中保存：
+- 每一行的分组（前四列）、日期、在结果中的位置和内容
+- 前五列去重集合
+
+合并一批新数据时只按分组查询相关的行，耗时与这批数据的行数成正比，
+与已合并的总行数无关；需要时再从索引导出完整的工作簿。
+插入规则与 excel_merge.merge_by_insertion 相同。
+"""
+import json
+import os
+import sqlite3
+
+from excel_merge import CONDITION_COLUMNS, TIME_COLUMN, parse_date_safe
+
+MIN_GAP = 1e-9  # 相邻位置的最小相对间隔（相对位置的大小，不小于 1 时按 1 算），小于该值时重新编号
+
+
+def default_index_path(output_file):
+    return output_file + '.index.sqlite'
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+class MergeIndex:
+    """
+    行的位置用浮点数表示，插入到两行之间时取中点，
+    间隔过小时按当前顺序重新编号为 1, 2, 3...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS rows (
+                id INTEGER PRIMARY KEY,
+                grp TEXT NOT NULL,
+                pos REAL NOT NULL,
+                date TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS rows_grp ON rows (grp, pos);
+            CREATE INDEX IF NOT EXISTS rows_pos ON rows (pos);
+            CREATE TABLE IF NOT EXISTS keys (key5 TEXT PRIMARY KEY);
+        ''')
+
+    def close(self):
+        self.conn.close()
+
+    @property
+    def header(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'header'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def row_count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM rows').fetchone()[0]
+
+    def is_empty(self):
+        return self.header is None
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute('DELETE FROM meta')
+            self.conn.execute('DELETE FROM rows')
+            self.conn.execute('DELETE FROM keys')
+
+    @staticmethod
+    def _date_of(row):
+        value = row[TIME_COLUMN - 1] if len(row) >= TIME_COLUMN else ''
+        date = parse_date_safe(value)
+        return date.isoformat() if date else None
+
+    def build(self, data):
+        """用一份完整数据（含表头）初始化索引，不做去重"""
+        self.clear()
+        if not data:
+            return
+        with self.conn:
+            self.conn.execute("INSERT INTO meta VALUES ('header', ?)", (_dumps(data[0]),))
+            self.conn.executemany(
+                'INSERT INTO rows (grp, pos, date, data) VALUES (?, ?, ?, ?)',
+                ((_dumps(row[:CONDITION_COLUMNS]), float(pos), self._date_of(row), _dumps(row))
+                 for pos, row in enumerate(data[1:], 1)))
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO keys VALUES (?)',
+                ((_dumps(row[:5]),) for row in data[1:]))
+
+    def _renumber(self):
+        ids = [r[0] for r in self.conn.execute('SELECT id FROM rows ORDER BY pos')]
+        self.conn.executemany('UPDATE rows SET pos = ? WHERE id = ?',
+                              ((float(pos), row_id) for pos, row_id in enumerate(ids, 1)))
+
+    def _position_before(self, pos):
+        """紧挨在 pos 之前的新位置"""
+        row = self.conn.execute('SELECT MAX(pos) FROM rows WHERE pos < ?', (pos,)).fetchone()
+        prev = row[0] if row[0] is not None else pos - 1.0
+        return (prev + pos) / 2, pos - prev
+
+    def _position_after(self, pos):
+        """紧挨在 pos 之后的新位置"""
+        row = self.conn.execute('SELECT MIN(pos) FROM rows WHERE pos > ?', (pos,)).fetchone()
+        if row[0] is None:
+            return pos + 1.0, 1.0
+        return (pos + row[0]) / 2, row[0] - pos
+
+    def _insert_position(self, grp, src_date):
+        """按 merge_by_insertion 的规则找出新行的位置"""
+        if src_date:
+            row = self.conn.execute(
+                'SELECT pos FROM rows WHERE grp = ? AND date > ? ORDER BY pos LIMIT 1',
+                (grp, src_date)).fetchone()
+            if row:
+                return self._position_before(row[0])
+        row = self.conn.execute('SELECT MAX(pos) FROM rows WHERE grp = ?', (grp,)).fetchone()
+        if row[0] is not None:
+            return self._position_after(row[0])
+        row = self.conn.execute('SELECT MAX(pos) FROM rows').fetchone()
+        return (row[0] or 0.0) + 1.0, 1.0
+
+    def _insert_row(self, row, grp, src_date):
+        pos, gap = self._insert_position(grp, src_date)
+        # 位置很大时浮点数的精度也随之变粗，按相对间隔判断，避免中点与相邻位置相等
+        if gap < MIN_GAP * max(1.0, abs(pos)):
+            self._renumber()
+            pos, gap = self._insert_position(grp, src_date)
+        self.conn.execute('INSERT INTO rows (grp, pos, date, data) VALUES (?, ?, ?, ?)',
+                          (grp, pos, src_date, _dumps(row)))
+
+    def merge(self, source_data):
+        """把 source_data（含表头）合并进索引，返回 (插入数, 跳过数)"""
+        if not source_data:
+            return 0, 0
+        if self.is_empty():
+            # 索引为空时与 merge_by_insertion 一致：源数据直接作为基础
+            self.build(source_data)
+            return len(source_data) - 1, 0
+
+        inserted_count = skipped_count = 0
+        with self.conn:
+            for row in source_data[1:]:
+                cur = self.conn.execute('INSERT OR IGNORE INTO keys VALUES (?)', (_dumps(row[:5]),))
+                if cur.rowcount == 0:
+                    skipped_count += 1
+                    continue
+                self._insert_row(row, _dumps(row[:CONDITION_COLUMNS]), self._date_of(row))
+                inserted_count += 1
+        return inserted_count, skipped_count
+
+    def iter_rows(self):
+        """按结果顺序输出所有行（含表头）"""
+        header = self.header
+        if header is None:
+            return
+        yield header
+        for (data,) in self.conn.execute('SELECT data FROM rows ORDER BY pos'):
+            yield json.loads(data)
+
+
+def open_index(output_file, index_file=None):
+    path = index_file or default_index_path(output_file)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return MergeIndex(path)
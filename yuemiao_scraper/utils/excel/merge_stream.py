@@ -0,0 +1,221 @@
+"""
+excel_merge 的流式合并模式，用于超出内存的大文件
+
+合并结果与 excel_merge.merge_by_insertion 完全一致：
+- 前五列重复的源数据行跳过
+- 插入到同一分组（前四列相同）中第一个日期更晚的行之前，否则放在分组末尾
+- 目标中不存在的分组按出现顺序追加到文件末尾
+- 多个源文件时与按顺序逐个合并的结果相同
+
+做法：
+1. 只读模式逐行读取目标和源文件，按 (分组, 来源, 行号) 外部排序，
+   超过 SPILL_CHUNK_ROWS 行的部分写入临时文件
+2. 按分组依次在组内模拟插入，为每一行计算它在结果中的位置
+3. 按位置再做一次外部排序，用只写模式逐行写出
+"""
+import bisect
+import heapq
+import itertools
+import os
+import pickle
+import shutil
+import tempfile
+from operator import itemgetter
+
+import openpyxl
+
+import table_store
+from excel_merge import (CONDITION_COLUMNS, TIME_COLUMN, iter_formatted_rows,
+                         iter_store_rows, parse_date_safe, write_data_to_workbook)
+
+SPILL_CHUNK_ROWS = 100000  # 内存中最多缓存的行数，超过后写入临时文件
+
+TARGET, SOURCE = 0, 1
+
+
+class ExternalSorter:
+    """按 key 排序 (key, row) 记录，数据量超过 chunk_rows 时分段排序后写入临时文件再归并"""
+
+    def __init__(self, tmpdir, chunk_rows=SPILL_CHUNK_ROWS):
+        self.tmpdir = tmpdir
+        self.chunk_rows = chunk_rows
+        self.buffer = []
+        self.runs = []
+
+    def add(self, key, row):
+        self.buffer.append((key, row))
+        if len(self.buffer) >= self.chunk_rows:
+            self._spill()
+
+    def _spill(self):
+        self.buffer.sort(key=itemgetter(0))
+        fd, path = tempfile.mkstemp(dir=self.tmpdir, suffix='.run')
+        with os.fdopen(fd, 'wb') as f:
+            for record in self.buffer:
+                pickle.dump(record, f, pickle.HIGHEST_PROTOCOL)
+        self.runs.append(path)
+        self.buffer = []
+
+    @staticmethod
+    def _read_run(path):
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def __iter__(self):
+        self.buffer.sort(key=itemgetter(0))
+        if not self.runs:
+            return iter(self.buffer)
+        streams = [self._read_run(path) for path in self.runs]
+        streams.append(iter(self.buffer))
+        return heapq.merge(*streams, key=itemgetter(0))
+
+
+def iter_sheet_rows(path):
+    """只读模式逐行读取第一个工作表（或 excel_generate 的中间数据文件）"""
+    if table_store.is_store(path):
+        yield from iter_store_rows(path)
+        return
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from iter_formatted_rows(wb.worksheets[0])
+    finally:
+        wb.close()
+
+
+def merge_group(members):
+    """
+    组内模拟插入，members 为该分组按 (来源, 行号) 排好序的记录
+    返回 (组内最终顺序, 插入的行号, 跳过的行号)，组内元素为 (来源, 行号, 行)
+    """
+    group = []        # [(来源, 行号, 行, 日期)]
+    existing = set()  # 组内已有的前五列
+    inserted, skipped = [], []
+
+    for kind, seq, row in members:
+        if kind == TARGET:
+            group.append((kind, seq, row, parse_date_safe(row[TIME_COLUMN - 1])))
+            existing.add(tuple(row[:5]))
+            continue
+
+        key_5 = tuple(row[:5])
+        if key_5 in existing:
+            skipped.append(seq)
+            continue
+
+        src_date = parse_date_safe(row[TIME_COLUMN - 1])
+        position = len(group)
+        if src_date:
+            for i, (_, _, _, tgt_date) in enumerate(group):
+                if tgt_date and src_date < tgt_date:
+                    position = i
+                    break
+        group.insert(position, (kind, seq, row, src_date))
+        existing.add(key_5)
+        inserted.append(seq)
+
+    return [(kind, seq, row) for kind, seq, row, _ in group], inserted, skipped
+
+
+def assign_positions(group, target_count):
+    """
+    计算组内每一行在结果中的排序键：
+    - 目标行 t：(t, 1, 0)，插在 t 之前的源数据行：(t, 0, j)
+    - 排在分组最后一个目标行之后的源数据行：(最后目标行, 2, j)
+    - 新分组：(目标行数 + 首行在源文件中的行号, 0, j)
+    """
+    if not any(kind == TARGET for kind, _, _ in group):
+        # 新分组按首次出现的顺序排列（组内可能有后出现的行插到了前面）
+        first_seq = min(seq for _, seq, _ in group)
+        for j, (_, _, row) in enumerate(group):
+            yield (target_count + first_seq, 0, j), row
+        return
+
+    pending = []
+    last_target = None
+    for kind, seq, row in group:
+        if kind == SOURCE:
+            pending.append(row)
+            continue
+        for j, p in enumerate(pending):
+            yield (seq, 0, j), p
+        pending = []
+        yield (seq, 1, 0), row
+        last_target = seq
+    for j, p in enumerate(pending):
+        yield (last_target, 2, j), p
+
+
+def merge_streaming(source_files, target_file, output_file, chunk_rows=SPILL_CHUNK_ROWS):
+    """
+    把 source_files 按顺序合并进 target_file，结果与逐个合并相同：
+    各源文件的数据行连续编号，相当于首尾相接后一次合并
+    返回 [(源文件, 插入数, 跳过数)]
+    """
+    if isinstance(source_files, str):
+        source_files = [source_files]
+    source_files = list(source_files)
+    report = []
+
+    tmpdir = tempfile.mkdtemp(prefix='excel_merge_')
+    try:
+        print("[开始] 流式读取文件...")
+        target_rows = iter_sheet_rows(target_file)
+        header = next(target_rows, None)
+
+        # 目标为空时第一个源文件直接作为基础
+        while header is None and source_files:
+            base_file = source_files.pop(0)
+            target_rows = iter_sheet_rows(base_file)
+            header = next(target_rows, None)
+            base_report = [base_file, 0, 0]
+            report.append(base_report)
+        if header is None:
+            write_data_to_workbook([], output_file)
+            return report
+
+        by_group = ExternalSorter(tmpdir, chunk_rows)
+        target_count = 0
+        for seq, row in enumerate(target_rows):
+            by_group.add((tuple(row[:CONDITION_COLUMNS]), TARGET, seq), row)
+            target_count += 1
+        if report:
+            report[-1][1] = target_count
+        print(f"[信息] 目标数据现有 {target_count} 条（不含表头）")
+
+        # starts[i] 为第 i 个源文件第一行的全局行号，用于按文件统计
+        starts = []
+        seq = 0
+        for source_file in source_files:
+            starts.append(seq)
+            source_rows = iter_sheet_rows(source_file)
+            next(source_rows, None)  # 跳过源文件表头
+            for row in source_rows:
+                by_group.add((tuple(row[:CONDITION_COLUMNS]), SOURCE, seq), row)
+                seq += 1
+
+        print("[开始] 执行合并逻辑...")
+        by_position = ExternalSorter(tmpdir, chunk_rows)
+        inserted_counts = [0] * len(source_files)
+        skipped_counts = [0] * len(source_files)
+        for _, records in itertools.groupby(by_group, key=lambda r: r[0][0]):
+            members = [(key[1], key[2], row) for key, row in records]
+            group, inserted, skipped = merge_group(members)
+            for s in inserted:
+                inserted_counts[bisect.bisect_right(starts, s) - 1] += 1
+            for s in skipped:
+                skipped_counts[bisect.bisect_right(starts, s) - 1] += 1
+            for position, row in assign_positions(group, target_count):
+                by_position.add(position, row)
+        report = [tuple(r) for r in report]
+        report.extend(zip(source_files, inserted_counts, skipped_counts))
+
+        print("[开始] 写入结果文件...")
+        rows = itertools.chain([header], (row for _, row in by_position))
+        write_data_to_workbook(rows, output_file)
+        return report
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
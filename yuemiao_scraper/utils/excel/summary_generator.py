@@ -1,9 +1,11 @@
 import os
 import traceback
-from docx import Document
-from docxcompose.composer import Composer
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
+
+import instrumentation
+
+log = instrumentation.get_logger('summary')
+
+# python-docx / docxcompose 在生成时才导入
 
 class SummaryGenerator:
     def __init__(self, output_path="合并结果.docx"):
@@ -11,6 +13,9 @@ class SummaryGenerator:
 
     def _insert_section_break(self, doc):
         """在文档末尾插入分节符 (section break)"""
+        from docx.oxml import OxmlElement
+        from docx.oxml.ns import qn
+
         paragraph = doc.add_paragraph()
         run = paragraph.add_run()
         br = OxmlElement('w:br')
@@ -28,6 +33,9 @@ class SummaryGenerator:
             return False
 
         try:
+            from docx import Document
+            from docxcompose.composer import Composer
+
             print(f"共检测到 {len(valid_files)} 个有效文件。")
 
             # 以第一个文档作为主文档
@@ -37,7 +45,7 @@ class SummaryGenerator:
             for idx, file in enumerate(valid_files):
                 if idx == 0:
                     continue  # 第一个文档已加载为 master
-                print(f"正在合并 ({idx + 1}/{len(valid_files)}): {os.path.basename(file)}")
+                log.debug("正在合并 (%s/%s): %s", idx + 1, len(valid_files), os.path.basename(file))
                 try:
                     # 合并前在主文档末尾插入分节符
                     self._insert_section_break(composer.doc)
@@ -46,7 +54,7 @@ class SummaryGenerator:
                     composer.append(sub_doc)
 
                 except Exception as e:
-                    print(f"⚠️ 读取失败，跳过: {file} - {e}")
+                    log.warning("⚠️ 读取失败，跳过: %s - %s", file, e)
                     continue
 
             composer.save(self.output_path)
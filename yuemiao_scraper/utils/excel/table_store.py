@@ -0,0 +1,112 @@
+"""
+excel_generate 与 excel_to_word / excel_merge 之间的中间数据文件（SQLite）
+
+excel_generate 生成 output_summary.xlsx 的同时写入同样的表，后续步骤直接读取，
+不用再解析 xlsx。xlsx 仍然保留给人查看和手工修改。
+
+保存的值与“写入 xlsx 再用 openpyxl 读回”得到的值一致：
+- 空字符串保存为 NULL
+- 数字按 xlsx 中的格式（16 位有效数字）保存，整数值为 int
+- 布尔值保存为 'True' / 'False'
+因此读取方拿到的数据与直接读 xlsx 时相同。
+"""
+import json
+import os
+import sqlite3
+
+STORE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+
+def is_store(path):
+    return bool(path) and path.lower().endswith(STORE_SUFFIXES)
+
+
+def _cast_number(text):
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+
+def normalize_value(value):
+    """转换为写入 xlsx 后再读回的值"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, (int, float)):
+        if value != value or value in (float('inf'), float('-inf')):
+            return None
+        return _cast_number('%.16g' % value)
+    if isinstance(value, str):
+        return value
+    return str(value)
+
+
+def write_table(path, columns, rows):
+    """写入表头和数据行，先写临时文件再替换，读取方不会看到写了一半的文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    width = len(columns)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        names = ', '.join(f'c{i}' for i in range(width))
+        conn.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(f"CREATE TABLE data (id INTEGER PRIMARY KEY, {names})")
+        conn.execute("INSERT INTO meta VALUES ('columns', ?)",
+                     (json.dumps(list(columns), ensure_ascii=False),))
+        placeholders = ', '.join('?' * width)
+        conn.executemany(
+            f"INSERT INTO data ({names}) VALUES ({placeholders})",
+            (tuple(normalize_value(v) for v in row[:width]) + (None,) * (width - len(row))
+             for row in rows))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+def iter_table(path):
+    """逐行读取，第一行为表头，与逐行读取 xlsx 的顺序相同"""
+    conn = sqlite3.connect(path)
+    try:
+        columns = json.loads(conn.execute("SELECT value FROM meta WHERE name = 'columns'").fetchone()[0])
+        yield tuple(columns)
+        names = ', '.join(f'c{i}' for i in range(len(columns)))
+        yield from conn.execute(f"SELECT {names} FROM data ORDER BY id")
+    finally:
+        conn.close()
+
+
+def read_table(path):
+    """返回 (表头, 数据行列表)，数据行为 tuple"""
+    rows = iter_table(path)
+    columns = list(next(rows))
+    return columns, list(rows)
+
+
+def is_fresh(store_path, xlsx_path):
+    """中间文件存在且不早于 xlsx（xlsx 被手工修改过时应重新读取 xlsx）"""
+    if not store_path or not os.path.exists(store_path):
+        return False
+    if not xlsx_path or not os.path.exists(xlsx_path):
+        return True
+    return os.path.getmtime(store_path) >= os.path.getmtime(xlsx_path)
+
+
+def to_text(value, na_values=('', 'NA', 'N/A')):
+    """
+    转换为 pd.read_excel(dtype=str, na_values=['', 'NA', 'N/A'], keep_default_na=False)
+    再 fillna('') 得到的字符串
+    """
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, str):
+        return '' if value in na_values else value
+    return str(value)
@@ -0,0 +1,161 @@
+"""
+监视模式：常驻运行，文件有变化时只重新运行受影响的步骤
+
+- generate：input_files/ 中的审批表变化时重新生成 output_summary.xlsx
+- word：output_summary.xlsx 或 template.docx 变化时重新生成 Word（增量，见 excel_to_word.INCREMENTAL）
+- merge：源文件或 output_summary.xlsx 变化时重新合并
+
+步骤按 generate → word → merge 的顺序检查，generate 重新生成 output_summary.xlsx 后，
+word 和 merge 在同一轮中随之运行。连续的文件变化（如一次复制多个文件）在
+DEBOUNCE_SECONDS 内没有新的变化后才处理。
+
+    python watch.py
+    python watch.py --stages generate,word --interval 1 --debounce 2
+"""
+import argparse
+import importlib
+import os
+import time
+import traceback
+from datetime import datetime
+
+POLL_INTERVAL = 1.0      # 检查文件变化的间隔（秒）
+DEBOUNCE_SECONDS = 2.0   # 最后一次变化之后等待多久再处理（秒）
+STAGES = ('generate', 'word', 'merge')
+
+
+def excel_files(directory):
+    """目录下所有审批表，忽略 Excel 打开文件时产生的 ~$ 临时文件"""
+    files = []
+    for root, dirs, names in os.walk(directory):
+        for name in names:
+            if name.endswith(('.xlsx', '.xls')) and not name.startswith('~$'):
+                files.append(os.path.join(root, name))
+    return files
+
+
+def stage_inputs(stage):
+    """各步骤依赖的输入文件，从对应工具的配置中读取"""
+    if stage == 'generate':
+        excel_generate = importlib.import_module('excel_generate')
+        return excel_files(excel_generate.CONFIG['input_directory'])
+    if stage == 'word':
+        excel_to_word = importlib.import_module('excel_to_word')
+        paths = [excel_to_word.EXCEL_PATH, excel_to_word.TEMPLATE_PATH]
+        if excel_to_word.STORE_PATH:
+            paths.append(excel_to_word.STORE_PATH)
+        return paths
+    if stage == 'merge':
+        excel_merge = importlib.import_module('excel_merge')
+        sources = excel_merge.collect_source_files(
+            excel_merge.SOURCE_FILES or [excel_merge.SOURCE_FILE],
+            exclude=[excel_merge.TARGET_FILE, excel_merge.OUTPUT_FILE])
+        paths = sources + [excel_merge.TARGET_FILE]
+        if excel_merge.TARGET_STORE:
+            paths.append(excel_merge.TARGET_STORE)
+        return paths
+    raise ValueError(f'未知步骤: {stage}')
+
+
+def snapshot(paths):
+    """文件 → (修改时间, 大小)，不存在的文件不记录"""
+    result = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        result[os.path.abspath(path)] = (st.st_mtime_ns, st.st_size)
+    return result
+
+
+def run_stage(stage):
+    module = importlib.import_module({
+        'generate': 'excel_generate',
+        'word': 'excel_to_word',
+        'merge': 'excel_merge',
+    }[stage])
+    start = time.perf_counter()
+    print(f"[监视] {datetime.now():%H:%M:%S} 运行 {stage}...")
+    try:
+        module.main()
+    except Exception as e:
+        print(f"[监视] {stage} 运行出错: {e}")
+        traceback.print_exc()
+        return False
+    print(f"[监视] {stage} 完成，用时 {time.perf_counter() - start:.2f} 秒")
+    return True
+
+
+class Watcher:
+    def __init__(self, stages=STAGES, interval=POLL_INTERVAL, debounce=DEBOUNCE_SECONDS):
+        self.stages = [s for s in STAGES if s in stages]
+        self.interval = interval
+        self.debounce = debounce
+        self.last_run = {}  # 步骤 → 上次成功运行时的输入快照
+
+    def current_inputs(self):
+        return {stage: snapshot(stage_inputs(stage)) for stage in self.stages}
+
+    def run_pending(self):
+        """按顺序运行输入有变化的步骤，返回运行了的步骤"""
+        ran = []
+        for stage in self.stages:
+            # 前面的步骤可能刚刚更新了本步骤的输入，所以运行前再取快照
+            inputs = snapshot(stage_inputs(stage))
+            if self.last_run.get(stage) == inputs:
+                continue
+            if run_stage(stage):
+                # 记录运行前的快照：运行期间又有变化时下一轮会再次运行
+                self.last_run[stage] = inputs
+            ran.append(stage)
+        return ran
+
+    def wait_for_quiet(self, state):
+        """等待文件在 debounce 秒内不再变化，返回最新快照"""
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < self.debounce:
+            time.sleep(self.interval)
+            current = self.current_inputs()
+            if current != state:
+                state = current
+                quiet_since = time.monotonic()
+        return state
+
+    def run(self, initial=True):
+        print(f"[监视] 开始监视：{', '.join(self.stages)}（Ctrl+C 退出）")
+        if initial:
+            self.run_pending()
+        else:
+            for stage in self.stages:
+                self.last_run[stage] = snapshot(stage_inputs(stage))
+
+        state = self.current_inputs()
+        while True:
+            time.sleep(self.interval)
+            current = self.current_inputs()
+            if current == state:
+                continue
+            print(f"[监视] {datetime.now():%H:%M:%S} 检测到文件变化，等待写入完成...")
+            self.wait_for_quiet(current)
+            self.run_pending()
+            state = self.current_inputs()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='监视文件变化，自动重新运行 Excel 工具')
+    parser.add_argument('--stages', default=','.join(STAGES), help='要监视的步骤，逗号分隔')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='检查间隔（秒）')
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS, help='变化停止多久后处理（秒）')
+    parser.add_argument('--no-initial', action='store_true', help='启动时不运行，只处理之后的变化')
+    args = parser.parse_args(argv)
+
+    watcher = Watcher([s for s in args.stages.split(',') if s], args.interval, args.debounce)
+    try:
+        watcher.run(initial=not args.no_initial)
+    except KeyboardInterrupt:
+        print("[监视] 已退出")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,8 @@
-from docx import Document
 from typing import Dict, Any
 import traceback
 from datetime import datetime
 
-from summary_generator import SummaryGenerator
+# python-docx、summary_generator（docxcompose）在用到时才导入，减少启动时间
 
 
 class WordProcessor:
@@ -13,12 +12,23 @@ class WordProcessor:
                  auto_generate_summary: bool = True):
         self.template_path = template_path
         self.summary_enabled = summary_enabled
-        self.summary_generator = SummaryGenerator(summary_filename)  # 使用独立的汇总生成器
+        self.summary_filename = summary_filename
+        self._summary_generator = None
         self.auto_generate_summary = auto_generate_summary
         self.generated_files = []
 
+    @property
+    def summary_generator(self):
+        """使用独立的汇总生成器，第一次使用时创建"""
+        if self._summary_generator is None:
+            from summary_generator import SummaryGenerator
+            self._summary_generator = SummaryGenerator(self.summary_filename)
+        return self._summary_generator
+
     def generate_document(self, output_path: str, data: Dict[str, Any]) -> bool:
         try:
+            from docx import Document
+
             doc = Document(self.template_path)
             self._replace_placeholders(doc, data)
             self._process_row_data(doc, data.get('rows', []))
@@ -40,6 +50,8 @@ class WordProcessor:
             return False
 
         try:
+            from docx import Document
+
             summary_doc = Document()
 
             # 添加汇总文档标题